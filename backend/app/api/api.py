@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import containers, vulnerabilities, plan, hooks
+from app.api.endpoints import containers, vulnerabilities, plan, hooks, profiling, scans, events, analytics, hosts, history, scoring
 
 # Основной API роутер
 api_router = APIRouter()
@@ -9,4 +9,11 @@ api_router = APIRouter()
 api_router.include_router(containers.router, prefix="/containers", tags=["containers"])
 api_router.include_router(vulnerabilities.router, prefix="/vulnerabilities", tags=["vulnerabilities"])
 api_router.include_router(plan.router, prefix="/plan", tags=["plan"])
-api_router.include_router(hooks.router, prefix="/hooks", tags=["hooks"]) 
+api_router.include_router(hooks.router, prefix="/hooks", tags=["hooks"])
+api_router.include_router(hosts.router, prefix="/hosts", tags=["hosts"])
+api_router.include_router(scans.router, prefix="/scans", tags=["scans"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(history.router, prefix="/history", tags=["history"])
+api_router.include_router(scoring.router, prefix="/scoring", tags=["scoring"])
+api_router.include_router(profiling.router, prefix="/admin/profiling", tags=["admin"])
@@ -0,0 +1,22 @@
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+from starlette.status import HTTP_403_FORBIDDEN
+
+from app.core.config import settings
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Проверка административного токена"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token, settings.ADMIN_TOKEN)
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Зависимость для административных эндпоинтов (заголовок X-Admin-Token)"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail="Административный API отключен: не задан ADMIN_TOKEN"
+        )
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Неверный административный токен")
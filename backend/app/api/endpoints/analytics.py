@@ -0,0 +1,44 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import get_read_db
+from app.schemas.analytics import TopCVE, TopPackage, ImageRisk, ImageSeverityHistogram
+from app.services import analytics
+from app.services.analytics import analytics_cache
+
+router = APIRouter()
+
+# Обработчики синхронные: при промахе кэша агрегаты выполняются в пуле потоков FastAPI, а не в event loop
+
+@router.get("/top-cves", response_model=List[TopCVE])
+def get_top_cves(
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """CVE, затрагивающие наибольшее количество контейнеров"""
+    return analytics_cache.get(("top_cves", limit), lambda: analytics.top_cves(db, limit))
+
+@router.get("/top-packages", response_model=List[TopPackage])
+def get_top_packages(
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """Пакеты с наибольшим суммарным риском (сумма score) по всему парку"""
+    return analytics_cache.get(("top_packages", limit), lambda: analytics.top_packages(db, limit))
+
+@router.get("/images", response_model=List[ImageRisk])
+def get_worst_images(
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """Образы с наибольшим суммарным риском"""
+    return analytics_cache.get(("worst_images", limit), lambda: analytics.worst_images(db, limit))
+
+@router.get("/severity-histogram", response_model=List[ImageSeverityHistogram])
+def get_severity_histogram(
+    image: Optional[str] = Query(None, description="Образ (по умолчанию все)"),
+    db: Session = Depends(get_read_db)
+):
+    """Распределение уязвимостей по критичности для каждого образа"""
+    return analytics_cache.get(("severity_histogram", image), lambda: analytics.severity_histogram(db, image))
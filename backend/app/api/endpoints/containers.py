@@ -1,6 +1,8 @@
+import asyncio
 from typing import List, Optional
-import docker
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
 from starlette.status import HTTP_404_NOT_FOUND
 from loguru import logger
 import time
@@ -8,15 +10,20 @@ import os
 import platform
 import subprocess
 
-from app.services.collector import ContainerCollector
 from app.db.session import get_db
 from app.core.config import settings
+from app.models.container import Container as ContainerModel
 from app.schemas.container import Container, ContainerScanResponse
+from app.services.scan_queue import scan_queue
+from app.services.docker_admission import docker_admission, interactive
+from app.services.docker_hosts import DEFAULT_HOST
 
 router = APIRouter()
 
 def get_docker_client():
     """Получение клиента Docker с учетом особенностей разных платформ"""
+    import docker
+    
     try:
         # Проверка переменной окружения DOCKER_HOST
         docker_host = os.environ.get('DOCKER_HOST')
@@ -180,9 +187,14 @@ def get_docker_client():
 @router.get("/", response_model=List[Container])
 async def get_all_containers():
     """Получение списка всех контейнеров Docker"""
+    # Вызовы Docker API - вне event loop, с приоритетом перед фоновым обходом
+    with interactive():
+        return await asyncio.to_thread(_list_docker_containers)
+
+def _list_docker_containers() -> List[Container]:
     try:
         # Подключаемся напрямую к Docker Engine API
-        client = get_docker_client()
+        client = docker_admission.attach(get_docker_client())
         containers = []
         
         # Получаем список запущенных контейнеров
@@ -218,9 +230,15 @@ async def get_all_containers():
 @router.get("/{container_id}", response_model=Container)
 async def get_container_by_id(container_id: str):
     """Получение данных конкретного контейнера по ID"""
+    with interactive():
+        return await asyncio.to_thread(_get_docker_container, container_id)
+
+def _get_docker_container(container_id: str) -> Container:
+    import docker
+    
     try:
         # Подключаемся напрямую к Docker Engine API
-        client = get_docker_client()
+        client = docker_admission.attach(get_docker_client())
         
         # Получаем контейнер по ID или имени
         try:
@@ -264,19 +282,49 @@ async def get_container_by_id(container_id: str):
         )
 
 @router.post("/{container_id}/scan", response_model=ContainerScanResponse)
-async def scan_container(container_id: str, background_tasks: BackgroundTasks):
-    """Запуск сканирования контейнера на уязвимости"""
+async def scan_container(container_id: str, db: Session = Depends(get_db)):
+    """
+    Запуск сканирования контейнера на уязвимости
+    
+    Сканирование выполняется в фоне; задачи для одного образа объединяются,
+    статус доступен через GET /scans/{scan_id}
+    """
+    # Поиск контейнера по полному ID, короткому ID или имени
+    container = (
+        db.query(ContainerModel)
+        .filter(or_(
+            ContainerModel.id == container_id,
+            ContainerModel.id.startswith(container_id),
+            ContainerModel.name == container_id
+        ))
+        .first()
+    )
+    
+    if not container:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail=f"Контейнер с ID/именем {container_id} не найден"
+        )
+    
     try:
-        # Здесь будет логика сканирования в фоновом режиме
-        # Пока просто возвращаем заглушку
-        return ContainerScanResponse(
-            container_id=container_id, 
-            scan_id=f"scan-{int(time.time())}", 
-            status="started"
+        job, deduplicated = scan_queue.submit(
+            image=container.image,
+            image_digest=container.image_id or container.image,
+            container_id=container.id,
+            source="manual",
+            # Образ берется с хоста контейнера, на других хостах его может не быть
+            host=container.host or DEFAULT_HOST
         )
     except Exception as e:
         logger.error(f"Ошибка при запуске сканирования контейнера {container_id}: {str(e)}")
         raise HTTPException(
-            status_code=HTTP_404_NOT_FOUND,
+            status_code=500,
             detail=f"Не удалось запустить сканирование контейнера {container_id}"
-        ) 
+        )
+    
+    return ContainerScanResponse(
+        container_id=container_id,
+        scan_id=job.id,
+        status=job.status,
+        deduplicated=deduplicated
+    )
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.events import event_bus, parse_topics, Subscription
+
+router = APIRouter()
+
+def _subscribe(topics: Optional[str], since: Optional[int]) -> Subscription:
+    try:
+        return event_bus.subscribe(parse_topics(topics), since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _next_events(sub: Subscription) -> AsyncIterator[Optional[dict]]:
+    """
+    Поток событий подписки: сначала пропущенные, затем новые
+
+    None означает паузу без событий (для heartbeat).
+    """
+    if sub.resync:
+        sub.resync = False
+        yield {"seq": event_bus.last_seq, "topic": "system", "type": "resync", "data": {}}
+
+    for event in sub.backlog:
+        yield event.to_dict()
+    sub.backlog = []
+
+    while True:
+        try:
+            event = await asyncio.wait_for(sub.queue.get(), timeout=settings.EVENTS_HEARTBEAT_INTERVAL)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+
+        # None в очереди - маркер переполнения
+        if event is None or sub.resync:
+            sub.resync = False
+            yield {"seq": event_bus.last_seq, "topic": "system", "type": "resync", "data": {}}
+            continue
+
+        yield event.to_dict()
+
+@router.get("/")
+async def stream_events(
+    topics: Optional[str] = Query(None, description="Темы через запятую: containers, scans, findings, plan (по умолчанию все)"),
+    since: Optional[int] = Query(None, description="Номер последнего полученного события для возобновления"),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Поток изменений в формате Server-Sent Events
+    
+    Событие resync означает, что клиент пропустил изменения и должен один раз
+    перечитать списки целиком. Возобновление поддерживается параметром since
+    или стандартным заголовком Last-Event-ID.
+    """
+    sub = _subscribe(topics, since if since is not None else last_event_id)
+
+    async def generate():
+        try:
+            async for event in _next_events(sub):
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                payload = json.dumps(event, separators=(",", ":"), default=str)
+                yield f"id: {event['seq']}\nevent: {event['topic']}\ndata: {payload}\n\n"
+        finally:
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def events_websocket(
+    websocket: WebSocket,
+    topics: Optional[str] = None,
+    since: Optional[int] = None
+):
+    """
+    Поток изменений через WebSocket
+    
+    Клиент может менять подписку сообщениями
+    {"action": "subscribe" | "unsubscribe", "topics": [...]}.
+    """
+    try:
+        sub = event_bus.subscribe(parse_topics(topics), since)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action")
+            if not message.get("topics"):
+                continue
+            try:
+                requested = set(parse_topics(",".join(message.get("topics", []))))
+            except ValueError as e:
+                await websocket.send_json({"topic": "system", "type": "error", "data": {"detail": str(e)}})
+                continue
+            if action == "subscribe":
+                sub.topics |= requested
+            elif action == "unsubscribe":
+                sub.topics -= requested
+
+    receiver = asyncio.create_task(receive())
+    try:
+        async for event in _next_events(sub):
+            if receiver.done():
+                break
+            await websocket.send_json(event if event is not None else {"topic": "system", "type": "ping"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        event_bus.unsubscribe(sub)
@@ -0,0 +1,24 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import get_read_db
+from app.schemas.history import TrendPoint
+from app.services.scan_history import scan_history
+
+router = APIRouter()
+
+@router.get("/trends", response_model=List[TrendPoint])
+async def get_trends(
+    days: int = Query(90, ge=1, le=730),
+    container_id: Optional[str] = Query(None),
+    image: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Динамика уязвимостей по критичности за последние дни
+    
+    Читаются только ежедневные сводки, поэтому текущий день отражает
+    изменения на момент последней свертки (HISTORY_ROLLUP_INTERVAL).
+    """
+    return scan_history.trends(db, days, container_id=container_id, image=image)
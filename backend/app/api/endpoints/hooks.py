@@ -4,11 +4,19 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 
 from app.db.session import get_db
-from app.models.hook import Hook
-from app.schemas.hook import HookCreate, HookUpdate, HookInDB
+from app.models.hook import Hook, HookExecution, HOOK_TYPES
+from app.schemas.hook import HookCreate, HookUpdate, HookInDB, HookRunRequest, HookExecutionInDB
+from app.services.hook_engine import hook_engine
 
 router = APIRouter()
 
+def _validate_type(hook_type: str) -> None:
+    if hook_type not in HOOK_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный тип хука {hook_type}; допустимые: {', '.join(HOOK_TYPES)}"
+        )
+
 @router.get("/", response_model=List[HookInDB])
 async def get_hooks(
     type: Optional[str] = None,
@@ -44,6 +52,8 @@ async def create_hook(
     db: Session = Depends(get_db)
 ):
     """Создание нового пользовательского хука"""
+    _validate_type(hook.type)
+    
     # Проверка на существование хука с таким именем
     existing_hook = db.query(Hook).filter(Hook.name == hook.name).first()
     if existing_hook:
@@ -56,9 +66,56 @@ async def create_hook(
     db.add(db_hook)
     db.commit()
     db.refresh(db_hook)
+    hook_engine.invalidate()
     
     return db_hook
 
+@router.get("/executions", response_model=List[HookExecutionInDB])
+async def get_hook_executions(
+    hook_id: Optional[int] = None,
+    event: Optional[str] = None,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Журнал запусков хуков (сначала новые)
+    
+    - hook_id: фильтр по хуку
+    - event: фильтр по событию
+    - status: фильтр по результату (success, failed, timeout, error)
+    """
+    query = db.query(HookExecution)
+    
+    if hook_id is not None:
+        query = query.filter(HookExecution.hook_id == hook_id)
+    
+    if event:
+        query = query.filter(HookExecution.event == event)
+    
+    if status:
+        query = query.filter(HookExecution.status == status)
+    
+    return query.order_by(desc(HookExecution.id)).offset(skip).limit(limit).all()
+
+@router.post("/{hook_id}/run", response_model=HookExecutionInDB)
+async def run_hook(
+    hook_id: int,
+    request: Optional[HookRunRequest] = None,
+    db: Session = Depends(get_db)
+):
+    """Ручной запуск хука с тестовыми данными события"""
+    hook = db.query(Hook).filter(Hook.id == hook_id).first()
+    
+    if not hook:
+        raise HTTPException(status_code=404, detail="Хук не найден")
+    
+    if not hook_engine.running:
+        raise HTTPException(status_code=503, detail="Движок хуков не запущен")
+    
+    return await hook_engine.run(hook, request.payload if request else {})
+
 @router.get("/{hook_id}", response_model=HookInDB)
 async def get_hook(
     hook_id: int,
@@ -88,6 +145,8 @@ async def update_hook(
     
     # Обновление полей
     update_data = hook_update.dict(exclude_unset=True)
+    if "type" in update_data:
+        _validate_type(update_data["type"])
     
     # Проверка на уникальность имени при его изменении
     if "name" in update_data and update_data["name"] != db_hook.name:
@@ -102,6 +161,7 @@ async def update_hook(
     # Сохранение изменений
     db.commit()
     db.refresh(db_hook)
+    hook_engine.invalidate()
     
     return db_hook
 
@@ -120,5 +180,6 @@ async def delete_hook(
     # Удаление хука
     db.delete(hook)
     db.commit()
+    hook_engine.invalidate()
     
     return {"status": "success", "message": f"Хук {hook.name} успешно удален"} 
@@ -0,0 +1,32 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.session import get_read_db
+from app.models.scan_job import ScanJob, SCAN_ACTIVE_STATUSES
+from app.schemas.host import DockerHostStatus
+from app.services.docker_hosts import docker_hosts
+
+router = APIRouter()
+
+@router.get("/", response_model=List[DockerHostStatus])
+async def get_hosts(db: Session = Depends(get_read_db)):
+    """Состояние Docker хостов и их задач сканирования"""
+    counts = {
+        (host, status): count
+        for host, status, count in (
+            db.query(ScanJob.host, ScanJob.status, func.count(ScanJob.id))
+            .filter(ScanJob.status.in_(SCAN_ACTIVE_STATUSES))
+            .group_by(ScanJob.host, ScanJob.status)
+        )
+    }
+    
+    return [
+        DockerHostStatus(
+            **host.describe(),
+            queued_scans=counts.get((host.name, "queued"), 0),
+            running_scans=counts.get((host.name, "running"), 0)
+        )
+        for host in docker_hosts.list()
+    ]
@@ -1,14 +1,18 @@
+import asyncio
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.patch_plan import PatchPlan
 from app.models.container import Container
 from app.models.vulnerability import Vulnerability
-from app.schemas.plan import PlanRequest, PlanResponse, PatchPlanWithDetails
-from app.planner.optimizer import PatchOptimizer
+from app.schemas.plan import PlanRequest, PlanResponse, PatchPlanWithDetails, PatchPlanUpdate, PatchPlanInDB, PlanFrontierResponse
+from app.schemas.plan import PlanSimulationRequest, PlanSimulationResponse, PlanExecuteRequest, PlanExecuteResponse
+from app.services.hook_engine import hook_engine, plan_event_payload, PLAN_STATUS_EVENTS
+from app.services.events import event_bus
+from app.services.patch_executor import patch_executor
 
 router = APIRouter()
 
@@ -26,20 +30,107 @@ async def generate_plan(
     - container_id: Список ID контейнеров для включения в план (опционально)
     - max_items: Максимальное количество задач в плане (опционально)
     """
-    # Создание оптимизатора
-    optimizer = PatchOptimizer(time_window=window)
+    def generate():
+        # Планировщик (pulp, networkx, numpy) загружается при первом обращении
+        from app.planner.optimizer import PatchOptimizer
+        
+        return PatchOptimizer(time_window=window).generate_plan(container_ids=container_id, max_items=max_items)
     
-    # Генерация плана
-    plan = optimizer.generate_plan(container_ids=container_id, max_items=max_items)
+    # Запросы к БД и решение MILP выполняются вне event loop
+    plan = await asyncio.to_thread(generate)
+    
+    event_bus.publish("plan", "generated", {
+        "window": window,
+        "task_count": len(plan["tasks"]),
+        "total_score": plan["total_score"],
+        "total_duration": plan["total_duration"],
+        "unscheduled_count": len(plan["unscheduled"])
+    })
     
     return plan
 
+@router.get("/frontier", response_model=PlanFrontierResponse)
+async def get_plan_frontier(
+    windows: List[int] = Query([4, 8, 24, 72], description="Окна планирования в часах"),
+    container_id: Optional[List[str]] = Query(None, description="ID контейнеров для включения в план (опционально)")
+):
+    """
+    Сравнение планов для нескольких окон за одно решение
+    
+    - windows: Окна планирования в часах (от 1 до 168)
+    - container_id: Список ID контейнеров для включения в план (опционально)
+    
+    Возвращает почасовую кривую лучшего суммарного приоритета и планы для
+    каждого окна. Планы не сохраняются.
+    """
+    from app.planner.optimizer import PatchOptimizer
+    
+    if not windows or min(windows) < 1 or max(windows) > 168:
+        raise HTTPException(status_code=400, detail="Окна планирования должны быть от 1 до 168 часов")
+    
+    # Решение для всех окон занимает заметное время и выполняется вне event loop
+    return await asyncio.to_thread(PatchOptimizer().generate_frontier, windows, container_ids=container_id)
+
+@router.post("/simulate", response_model=PlanSimulationResponse)
+async def simulate_plan(request: PlanSimulationRequest):
+    """
+    What-if симуляция плана патчинга
+    
+    Использует данные последней генерации плана для всего парка (не старше
+    PLAN_SIMULATION_TTL) и позволяет исключить контейнеры, изменить веса
+    ALPHA/BETA/GAMMA, окно и max_items. План не сохраняется.
+    """
+    def simulate():
+        from app.planner.optimizer import PatchOptimizer
+        from app.planner.simulation import plan_simulator
+        
+        if request.refresh or plan_simulator.items is None:
+            PatchOptimizer().load_simulation_data()
+        
+        return plan_simulator.simulate(
+            window=request.window,
+            container_ids=request.containers,
+            exclude_containers=request.exclude_containers,
+            alpha=request.alpha,
+            beta=request.beta,
+            gamma=request.gamma,
+            max_items=request.max_items
+        )
+    
+    # Загрузка данных и решение выполняются вне event loop, как в /frontier
+    return await asyncio.to_thread(simulate)
+
+@router.post("/execute", response_model=PlanExecuteResponse)
+async def execute_plan(request: PlanExecuteRequest = PlanExecuteRequest()):
+    """
+    Запуск выполнения задач плана через Docker API
+    
+    Задачи в статусе pending выполняются в фоне по start_time (или сразу при
+    follow_schedule=false); ход выполнения отражается в статусе задач,
+    фактическая длительность - в actual_duration.
+    """
+    accepted = patch_executor.submit(request.plan_ids, follow_schedule=request.follow_schedule)
+    return {"success": bool(accepted), "accepted": accepted}
+
+@router.post("/{plan_id}/execute", response_model=PlanExecuteResponse)
+async def execute_plan_task(plan_id: int, db: Session = Depends(get_db)):
+    """Немедленное выполнение одной задачи плана"""
+    plan = db.query(PatchPlan).filter(PatchPlan.id == plan_id).first()
+    
+    if not plan:
+        raise HTTPException(status_code=404, detail="Задача плана не найдена")
+    if plan.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Задача плана в статусе {plan.status}")
+    
+    accepted = patch_executor.submit([plan_id], follow_schedule=False)
+    return {"success": bool(accepted), "accepted": accepted}
+
 @router.get("/status", response_model=List[PatchPlanWithDetails])
 async def get_plan_status(
     status: Optional[str] = Query(None, description="Фильтр по статусу (pending, in_progress, completed, failed)"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Получение информации о текущем плане патчинга и его статусе
@@ -81,4 +172,40 @@ async def get_plan_status(
             }
         )
         for plan, container_name, container_image, vulnerability_cve, vulnerability_severity, vulnerability_score in results
-    ] 
+    ]
+
+@router.patch("/{plan_id}", response_model=PatchPlanInDB)
+async def update_plan_task(
+    plan_id: int,
+    plan_update: PatchPlanUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    Обновление задачи плана патчинга
+    
+    Смена статуса запускает хуки: in_progress - pre_patch, completed - post_patch,
+    failed - on_failure, rolled_back - on_rollback
+    """
+    plan = db.query(PatchPlan).filter(PatchPlan.id == plan_id).first()
+    
+    if not plan:
+        raise HTTPException(status_code=404, detail="Задача плана не найдена")
+    
+    update_data = plan_update.dict(exclude_unset=True)
+    previous_status = plan.status
+    
+    for key, value in update_data.items():
+        setattr(plan, key, value)
+    
+    db.commit()
+    db.refresh(plan)
+    
+    payload = plan_event_payload(plan)
+    event_bus.publish("plan", "updated", {"id": plan.id, **{key: payload[key] for key in update_data}})
+    
+    # Запуск хуков при смене статуса
+    event = PLAN_STATUS_EVENTS.get(plan.status)
+    if event and plan.status != previous_status:
+        await hook_engine.emit(event, payload)
+    
+    return plan
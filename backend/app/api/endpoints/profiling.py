@@ -0,0 +1,87 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from starlette.status import HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+
+from app.api.deps import require_admin
+from app.core.config import settings
+from app.schemas.profiling import ProfileInfo, MemorySnapshotResponse
+from app.services.profiler import profiler
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/cpu", response_model=ProfileInfo)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, description="Длительность сэмплирования в секундах"),
+    interval_ms: int = Query(10, ge=1, le=1000, description="Интервал между сэмплами в миллисекундах")
+):
+    """
+    Сэмплирующий CPU-профиль всего процесса (включая коллектор)
+
+    Результат скачивается через GET /admin/profiling/{id} в формате collapsed stacks.
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Длительность профилирования не может превышать {settings.PROFILE_MAX_SECONDS} с"
+        )
+
+    sampler = profiler.cpu_profile_begin(interval_ms)
+    if sampler is None:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="CPU-профилирование уже выполняется")
+
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        artifact = await asyncio.to_thread(profiler.cpu_profile_end, sampler, seconds)
+
+    return artifact.describe()
+
+@router.post("/memory/start", response_model=dict)
+async def memory_start(frames: int = Query(1, ge=1, le=64, description="Глубина стека для каждого выделения")):
+    """Включение трассировки выделений памяти (tracemalloc)"""
+    started = profiler.memory_start(frames)
+    return {"status": "started" if started else "already_tracing"}
+
+@router.post("/memory/stop", response_model=dict)
+async def memory_stop():
+    """Выключение трассировки выделений памяти"""
+    stopped = profiler.memory_stop()
+    return {"status": "stopped" if stopped else "not_tracing"}
+
+@router.post("/memory/snapshot", response_model=MemorySnapshotResponse)
+async def memory_snapshot(
+    limit: int = Query(25, ge=1, le=500, description="Количество топовых мест выделения"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$", description="Группировка статистики")
+):
+    """Снимок tracemalloc: топ выделений и файл снимка для скачивания"""
+    if not profiler.is_memory_tracing():
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="tracemalloc не включен")
+
+    artifact, top = await asyncio.to_thread(profiler.memory_snapshot, limit, group_by)
+    return {"profile": artifact.describe(), "top": top}
+
+@router.get("/", response_model=List[ProfileInfo])
+async def list_profiles():
+    """Список сохраненных результатов профилирования"""
+    return [artifact.describe() for artifact in profiler.store.list()]
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str):
+    """
+    Скачивание результата профилирования
+
+    - cpu: collapsed stacks (flamegraph.pl, speedscope)
+    - request: pstats (python -m pstats, snakeviz)
+    - memory: tracemalloc.Snapshot.load
+    """
+    artifact = profiler.store.get(profile_id)
+    if not artifact:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Результат профилирования не найден")
+
+    return Response(
+        content=artifact.data,
+        media_type=artifact.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{artifact.filename}"'}
+    )
@@ -0,0 +1,69 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import desc
+
+from app.db.session import get_read_db
+from app.models.scan_job import ScanJob
+from app.models.image_schedule import ImageSchedule
+from app.schemas.scan import ScanJobInDB, ScanJobStatus, ImageScheduleInDB
+from app.services.scan_queue import scan_queue
+
+router = APIRouter()
+
+def _with_timing(job: ScanJob) -> ScanJobStatus:
+    """Дополнение задачи временем ожидания и выполнения"""
+    result = ScanJobStatus.model_validate(job)
+    if job.started_at and job.created_at:
+        result.wait_seconds = (job.started_at - job.created_at).total_seconds()
+    if job.started_at and job.finished_at:
+        result.run_seconds = (job.finished_at - job.started_at).total_seconds()
+    return result
+
+@router.get("/", response_model=List[ScanJobInDB])
+async def get_scans(
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Список задач сканирования (сначала новые)
+    
+    - status: фильтр по статусу (queued, running, completed, failed, cancelled)
+    """
+    query = db.query(ScanJob)
+    
+    if status:
+        query = query.filter(ScanJob.status == status)
+    
+    return query.order_by(desc(ScanJob.created_at)).offset(skip).limit(limit).all()
+
+@router.get("/schedules", response_model=List[ImageScheduleInDB])
+async def get_schedules(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    """Расписание периодического сканирования образов (ближайшие первыми)"""
+    return db.query(ImageSchedule).order_by(ImageSchedule.next_scan_at).offset(skip).limit(limit).all()
+
+@router.get("/{scan_id}", response_model=ScanJobStatus)
+async def get_scan(scan_id: str):
+    """Статус и время выполнения задачи сканирования"""
+    job = scan_queue.get(scan_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача сканирования не найдена")
+    
+    return _with_timing(job)
+
+@router.post("/{scan_id}/cancel", response_model=ScanJobStatus)
+async def cancel_scan(scan_id: str):
+    """Отмена ожидающей или выполняющейся задачи сканирования"""
+    job = scan_queue.cancel(scan_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача сканирования не найдена")
+    
+    return _with_timing(job)
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_409_CONFLICT
+
+from app.db.session import get_db
+from app.schemas.scoring import ScoringStatus, RescoreResult
+from app.services.scoring import scoring
+
+router = APIRouter()
+
+@router.get("/", response_model=ScoringStatus)
+async def get_scoring(db: Session = Depends(get_db)):
+    """Текущая версия весов скора (ALPHA, BETA, GAMMA) и количество уязвимостей, требующих пересчета"""
+    return scoring.status(db)
+
+@router.post("/rescore", response_model=RescoreResult)
+async def rescore(
+    batch_size: Optional[int] = Query(None, ge=1000, le=1000000, description="Строк на один UPDATE")
+):
+    """
+    Пересчет скора всех уязвимостей по текущим весам
+    
+    Выполняется после изменения ALPHA, BETA, GAMMA: пересчитываются только
+    строки со скором другой версии весов, порциями по первичному ключу.
+    """
+    result = await asyncio.to_thread(scoring.rescore, batch_size)
+    if result is None:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Пересчет скора уже выполняется")
+    return result
@@ -1,24 +1,127 @@
-from typing import List, Optional
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy.orm import Session, Query as SQLQuery
 from sqlalchemy import func, desc
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_read_db, ReadSessionLocal
 from app.models.vulnerability import Vulnerability
 from app.models.container import Container
-from app.schemas.vulnerability import VulnerabilityInDB, VulnerabilityWithContainer
+from app.schemas.vulnerability import VulnerabilityInDB, VulnerabilityWithContainer, VulnerabilityListItem
 
 router = APIRouter()
 
-@router.get("/", response_model=List[VulnerabilityWithContainer])
+# Колонки выгрузки (без объемного поля details)
+EXPORT_COLUMNS = (
+    Vulnerability.id,
+    Vulnerability.container_id,
+    Container.name.label("container_name"),
+    Container.image.label("container_image"),
+    Vulnerability.cve_id,
+    Vulnerability.package_name,
+    Vulnerability.package_version,
+    Vulnerability.fixed_version,
+    Vulnerability.cvss,
+    Vulnerability.severity,
+    Vulnerability.score,
+    Vulnerability.score_version,
+    Vulnerability.impact_factor,
+    Vulnerability.exploit_probability,
+    Vulnerability.known_exploited,
+    Vulnerability.description,
+    Vulnerability.created_at,
+    Vulnerability.updated_at,
+)
+
+# Поля, доступные для выборки в списке уязвимостей (fields=...)
+LIST_FIELDS = {
+    "id": Vulnerability.id,
+    "container_id": Vulnerability.container_id,
+    "container_name": Container.name.label("container_name"),
+    "container_image": Container.image.label("container_image"),
+    "cve_id": Vulnerability.cve_id,
+    "package_name": Vulnerability.package_name,
+    "package_version": Vulnerability.package_version,
+    "fixed_version": Vulnerability.fixed_version,
+    "cvss": Vulnerability.cvss,
+    "severity": Vulnerability.severity,
+    "score": Vulnerability.score,
+    "score_version": Vulnerability.score_version,
+    "impact_factor": Vulnerability.impact_factor,
+    "exploit_probability": Vulnerability.exploit_probability,
+    "known_exploited": Vulnerability.known_exploited,
+    "description": Vulnerability.description,
+    "details": Vulnerability.details,
+    "created_at": Vulnerability.created_at,
+    "updated_at": Vulnerability.updated_at,
+}
+
+# Поля списка по умолчанию (см. VulnerabilityListItem)
+DEFAULT_LIST_FIELDS = tuple(VulnerabilityListItem.model_fields)
+
+def _parse_fields(value: Optional[str]) -> List[str]:
+    """Разбор параметра fields; id возвращается всегда"""
+    if not value:
+        return list(DEFAULT_LIST_FIELDS)
+    
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+    
+    if "id" not in fields:
+        fields.insert(0, "id")
+    return list(dict.fromkeys(fields))
+
+def _apply_filters(
+    query: SQLQuery,
+    container_id: Optional[str],
+    severity: Optional[str],
+    cve_id: Optional[str],
+    min_cvss: Optional[float]
+) -> SQLQuery:
+    """Применение общих фильтров списка уязвимостей; исправленные (fixed_at) не выводятся"""
+    query = query.filter(Vulnerability.fixed_at.is_(None))
+    
+    if container_id:
+        query = query.filter(Vulnerability.container_id == container_id)
+    
+    if severity:
+        query = query.filter(Vulnerability.severity == severity)
+    
+    if cve_id:
+        query = query.filter(Vulnerability.cve_id.ilike(f"%{cve_id}%"))
+    
+    if min_cvss is not None:
+        query = query.filter(Vulnerability.cvss >= min_cvss)
+    
+    return query
+
+# Ответ строится из выбранных колонок без модели ответа; схема по умолчанию -
+# VulnerabilityListItem (поля по умолчанию берутся из нее же), с fields= - подмножество LIST_FIELDS
+@router.get(
+    "/",
+    response_class=ORJSONResponse,
+    responses={200: {
+        "model": List[VulnerabilityListItem],
+        "description": "Уязвимости, по убыванию скора; с параметром fields - только запрошенные поля (и id)",
+    }}
+)
 async def get_vulnerabilities(
     container_id: Optional[str] = None,
     severity: Optional[str] = None,
     cve_id: Optional[str] = None,
     min_cvss: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Список полей через запятую (например, id,cve_id,score,description)"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Получение списка уязвимостей с возможностью фильтрации
@@ -27,25 +130,19 @@ async def get_vulnerabilities(
     - severity: фильтр по критичности (Critical, High, Medium, Low)
     - cve_id: фильтр по CVE идентификатору (например, CVE-2021-...)
     - min_cvss: минимальный CVSS score
+    - fields: выбираемые поля; по умолчанию все, кроме description и details
     """
-    # Запрос с join для получения данных о контейнере
+    selected = _parse_fields(fields)
+    
+    # Выбираются только запрошенные колонки
     query = (
-        db.query(Vulnerability, Container.name.label("container_name"), Container.image.label("container_image"))
+        db.query(*[LIST_FIELDS[field] for field in selected])
+        .select_from(Vulnerability)
         .join(Container, Vulnerability.container_id == Container.id)
     )
     
     # Применение фильтров
-    if container_id:
-        query = query.filter(Vulnerability.container_id == container_id)
-    
-    if severity:
-        query = query.filter(Vulnerability.severity == severity)
-    
-    if cve_id:
-        query = query.filter(Vulnerability.cve_id.ilike(f"%{cve_id}%"))
-    
-    if min_cvss is not None:
-        query = query.filter(Vulnerability.cvss >= min_cvss)
+    query = _apply_filters(query, container_id, severity, cve_id, min_cvss)
     
     # Сортировка по скору (наиболее опасные первыми)
     query = query.order_by(desc(Vulnerability.score))
@@ -53,18 +150,106 @@ async def get_vulnerabilities(
     # Добавление пагинации
     results = query.offset(skip).limit(limit).all()
     
-    # Формирование результата
-    return [
-        VulnerabilityWithContainer(
-            **{**vulnerability.__dict__, "container_name": container_name, "container_image": container_image}
+    # Строки сериализуются напрямую, без построения pydantic-моделей
+    return ORJSONResponse([dict(zip(selected, row)) for row in results])
+
+@router.get("/export")
+async def export_vulnerabilities(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Формат выгрузки: ndjson или csv"),
+    gzip: bool = Query(False, description="Сжатие выгрузки gzip"),
+    container_id: Optional[str] = None,
+    severity: Optional[str] = None,
+    cve_id: Optional[str] = None,
+    min_cvss: Optional[float] = None
+):
+    """
+    Потоковая выгрузка всех уязвимостей в NDJSON или CSV
+    
+    Строки читаются серверным курсором порциями по EXPORT_CHUNK_SIZE и сразу
+    отправляются клиенту, поэтому объем памяти не зависит от размера выгрузки.
+    Поддерживает те же фильтры, что и GET /vulnerabilities.
+    """
+    rows = _export_rows(container_id, severity, cve_id, min_cvss)
+    chunks = _export_ndjson(rows) if format == "ndjson" else _export_csv(rows)
+    
+    filename = f"vulnerabilities-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _export_rows(
+    container_id: Optional[str],
+    severity: Optional[str],
+    cve_id: Optional[str],
+    min_cvss: Optional[float]
+) -> Iterator[List[tuple]]:
+    """Чтение строк выгрузки серверным курсором порциями"""
+    db = ReadSessionLocal()
+    try:
+        query = (
+            db.query(*EXPORT_COLUMNS)
+            .join(Container, Vulnerability.container_id == Container.id)
+        )
+        query = _apply_filters(query, container_id, severity, cve_id, min_cvss)
+        result = db.execute(
+            query.order_by(Vulnerability.id).statement,
+            execution_options={"stream_results": True, "yield_per": settings.EXPORT_CHUNK_SIZE}
         )
-        for vulnerability, container_name, container_image in results
-    ]
+        
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+def _export_ndjson(partitions: Iterator[List[tuple]]) -> Iterator[bytes]:
+    keys = [column.key for column in EXPORT_COLUMNS]
+    for rows in partitions:
+        lines = [
+            json.dumps(dict(zip(keys, row)), ensure_ascii=False, separators=(",", ":"), default=_json_default)
+            for row in rows
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+
+def _export_csv(partitions: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in EXPORT_COLUMNS])
+    
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Заголовок для пустой выгрузки
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
 
 @router.get("/{vuln_id}", response_model=VulnerabilityWithContainer)
 async def get_vulnerability(
     vuln_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение детальной информации о конкретной уязвимости"""
     # Запрос с join для получения данных о контейнере
@@ -0,0 +1,29 @@
+from loguru import logger
+
+from app.db.session import create_tables, rebuild_tables, upgrade_tables
+
+def init_db() -> None:
+    """
+    Создание недостающих таблиц для всех моделей и добавление новых колонок
+    и индексов в таблицы, созданные предыдущими версиями
+    
+    Запуск отдельно от сервера: python -m app.db.init (при DB_INIT_ON_STARTUP=false)
+    """
+    # Модели регистрируются в Base.metadata при импорте
+    import app.models.container  # noqa: F401
+    import app.models.vulnerability  # noqa: F401
+    import app.models.patch_plan  # noqa: F401
+    import app.models.hook  # noqa: F401
+    import app.models.scan_job  # noqa: F401
+    import app.models.replica  # noqa: F401
+    import app.models.image_schedule  # noqa: F401
+    import app.models.scan_history  # noqa: F401
+    import app.models.scoring  # noqa: F401
+    
+    rebuild_tables()
+    create_tables()
+    upgrade_tables()
+    logger.info("Схема БД проверена")
+
+if __name__ == "__main__":
+    init_db()
@@ -1,6 +1,13 @@
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from typing import List
+
+from loguru import logger
+from sqlalchemy import create_engine, event, inspect, literal
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 
@@ -13,6 +20,66 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Базовый класс для моделей
 Base = declarative_base()
 
+def _split_urls(value) -> List[str]:
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+# Реплики для чтения (DATABASE_READ_URL, через запятую)
+read_engines = [create_engine(url, pool_pre_ping=True) for url in _split_urls(settings.DATABASE_READ_URL)]
+_read_sessions = [sessionmaker(autocommit=False, autoflush=False, bind=read_engine) for read_engine in read_engines]
+_read_order = itertools.cycle(range(len(read_engines)))
+_read_unavailable = [0.0] * len(read_engines)  # time.monotonic(), до которого реплика не используется
+_read_lock = threading.Lock()
+
+# Время последней записи в основную БД в этом процессе (time.monotonic())
+_last_write = 0.0
+
+def mark_write() -> None:
+    """Отметка записи: следующие READ_YOUR_WRITES_WINDOW секунд чтение идет из основной БД"""
+    global _last_write
+    _last_write = time.monotonic()
+
+# Запись отмечается на уровне движка: flush сессии, массовые query().update()/delete()
+# и Core-запросы проходят через одно соединение основной БД
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if context.isinsert or context.isupdate or context.isdelete:
+        connection.info["wrote"] = True
+
+@event.listens_for(engine, "commit")
+def _after_commit(connection):
+    if connection.info.pop("wrote", False):
+        mark_write()
+
+@event.listens_for(engine, "rollback")
+def _after_rollback(connection):
+    connection.info.pop("wrote", None)
+
+def _watch_replica(index: int) -> None:
+    @event.listens_for(read_engines[index], "handle_error")
+    def _handle_error(context):
+        # Недоступная реплика (обрыв или ошибка подключения) исключается на READ_REPLICA_RETRY секунд
+        if context.is_disconnect or context.connection is None:
+            _read_unavailable[index] = time.monotonic() + settings.READ_REPLICA_RETRY
+
+for _index in range(len(read_engines)):
+    _watch_replica(_index)
+
+def ReadSessionLocal() -> Session:
+    """
+    Сессия для запросов только на чтение
+    
+    Реплики выбираются по кругу. Основная БД используется, если реплик нет,
+    все они недоступны или в процессе недавно была запись (read-your-writes).
+    """
+    now = time.monotonic()
+    if _read_sessions and now - _last_write >= settings.READ_YOUR_WRITES_WINDOW:
+        with _read_lock:
+            for _ in range(len(_read_sessions)):
+                index = next(_read_order)
+                if _read_unavailable[index] <= now:
+                    return _read_sessions[index]()
+    return SessionLocal()
+
 def get_db():
     """Функция-провайдер для получения сессии БД"""
     db = SessionLocal()
@@ -21,6 +88,98 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """Функция-провайдер сессии только для чтения (реплика при наличии)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def rebuild_tables() -> List[str]:
+    """
+    Удаление таблиц с производными данными, у которых изменился первичный ключ
+
+    ALTER TABLE не меняет первичный ключ переносимо, поэтому таблицы, помеченные
+    info={"rebuildable": True} (данные восстанавливаются работой сервиса),
+    удаляются и создаются заново в create_tables. Для остальных таблиц смена
+    ключа требует ручной миграции.
+
+    Returns:
+        Удаленные таблицы
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    dropped = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        primary_key = set(inspector.get_pk_constraint(table.name).get("constrained_columns") or [])
+        if primary_key == {column.name for column in table.primary_key.columns}:
+            continue
+        if not table.info.get("rebuildable"):
+            logger.error(f"Первичный ключ таблицы {table.name} изменился, требуется ручная миграция")
+            continue
+        table.drop(bind=engine)
+        dropped.append(table.name)
+        logger.warning(f"Таблица {table.name} пересоздана с новым первичным ключом")
+    return dropped
+
 def create_tables():
     """Создание всех таблиц в БД"""
-    Base.metadata.create_all(bind=engine) 
+    Base.metadata.create_all(bind=engine)
+
+def upgrade_tables() -> List[str]:
+    """
+    Добавление новых колонок и индексов в уже существующие таблицы
+
+    create_all создает только отсутствующие таблицы, поэтому колонки, появившиеся
+    в моделях после создания таблицы, добавляются через ALTER TABLE ... ADD COLUMN.
+    Существующие строки получают значение по умолчанию колонки, если оно
+    задано константой, иначе NULL.
+
+    Returns:
+        Добавленные колонки и индексы (table.name)
+    """
+    changes = []
+    existing_tables = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        inspector = inspect(engine)
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                value = literal(default, type_=column.type).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+                ddl += f" DEFAULT {value}"
+            try:
+                with engine.begin() as connection:
+                    connection.exec_driver_sql(ddl)
+            except SQLAlchemyError as e:
+                # Колонку могла добавить другая реплика, запущенная одновременно
+                if column.name not in {item["name"] for item in inspect(engine).get_columns(table.name)}:
+                    raise
+                logger.debug(f"Колонка {table.name}.{column.name} уже добавлена: {str(e)}")
+                continue
+            changes.append(f"{table.name}.{column.name}")
+
+        indexes = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            try:
+                index.create(bind=engine)
+            except SQLAlchemyError as e:
+                # Например, уникальный индекс при дубликатах в старых данных
+                logger.warning(f"Не удалось создать индекс {index.name}: {str(e)}")
+                continue
+            changes.append(f"{table.name}.{index.name}")
+
+    if changes:
+        logger.info(f"Схема БД обновлена: {', '.join(changes)}")
+    return changes
@@ -1,13 +1,28 @@
 import asyncio
+import importlib
 import os
-from fastapi import FastAPI, Depends
+import time
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 import uvicorn
 
 from app.core.config import settings
 from app.api.api import api_router
-from app.services.collector import ContainerCollector
-from app.db.session import create_tables
+from app.db.init import init_db
+from app.api.deps import is_admin_token
+from app.services.profiler import profiler
+from app.services.hook_engine import hook_engine
+from app.services.scan_queue import scan_queue
+from app.services.events import event_bus
+from app.services.docker_hosts import docker_hosts, parse_docker_endpoints
+from app.services.replicas import replica_registry
+from app.services.vulndb import vulndb
+from app.services.patch_executor import patch_executor
+from app.services.scan_history import scan_history
+from app.services.docker_admission import docker_admission
+from app.services.scan_throttle import scan_throttle
 
 app = FastAPI(
     title="AEGIS",
@@ -25,6 +40,28 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Профилирование отдельного запроса по заголовку X-Aegis-Profile
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if request.headers.get("x-aegis-profile") != "1" or not is_admin_token(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    
+    # cProfile учитывает только поток event loop: синхронные обработчики из пула потоков
+    # видны в профиле как ожидание
+    profile = profiler.request_profile_begin()
+    if profile is None:
+        return await call_next(request)
+    
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        artifact = profiler.request_profile_end(
+            profile, request.method, request.url.path, time.perf_counter() - started
+        )
+    response.headers["X-Profile-Id"] = artifact.id
+    return response
+
 # Подключение API роутера
 app.include_router(api_router, prefix="/v1")
 
@@ -33,37 +70,89 @@ app.include_router(api_router, prefix="/v1")
 async def health_check():
     return {"status": "ok"}
 
+# Метрики в формате Prometheus
+@app.get("/metrics", tags=["system"], response_class=PlainTextResponse)
+async def metrics():
+    lines = docker_admission.render_metrics() + scan_throttle.render_metrics() + hook_engine.render_metrics()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 # Глобальный экземпляр коллектора
 collector = None
+collector_task = None
+background_startup = None
+
+def log_task_failure(task: asyncio.Task) -> None:
+    """Запись ошибки фоновой задачи: иначе исключение задачи никто не увидит"""
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.opt(exception=task.exception()).error(f"Фоновая задача {task.get_name()} завершилась с ошибкой")
 
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске сервера"""
     print(f"Starting server with DEV_MODE={settings.DEV_MODE}")
     
-    # Создание таблиц в БД
-    create_tables()
+    # Доставка событий подписчикам выполняется в event loop сервера
+    event_bus.bind(asyncio.get_running_loop())
+    
+    # Запуск пула выполнения хуков
+    await hook_engine.start()
+    
+    # Проверка схемы БД и запуск коллектора не задерживают прием запросов
+    global background_startup
+    background_startup = asyncio.create_task(start_background_services(), name="background-startup")
+    background_startup.add_done_callback(log_task_failure)
+
+async def start_background_services():
+    """Проверка схемы БД и запуск коллектора в фоне"""
+    global collector, collector_task
+    
+    if settings.DB_INIT_ON_STARTUP:
+        await asyncio.to_thread(init_db)
     
     # Пропускаем инициализацию коллектора в режиме разработки
     if settings.DEV_MODE:
         print("Running in DEV_MODE without collector")
         return
     
+    # Коллектор (Docker SDK, модель топологии) загружается вне event loop
+    collector_module = await asyncio.to_thread(importlib.import_module, "app.services.collector")
+    
     # Запуск коллектора в фоновом режиме
-    global collector
-    collector = ContainerCollector(
-        docker_socket=settings.DOCKER_SOCKET,
+    docker_hosts.configure(parse_docker_endpoints(settings.DOCKER_ENDPOINTS, settings.DOCKER_SOCKET))
+    collector = collector_module.ContainerCollector(
+        hosts=docker_hosts.list(),
         scan_interval=settings.SCAN_INTERVAL,
         scanner=settings.SCANNER
     )
-    asyncio.create_task(collector.start())
+    await replica_registry.start()
+    await scan_throttle.start()
+    await scan_queue.start(collector.run_scan_job)
+    await vulndb.start()
+    await scan_history.start()
+    collector_task = asyncio.create_task(collector.start(), name="collector")
+    collector_task.add_done_callback(log_task_failure)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Освобождение ресурсов при остановке сервера"""
-    global collector
+    if background_startup and not background_startup.done():
+        background_startup.cancel()
+        await asyncio.gather(background_startup, return_exceptions=True)
+    
     if collector:
         await collector.stop()
+        if collector_task:
+            collector_task.cancel()
+            await asyncio.gather(collector_task, return_exceptions=True)
+        await scan_history.stop()
+        await vulndb.stop()
+        await scan_queue.stop()
+        await scan_throttle.stop()
+        await replica_registry.stop()
+    
+    await patch_executor.stop()
+    await hook_engine.stop()
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.DEV_MODE) 
@@ -2,14 +2,19 @@ from sqlalchemy import Column, String, DateTime, JSON, Boolean
 from sqlalchemy.sql import func
 from app.db.session import Base
 
+# Статус контейнера, которого больше нет в списке контейнеров Docker хоста
+REMOVED_STATUS = "removed"
+
 class Container(Base):
     """Модель Docker-контейнера"""
     __tablename__ = "containers"
     
     id = Column(String, primary_key=True, index=True)
+    host = Column(String, index=True, default="local")  # имя Docker хоста из DOCKER_ENDPOINTS
     name = Column(String, index=True)
     image = Column(String)
-    status = Column(String)
+    image_id = Column(String, index=True)  # digest образа (sha256:...)
+    status = Column(String)  # статус Docker или removed
     ports = Column(JSON)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer, ForeignKey
 from sqlalchemy.sql import func
 from app.db.session import Base
 
+# Поддерживаемые типы хуков
+HOOK_TYPES = ("on_detect", "pre_patch", "post_patch", "on_failure", "on_rollback")
+
 class Hook(Base):
     """Модель пользовательского скрипта-хука"""
     __tablename__ = "hooks"
@@ -11,8 +14,29 @@ class Hook(Base):
     type = Column(String, index=True)  # on_detect, pre_patch, post_patch, on_failure, on_rollback
     script = Column(Text)
     enabled = Column(Boolean, default=True)
+    timeout = Column(Integer, nullable=True)  # секунды; None = HOOK_DEFAULT_TIMEOUT
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<Hook {self.name} ({self.type})>" 
+
+class HookExecution(Base):
+    """Журнал запусков хуков"""
+    __tablename__ = "hook_executions"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hook_id = Column(Integer, ForeignKey("hooks.id", ondelete="CASCADE"), index=True)
+    hook_name = Column(String)
+    event = Column(String, index=True)
+    items = Column(Integer, default=1)  # количество объектов в пакетном событии
+    status = Column(String, index=True)  # success, failed, timeout, error
+    exit_code = Column(Integer, nullable=True)
+    stdout = Column(Text)
+    stderr = Column(Text)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    duration_ms = Column(Integer)
+    
+    def __repr__(self):
+        return f"<HookExecution {self.hook_name} ({self.event}): {self.status}>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, Float, Boolean
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ImageSchedule(Base):
+    """Расписание периодического сканирования образа на Docker хосте"""
+    __tablename__ = "image_schedules"
+    # Производные данные: при смене ключа таблица пересоздается (см. upgrade_tables)
+    __table_args__ = {"info": {"rebuildable": True}}
+    
+    # Один тег на разных хостах может указывать на разные digest
+    image = Column(String, primary_key=True, index=True)  # ссылка на образ (repo:tag)
+    host = Column(String, primary_key=True, default="local")
+    image_digest = Column(String)  # текущий digest образа по этой ссылке на хосте
+    exposed = Column(Boolean, default=False)  # у контейнеров образа есть опубликованные порты
+    max_severity = Column(String, nullable=True)  # по результату последнего скана
+    churn = Column(Float, default=0.0)  # число смен digest с экспоненциальным затуханием
+    churn_updated_at = Column(DateTime, nullable=True)
+    interval = Column(Float, nullable=True)  # текущий интервал сканирования, секунды
+    last_scan_at = Column(DateTime, nullable=True)
+    next_scan_at = Column(DateTime, index=True)
+    created_at = Column(DateTime, default=func.now())
+    
+    def __repr__(self):
+        return f"<ImageSchedule {self.image}@{self.host}: {self.next_scan_at}>"
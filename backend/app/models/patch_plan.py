@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Enum, JSON
 from sqlalchemy.sql import func
 import enum
 from app.db.session import Base
@@ -8,6 +8,16 @@ class PatchScenario(enum.Enum):
     ROLLING_UPDATE = "rolling-update"
     BLUE_GREEN = "blue-green"
 
+# Сценарии от самого быстрого к самому осторожному
+PATCH_SCENARIOS = (PatchScenario.HOT_PATCH, PatchScenario.ROLLING_UPDATE, PatchScenario.BLUE_GREEN)
+
+# Базовая длительность патчинга по сценарию, минуты
+PATCH_BASE_DURATION = {
+    PatchScenario.HOT_PATCH: 10,
+    PatchScenario.ROLLING_UPDATE: 20,
+    PatchScenario.BLUE_GREEN: 30,
+}
+
 class PatchPlan(Base):
     """Модель плана патчинга контейнеров"""
     __tablename__ = "patch_plans"
@@ -15,11 +25,23 @@ class PatchPlan(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     container_id = Column(String, ForeignKey("containers.id", ondelete="CASCADE"), index=True)
     vulnerability_id = Column(String, ForeignKey("vulnerabilities.id", ondelete="CASCADE"), index=True)
+    # Действие патчинга: обновление пакета в образе; container_id и vulnerability_id - самая приоритетная из закрываемых уязвимостей
+    image = Column(String, nullable=True)
+    package_name = Column(String, nullable=True)
+    fixed_version = Column(String, nullable=True)
+    container_ids = Column(JSON, nullable=True)
+    vulnerability_ids = Column(JSON, nullable=True)
     scenario = Column(Enum(PatchScenario), default=PatchScenario.HOT_PATCH)
     start_time = Column(DateTime)
     duration = Column(Integer)  # в минутах
+    lane = Column(Integer, nullable=True)  # дорожка параллельного расписания
     priority = Column(Float)
-    status = Column(String, default="pending")  # pending, in_progress, completed, failed
+    status = Column(String, default="pending")  # pending, queued, in_progress, completed, failed, rolled_back
+    target_image = Column(String, nullable=True)  # образ с исправлением (None = текущий тег контейнера)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    actual_duration = Column(Float, nullable=True)  # фактическая длительность, секунды
+    error = Column(String, nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
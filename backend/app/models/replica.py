@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime, Integer
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class Replica(Base):
+    """Экземпляр бэкенда, участвующий в сборе и сканировании"""
+    __tablename__ = "replicas"
+    
+    id = Column(String, primary_key=True, index=True)  # REPLICA_ID или {hostname}-{pid}
+    hostname = Column(String)
+    pid = Column(Integer)
+    started_at = Column(DateTime, default=func.now())
+    heartbeat_at = Column(DateTime, index=True)
+    
+    def __repr__(self):
+        return f"<Replica {self.id}>"
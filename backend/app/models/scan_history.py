@@ -0,0 +1,45 @@
+from sqlalchemy import Column, String, DateTime, Date, Integer, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class FindingDelta(Base):
+    """Изменение уязвимостей контейнера по результату скана (добавлена или исправлена)"""
+    __tablename__ = "finding_deltas"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    container_id = Column(String, index=True)
+    image = Column(String)
+    scan_id = Column(String, nullable=True)
+    cve_id = Column(String)
+    package_name = Column(String)
+    severity = Column(String)
+    change = Column(String)  # added, removed; смена критичности - removed + added
+    created_at = Column(DateTime, default=func.now(), index=True)
+    
+    def __repr__(self):
+        return f"<FindingDelta {self.change} {self.cve_id} for {self.container_id}>"
+
+class DailySeverityRollup(Base):
+    """
+    Число открытых уязвимостей контейнера по критичности на конец дня
+    
+    Строка пишется только за дни с изменениями; в остальные дни действует
+    последнее значение.
+    """
+    __tablename__ = "daily_severity_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "container_id", "severity", name="uq_daily_severity_rollup"),
+        Index("ix_daily_severity_rollups_container_severity_day", "container_id", "severity", "day"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, index=True)
+    container_id = Column(String)
+    image = Column(String)
+    severity = Column(String)
+    count = Column(Integer)  # на конец дня
+    added = Column(Integer, default=0)
+    removed = Column(Integer, default=0)
+    
+    def __repr__(self):
+        return f"<DailySeverityRollup {self.day} {self.container_id} {self.severity}: {self.count}>"
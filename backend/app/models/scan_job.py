@@ -0,0 +1,45 @@
+from sqlalchemy import Column, String, DateTime, Integer, JSON, Text, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+# Приоритеты задач сканирования (меньше = раньше)
+SCAN_PRIORITY_MANUAL = 0
+SCAN_PRIORITY_PERIODIC = 10
+
+# Статусы, при которых задача считается активной
+SCAN_ACTIVE_STATUSES = ("queued", "running")
+
+class ScanJob(Base):
+    """Модель задачи сканирования образа"""
+    __tablename__ = "scan_jobs"
+    
+    id = Column(String, primary_key=True, index=True)  # scan-{uuid}
+    image = Column(String)  # ссылка на образ для сканера
+    image_digest = Column(String, index=True)  # ключ дедупликации
+    host = Column(String, index=True, default="local")  # Docker хост, с которого берется образ
+    container_ids = Column(JSON, default=list)  # контейнеры, получающие результат
+    priority = Column(Integer, default=SCAN_PRIORITY_PERIODIC, index=True)
+    source = Column(String)  # manual, periodic
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed, cancelled
+    owner = Column(String, nullable=True, index=True)  # реплика, выполняющая задачу
+    lease_expires_at = Column(DateTime, nullable=True, index=True)  # продлевается heartbeat владельца
+    error = Column(Text, nullable=True)
+    findings_count = Column(Integer, nullable=True)
+    vulndb_version = Column(String, nullable=True)  # версия базы уязвимостей, с которой выполнен скан
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Не более одной активной задачи на образ, даже при одновременной постановке с разных реплик
+    __table_args__ = (
+        Index(
+            "uq_scan_jobs_active_digest",
+            "image_digest",
+            unique=True,
+            postgresql_where=status.in_(SCAN_ACTIVE_STATUSES),
+            sqlite_where=status.in_(SCAN_ACTIVE_STATUSES),
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<ScanJob {self.id} ({self.image}): {self.status}>"
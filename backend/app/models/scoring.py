@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ScoringWeights(Base):
+    """Версия весов итогового скора уязвимости (ALPHA, BETA, GAMMA)"""
+    __tablename__ = "scoring_weights"
+    
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    alpha = Column(Float, nullable=False)  # вес CVSS
+    beta = Column(Float, nullable=False)  # вес Impact Factor
+    gamma = Column(Float, nullable=False)  # вес Exploit Probability
+    created_at = Column(DateTime, default=func.now())
+    rescored_at = Column(DateTime, nullable=True)  # завершение последнего пересчета по этой версии
+    
+    def __repr__(self):
+        return f"<ScoringWeights v{self.version}: {self.alpha}/{self.beta}/{self.gamma}>"
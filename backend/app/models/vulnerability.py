@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, Boolean, JSON, DateTime, ForeignKey
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -9,16 +9,19 @@ class Vulnerability(Base):
     id = Column(String, primary_key=True, index=True)  # {container_id}_{CVE}
     container_id = Column(String, ForeignKey("containers.id", ondelete="CASCADE"), index=True)
     cve_id = Column(String, index=True)
-    package_name = Column(String)
+    package_name = Column(String, index=True)
     package_version = Column(String)
     fixed_version = Column(String, nullable=True)
     cvss = Column(Float, default=0.0)
-    severity = Column(String)
+    severity = Column(String, index=True)
     description = Column(String)
     details = Column(JSON)
     score = Column(Float, default=0.0)  # Рассчитанный итоговый скор
+    score_version = Column(Integer, nullable=True, index=True)  # версия весов скора (scoring_weights.version)
     impact_factor = Column(Float, default=0.0)
-    exploit_probability = Column(Float, default=0.0)
+    exploit_probability = Column(Float, default=0.0)  # EPSS; 1.0 для известных эксплуатируемых
+    known_exploited = Column(Boolean, default=False)  # CVE в каталоге KEV
+    fixed_at = Column(DateTime, nullable=True, index=True)  # исправлена: нет в последнем скане контейнера (None - открыта)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
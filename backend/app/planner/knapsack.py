@@ -0,0 +1,49 @@
+from typing import List, Tuple
+
+import numpy as np
+
+def solve_knapsack(values: np.ndarray, weights: np.ndarray, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Задача о рюкзаке 0/1 динамическим программированием по целочисленному весу
+
+    Один проход дает оптимум сразу для всех бюджетов от 0 до capacity.
+
+    Args:
+        values: Ценность элементов
+        weights: Целочисленный вес элементов (минуты)
+        capacity: Максимальный бюджет
+
+    Returns:
+        Лучшая суммарная ценность для каждого бюджета (длина capacity + 1) и
+        матрица решений keep[i, c] для восстановления набора (select_items)
+    """
+    n = len(values)
+    best = np.zeros(capacity + 1)
+    keep = np.zeros((n, capacity + 1), dtype=bool)
+
+    for i in range(n):
+        weight = int(weights[i])
+        if weight > capacity:
+            continue
+        if weight <= 0:
+            keep[i, :] = True
+            best += values[i]
+            continue
+
+        # Кандидаты считаются по значениям до добавления элемента i (каждый элемент берется один раз)
+        candidate = best[:capacity + 1 - weight] + values[i]
+        improved = candidate > best[weight:]
+        keep[i, weight:] = improved
+        best[weight:] = np.where(improved, candidate, best[weight:])
+
+    return best, keep
+
+def select_items(keep: np.ndarray, weights: np.ndarray, budget: int) -> List[int]:
+    """Восстановление оптимального набора элементов для бюджета"""
+    selected = []
+    for i in range(keep.shape[0] - 1, -1, -1):
+        if keep[i, budget]:
+            selected.append(i)
+            budget -= max(int(weights[i]), 0)
+    selected.reverse()
+    return selected
@@ -0,0 +1,66 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+@dataclass
+class LaneSlot:
+    """Размещение задачи в расписании"""
+    index: int  # индекс задачи во входном списке
+    lane: int
+    start: int  # минуты от начала плана
+    end: int
+
+def build_lane_schedule(
+    durations: Sequence[int],
+    groups: Sequence[str],
+    hosts: Sequence[Iterable[Optional[str]]],
+    lanes: int,
+    host_limit: int = 0,
+    horizon: Optional[int] = None
+) -> List[LaneSlot]:
+    """
+    Списочное планирование задач на параллельные дорожки
+
+    Задачи размещаются в порядке входного списка (по убыванию приоритета):
+    каждая начинается на дорожке, освобождающейся раньше других, но не раньше
+    завершения предыдущей задачи той же группы и не раньше освобождения слота
+    на каждом из ее хостов при ограничении host_limit.
+
+    Args:
+        durations: Длительность задач в минутах
+        groups: Группа каждой задачи (задачи одной группы не пересекаются)
+        hosts: Docker хосты, затрагиваемые каждой задачей
+        lanes: Количество параллельных дорожек
+        host_limit: Максимум одновременных задач на хосте (0 = без ограничения)
+        horizon: Конец окна в минутах; не помещающиеся задачи не размещаются
+
+    Returns:
+        Размещенные задачи в порядке входного списка
+    """
+    lane_free = [(0, lane) for lane in range(max(lanes, 1))]
+    group_free: Dict[str, int] = {}
+    host_free: Dict[Optional[str], List[int]] = {}
+
+    slots = []
+    for i, duration in enumerate(durations):
+        ready = group_free.get(groups[i], 0)
+
+        host_slots = []
+        if host_limit > 0:
+            host_slots = [host_free.setdefault(host, [0] * host_limit) for host in hosts[i]]
+            ready = max([ready] + [host_heap[0] for host_heap in host_slots])
+
+        free_at, lane = lane_free[0]
+        start = max(free_at, ready)
+        end = start + int(duration)
+        if horizon is not None and end > horizon:
+            continue
+
+        heapq.heapreplace(lane_free, (end, lane))
+        group_free[groups[i]] = end
+        for host_heap in host_slots:
+            heapq.heapreplace(host_heap, end)
+
+        slots.append(LaneSlot(index=i, lane=lane, start=start, end=end))
+
+    return slots
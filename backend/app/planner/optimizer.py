@@ -1,16 +1,21 @@
 import pulp
-import networkx as nx
-import pandas as pd
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
+from loguru import logger
 
 from app.models.vulnerability import Vulnerability
 from app.models.container import Container
-from app.models.patch_plan import PatchPlan, PatchScenario
+from app.models.patch_plan import PatchPlan, PatchScenario, PATCH_BASE_DURATION, PATCH_SCENARIOS
 from app.db.session import SessionLocal
 from app.core.config import settings
+from app.planner.topology import topology
+from app.services.analytics import SEVERITY_RANKS
+from app.planner.knapsack import solve_knapsack, select_items
+from app.planner.simulation import plan_simulator
+from app.planner.lanes import build_lane_schedule
 
 class PatchOptimizer:
     """Оптимизатор для планирования патчей уязвимостей"""
@@ -44,23 +49,30 @@ class PatchOptimizer:
             vulnerabilities = self._get_vulnerabilities(container_ids)
             
             if not vulnerabilities:
-                return {"tasks": [], "total_score": 0, "total_duration": 0}
+                return {"tasks": [], "total_score": 0, "total_duration": 0, "unscheduled": []}
             
-            # Создание графа контейнерной сети для анализа
-            container_graph = self._build_container_graph(container_ids)
+            # Метрики контейнерной сети из резидентной модели топологии
+            graph_factors = topology.factors(container_ids)
             
             # Подготовка данных для оптимизатора
-            items = self._prepare_items(vulnerabilities, container_graph)
+            items = self._prepare_items(vulnerabilities, graph_factors)
+            
+            # Данные всего парка сохраняются для what-if симуляций
+            if not container_ids:
+                plan_simulator.store(vulnerabilities, graph_factors)
             
             # Запуск оптимизации на основе knapsack problem
             selected_items = self._optimize_plan(items, max_items)
             
-            # Формирование временного плана
-            schedule = self._create_schedule(selected_items)
+            # Формирование временного плана; выбранные действия, не поместившиеся
+            # в окно на дорожках, возвращаются отдельно и не сохраняются
+            schedule, unscheduled = self._create_schedule(selected_items, self.time_window)
+            if unscheduled:
+                logger.warning(f"{len(unscheduled)} действий плана не помещаются в окно {self.time_window} ч на дорожках")
             
             # Расчет итоговых метрик
-            total_score = sum(item["score"] for item in selected_items)
-            total_duration = sum(item["duration"] for item in selected_items)
+            total_score = sum(task["score"] for task in schedule)
+            total_duration = sum(task["duration"] for task in schedule)
             
             # Сохранение плана в БД
             self._save_plan_to_db(schedule)
@@ -68,16 +80,93 @@ class PatchOptimizer:
             return {
                 "tasks": schedule,
                 "total_score": total_score,
-                "total_duration": total_duration
+                "total_duration": total_duration,
+                "unscheduled": unscheduled
             }
         
         finally:
             self.db.close()
     
+    def generate_frontier(self, windows: List[int], container_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Кривая "ценность плана - окно" и планы для нескольких окон за одно решение
+        
+        Задача о рюкзаке решается динамическим программированием один раз для
+        наибольшего окна; длительности округляются вверх до PLAN_DURATION_STEP
+        минут, чтобы таблица решений оставалась небольшой. Элементы
+        обрабатываются по возрастанию длительности, поэтому для каждого окна
+        выбор берется из префикса элементов, не длиннее окна (как в
+        _optimize_plan). Выбор каждого окна раскладывается по дорожкам с
+        ограничениями образа и хоста (_create_schedule); точка кривой - приоритет
+        задач, попавших в расписание, то есть ценность плана этого окна.
+        План в БД не сохраняется.
+        
+        Args:
+            windows: Окна планирования в часах
+            container_ids: Список ID контейнеров для планирования (None = все)
+            
+        Returns:
+            Словарь с почасовой кривой (curve) и планами для запрошенных окон (plans)
+        """
+        try:
+            windows = sorted(set(windows))
+            max_window = windows[-1]
+            
+            vulnerabilities = self._get_vulnerabilities(container_ids)
+            graph_factors = topology.factors(container_ids)
+            items = self._prepare_items(vulnerabilities, graph_factors) if vulnerabilities else []
+            
+            if not container_ids:
+                plan_simulator.store(vulnerabilities, graph_factors)
+            
+            # Короткие задачи первыми: элементы, допустимые для окна, образуют префикс
+            items = sorted(items, key=lambda item: item["duration"])
+            durations = np.array([item["duration"] for item in items], dtype=int)
+            priorities = np.array([item["priority"] for item in items], dtype=float)
+            
+            # Емкость - суммарное время всех дорожек в квантах длительности
+            step = max(settings.PLAN_DURATION_STEP, 1)
+            lanes = settings.PATCH_LANES
+            weights = -(-durations // step)
+            _, keep = solve_knapsack(priorities, weights, max_window * 60 * lanes // step)
+            
+            curve, plans = [], []
+            for hours in range(1, max_window + 1):
+                eligible = int(np.searchsorted(durations, hours * 60, side="right"))
+                chosen = select_items(keep[:eligible], weights[:eligible], hours * 60 * lanes // step)
+                tasks, unscheduled = self._create_schedule([items[i] for i in chosen], hours)
+                total_priority = sum(task["priority"] for task in tasks)
+                curve.append({"window": hours, "total_priority": total_priority})
+                
+                if hours in windows:
+                    plans.append({
+                        "window": hours,
+                        "tasks": tasks,
+                        "total_score": sum(task["score"] for task in tasks),
+                        "total_duration": sum(task["duration"] for task in tasks),
+                        "total_priority": total_priority,
+                        "unscheduled": unscheduled
+                    })
+            
+            return {"curve": curve, "plans": plans}
+        
+        finally:
+            self.db.close()
+    
+    def load_simulation_data(self) -> None:
+        """Загрузка данных всего парка для what-if симуляций без построения плана"""
+        try:
+            plan_simulator.store(self._get_vulnerabilities(None), topology.factors())
+        finally:
+            self.db.close()
+    
     def _get_vulnerabilities(self, container_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
         """
         Получение списка уязвимостей для планирования
         
+        Уязвимости без версии с исправлением (fixed_version) не дают действия
+        патчинга и в план не попадают, как и уже исправленные (fixed_at).
+        
         Args:
             container_ids: Список ID контейнеров (None = все)
             
@@ -89,9 +178,11 @@ class PatchOptimizer:
             self.db.query(
                 Vulnerability,
                 Container.name.label("container_name"),
-                Container.image.label("container_image")
+                Container.image.label("container_image"),
+                Container.host.label("container_host")
             )
             .join(Container, Vulnerability.container_id == Container.id)
+            .filter(Vulnerability.fixed_at.is_(None), Vulnerability.fixed_version.isnot(None), Vulnerability.fixed_version != "")
             .order_by(desc(Vulnerability.score))
         )
         
@@ -103,108 +194,113 @@ class PatchOptimizer:
         
         # Преобразование в список словарей
         vulnerabilities = []
-        for vuln, container_name, container_image in results:
+        for vuln, container_name, container_image, container_host in results:
             vulnerabilities.append({
                 "id": vuln.id,
                 "container_id": vuln.container_id,
                 "container_name": container_name,
                 "container_image": container_image,
+                "container_host": container_host,
                 "cve_id": vuln.cve_id,
                 "package_name": vuln.package_name,
                 "package_version": vuln.package_version,
+                "fixed_version": vuln.fixed_version,
                 "severity": vuln.severity,
                 "score": vuln.score,
-                "cvss": vuln.cvss
+                "cvss": vuln.cvss,
+                "impact_factor": vuln.impact_factor,
+                "exploit_probability": vuln.exploit_probability
             })
         
         return vulnerabilities
     
-    def _build_container_graph(self, container_ids: Optional[List[str]]) -> nx.Graph:
-        """
-        Построение графа контейнерной сети для анализа
-        
-        Args:
-            container_ids: Список ID контейнеров (None = все)
-            
-        Returns:
-            Граф контейнеров
-        """
-        # Создание графа
-        G = nx.Graph()
-        
-        # Запрос контейнеров из БД
-        query = self.db.query(Container)
-        if container_ids:
-            query = query.filter(Container.id.in_(container_ids))
-        
-        containers = query.all()
-        
-        # Добавление узлов (контейнеров)
-        for container in containers:
-            G.add_node(
-                container.id, 
-                name=container.name,
-                image=container.image,
-                status=container.status
-            )
-        
-        # Добавление ребер на основе связей (например, из одной сети)
-        # Упрощенная демонстрация - связываем контейнеры на одном образе
-        container_by_image = {}
-        for container in containers:
-            if container.image not in container_by_image:
-                container_by_image[container.image] = []
-            container_by_image[container.image].append(container.id)
-        
-        for image, container_list in container_by_image.items():
-            if len(container_list) > 1:
-                for i in range(len(container_list)):
-                    for j in range(i+1, len(container_list)):
-                        G.add_edge(container_list[i], container_list[j], relationship="same_image")
-        
-        # Расчет метрик центральности
-        if len(G.nodes) > 0:
-            centrality = nx.betweenness_centrality(G)
-            nx.set_node_attributes(G, centrality, "centrality")
-            
-            pagerank = nx.pagerank(G)
-            nx.set_node_attributes(G, pagerank, "pagerank")
-        
-        return G
-    
-    def _prepare_items(self, vulnerabilities: List[Dict[str, Any]], container_graph: nx.Graph) -> List[Dict[str, Any]]:
+    def _prepare_items(self, vulnerabilities: List[Dict[str, Any]], graph_factors: Dict[str, Dict[str, float]]) -> List[Dict[str, Any]]:
         """
         Подготовка элементов для задачи оптимизации
         
+        Элемент - действие патчинга: обновление пакета до fixed_version в образе
+        (пересборка образа и перезапуск его контейнеров), закрывающее все
+        уязвимости пакета во всех контейнерах образа. Приоритет и скор действия
+        равны сумме по закрываемым уязвимостям, сценарий выбирается по самой
+        критичной из них, длительность - по самому центральному контейнеру.
+        
         Args:
             vulnerabilities: Список уязвимостей
-            container_graph: Граф контейнерной сети
+            graph_factors: Метрики контейнерной сети (centrality, pagerank)
             
         Returns:
             Список элементов для оптимизации
         """
-        items = []
+        actions: Dict[tuple, Dict[str, Any]] = {}
         
         for vuln in vulnerabilities:
             # Определение сценария патчинга на основе критичности
             scenario = self._determine_patch_scenario(vuln["severity"], vuln["score"])
             
-            # Определение длительности операции
-            duration = self._estimate_patch_duration(scenario, vuln["container_id"], container_graph)
-            
             # Определение приоритета на основе скора и метрик графа
-            priority = self._calculate_priority(vuln, container_graph)
+            priority = self._calculate_priority(vuln, graph_factors)
+            
+            key = (vuln["container_image"], vuln["package_name"], vuln["fixed_version"])
+            action = actions.get(key)
+            if action is None:
+                action = actions[key] = {
+                    "image": vuln["container_image"],
+                    "package_name": vuln["package_name"],
+                    "fixed_version": vuln["fixed_version"],
+                    "containers": {},
+                    "hosts": set(),
+                    "vulnerability_ids": [],
+                    "cve_ids": [],
+                    "top_priority": None,
+                    "score": 0.0,
+                    "severity": vuln["severity"],
+                    "scenario": scenario,
+                    "priority": 0.0
+                }
+            
+            action["containers"].setdefault(vuln["container_id"], vuln["container_name"])
+            action["hosts"].add(vuln["container_host"])
+            action["vulnerability_ids"].append(vuln["id"])
+            if vuln["cve_id"] not in action["cve_ids"]:
+                action["cve_ids"].append(vuln["cve_id"])
+            action["score"] += vuln["score"] or 0.0
+            action["priority"] += priority
+            
+            # Представительная уязвимость - с наибольшим приоритетом
+            if action["top_priority"] is None or priority > action["top_priority"]:
+                action.update(top_priority=priority, id=vuln["id"], container_id=vuln["container_id"],
+                              container_name=vuln["container_name"], vulnerability_id=vuln["cve_id"])
+            if SEVERITY_RANKS.get(vuln["severity"], 0) > SEVERITY_RANKS.get(action["severity"], 0):
+                action["severity"] = vuln["severity"]
+            if PATCH_SCENARIOS.index(scenario) < PATCH_SCENARIOS.index(action["scenario"]):
+                action["scenario"] = scenario
+        
+        items = []
+        for action in actions.values():
+            # Определение длительности операции
+            duration = max(
+                self._estimate_patch_duration(action["scenario"], container_id, graph_factors)
+                for container_id in action["containers"]
+            )
             
             items.append({
-                "id": vuln["id"],
-                "container_id": vuln["container_id"],
-                "container_name": vuln["container_name"],
-                "vulnerability_id": vuln["cve_id"],
-                "score": vuln["score"],
-                "severity": vuln["severity"],
-                "scenario": scenario,
+                "id": action["id"],
+                "container_id": action["container_id"],
+                "container_name": action["container_name"],
+                "container_ids": list(action["containers"]),
+                "container_names": list(action["containers"].values()),
+                "hosts": sorted(action["hosts"], key=str),
+                "image": action["image"],
+                "package_name": action["package_name"],
+                "fixed_version": action["fixed_version"],
+                "vulnerability_id": action["vulnerability_id"],
+                "vulnerability_ids": action["vulnerability_ids"],
+                "cve_ids": action["cve_ids"],
+                "score": action["score"],
+                "severity": action["severity"],
+                "scenario": action["scenario"],
                 "duration": duration,
-                "priority": priority
+                "priority": action["priority"]
             })
         
         return items
@@ -227,43 +323,36 @@ class PatchOptimizer:
         else:
             return PatchScenario.BLUE_GREEN
     
-    def _estimate_patch_duration(self, scenario: PatchScenario, container_id: str, container_graph: nx.Graph) -> int:
+    def _estimate_patch_duration(self, scenario: PatchScenario, container_id: str, graph_factors: Dict[str, Dict[str, float]]) -> int:
         """
         Оценка длительности операции патчинга
         
         Args:
             scenario: Сценарий патчинга
             container_id: ID контейнера
-            container_graph: Граф контейнерной сети
+            graph_factors: Метрики контейнерной сети
             
         Returns:
             Длительность в минутах
         """
-        # Базовая длительность в зависимости от сценария
-        base_duration = {
-            PatchScenario.HOT_PATCH: 10,
-            PatchScenario.ROLLING_UPDATE: 20,
-            PatchScenario.BLUE_GREEN: 30
-        }
-        
         # Корректировка на основе метрик центральности контейнера
         multiplier = 1.0
-        if container_id in container_graph:
-            centrality = container_graph.nodes[container_id].get("centrality", 0)
-            pagerank = container_graph.nodes[container_id].get("pagerank", 0)
+        if container_id in graph_factors:
+            centrality = graph_factors[container_id]["centrality"]
+            pagerank = graph_factors[container_id]["pagerank"]
             
             # Чем более центральный узел, тем дольше патчинг
             multiplier += centrality * 2 + pagerank * 3
         
-        return int(base_duration[scenario] * multiplier)
+        return int(PATCH_BASE_DURATION[scenario] * multiplier)
     
-    def _calculate_priority(self, vulnerability: Dict[str, Any], container_graph: nx.Graph) -> float:
+    def _calculate_priority(self, vulnerability: Dict[str, Any], graph_factors: Dict[str, Dict[str, float]]) -> float:
         """
         Расчет приоритета патчинга
         
         Args:
             vulnerability: Данные уязвимости
-            container_graph: Граф контейнерной сети
+            graph_factors: Метрики контейнерной сети
             
         Returns:
             Приоритет (чем выше, тем важнее)
@@ -272,9 +361,9 @@ class PatchOptimizer:
         priority = vulnerability["score"]
         
         # Корректировка на основе метрик графа
-        if vulnerability["container_id"] in container_graph:
-            centrality = container_graph.nodes[vulnerability["container_id"]].get("centrality", 0)
-            pagerank = container_graph.nodes[vulnerability["container_id"]].get("pagerank", 0)
+        if vulnerability["container_id"] in graph_factors:
+            centrality = graph_factors[vulnerability["container_id"]]["centrality"]
+            pagerank = graph_factors[vulnerability["container_id"]]["pagerank"]
             
             # Учет "важности" контейнера в сети
             priority *= (1 + centrality + pagerank)
@@ -296,8 +385,11 @@ class PatchOptimizer:
         if not items:
             return []
         
-        # Ограничение по времени (в минутах)
+        # Ограничение по времени (в минутах); задачи длиннее окна не рассматриваются
         time_limit = self.time_window * 60
+        items = [item for item in items if item["duration"] <= time_limit]
+        if not items:
+            return []
         
         # Создание задачи оптимизации
         problem = pulp.LpProblem("PatchOptimization", pulp.LpMaximize)
@@ -310,8 +402,26 @@ class PatchOptimizer:
         # Целевая функция: максимизация суммарного приоритета
         problem += pulp.lpSum([items[i]["priority"] * x[i] for i in range(len(items))])
         
-        # Ограничение по времени
-        problem += pulp.lpSum([items[i]["duration"] * x[i] for i in range(len(items))]) <= time_limit
+        # Ограничение по времени: суммарное время всех дорожек
+        problem += pulp.lpSum([items[i]["duration"] * x[i] for i in range(len(items))]) <= time_limit * settings.PATCH_LANES
+        
+        # Действия над одним образом выполняются последовательно
+        by_image: Dict[str, List[int]] = {}
+        by_host: Dict[Any, List[int]] = {}
+        for i, item in enumerate(items):
+            by_image.setdefault(item["image"], []).append(i)
+            for host in item["hosts"]:
+                by_host.setdefault(host, []).append(i)
+        
+        for indexes in by_image.values():
+            if len(indexes) > 1:
+                problem += pulp.lpSum([items[i]["duration"] * x[i] for i in indexes]) <= time_limit
+        
+        # Ограничение одновременных задач на хосте
+        host_limit = settings.PATCH_HOST_CONCURRENCY
+        if 0 < host_limit < settings.PATCH_LANES:
+            for indexes in by_host.values():
+                problem += pulp.lpSum([items[i]["duration"] * x[i] for i in indexes]) <= time_limit * host_limit
         
         # Ограничение по количеству задач (если указано)
         if max_items:
@@ -328,41 +438,84 @@ class PatchOptimizer:
         
         return selected_items
     
-    def _create_schedule(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _create_schedule(items: List[Dict[str, Any]], time_window: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Создание расписания патчинга
+        Создание расписания патчинга на PATCH_LANES параллельных дорожках
+        
+        Задачи одного образа не пересекаются, на одном хосте одновременно
+        выполняется не более PATCH_HOST_CONCURRENCY задач (0 = без ограничения).
+        Ограничения оптимизатора суммарные, поэтому выбранное действие может не
+        поместиться в окно при раскладке по дорожкам.
         
         Args:
             items: Список выбранных элементов
+            time_window: Окно в часах
             
         Returns:
-            Список задач с временем начала
+            Список задач с временем начала и дорожкой и список действий, не
+            поместившихся в окно
         """
         # Сортировка по приоритету (сначала наиболее критичные)
         sorted_items = sorted(items, key=lambda x: x["priority"], reverse=True)
         
+        slots = build_lane_schedule(
+            durations=[item["duration"] for item in sorted_items],
+            groups=[item["image"] for item in sorted_items],
+            hosts=[item["hosts"] for item in sorted_items],
+            lanes=settings.PATCH_LANES,
+            host_limit=settings.PATCH_HOST_CONCURRENCY,
+            horizon=time_window * 60 if time_window else None
+        )
+        
         schedule = []
-        current_time = datetime.now()
+        plan_start = datetime.now()
         
-        for item in sorted_items:
+        for slot in sorted(slots, key=lambda slot: (slot.start, slot.lane)):
+            item = sorted_items[slot.index]
+            
             # Создание задачи в расписании
             task = {
                 "container_id": item["container_id"],
                 "container_name": item["container_name"],
+                "container_ids": item["container_ids"],
+                "container_names": item["container_names"],
+                "image": item["image"],
+                "package_name": item["package_name"],
+                "fixed_version": item["fixed_version"],
                 "vulnerability_id": item["vulnerability_id"],
+                "vulnerability_ids": item["vulnerability_ids"],
+                "cve_ids": item["cve_ids"],
                 "score": item["score"],
                 "severity": item["severity"],
                 "scenario": item["scenario"].value,
-                "start": current_time.isoformat(),
-                "duration": item["duration"]
+                "start": (plan_start + timedelta(minutes=slot.start)).isoformat(),
+                "end": (plan_start + timedelta(minutes=slot.end)).isoformat(),
+                "duration": item["duration"],
+                "lane": slot.lane,
+                "priority": item["priority"]
             }
             
             schedule.append(task)
-            
-            # Обновление текущего времени
-            current_time += timedelta(minutes=item["duration"])
         
-        return schedule
+        placed = {slot.index for slot in slots}
+        unscheduled = [
+            {
+                "container_ids": item["container_ids"],
+                "image": item["image"],
+                "package_name": item["package_name"],
+                "fixed_version": item["fixed_version"],
+                "cve_ids": item["cve_ids"],
+                "score": item["score"],
+                "severity": item["severity"],
+                "scenario": item["scenario"].value,
+                "duration": item["duration"],
+                "priority": item["priority"]
+            }
+            for index, item in enumerate(sorted_items) if index not in placed
+        ]
+        
+        return schedule, unscheduled
     
     def _save_plan_to_db(self, schedule: List[Dict[str, Any]]) -> None:
         """
@@ -381,9 +534,15 @@ class PatchOptimizer:
                 plan = PatchPlan(
                     container_id=task["container_id"],
                     vulnerability_id=f"{task['container_id']}_{task['vulnerability_id']}",
+                    image=task["image"],
+                    package_name=task["package_name"],
+                    fixed_version=task["fixed_version"],
+                    container_ids=task["container_ids"],
+                    vulnerability_ids=task["vulnerability_ids"],
                     scenario=scenario,
                     start_time=datetime.fromisoformat(task["start"]),
                     duration=task["duration"],
+                    lane=task["lane"],
                     priority=task["score"],
                     status="pending"
                 )
@@ -0,0 +1,266 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pulp
+
+from app.core.config import settings
+from app.models.patch_plan import PATCH_BASE_DURATION, PATCH_SCENARIOS as SCENARIOS
+from app.services.analytics import SEVERITY_RANKS, SEVERITY_BY_RANK
+
+# Базовая длительность по коду сценария (индекс в SCENARIOS)
+BASE_DURATIONS = np.array([PATCH_BASE_DURATION[scenario] for scenario in SCENARIOS], dtype=float)
+
+@dataclass
+class PlanItemArrays:
+    """Данные уязвимостей всего парка в виде массивов для повторных решений"""
+    ids: np.ndarray
+    container_ids: np.ndarray
+    container_names: np.ndarray
+    container_hosts: np.ndarray
+    cve_ids: np.ndarray
+    severities: np.ndarray
+    severity_ranks: np.ndarray
+    images: np.ndarray
+    packages: np.ndarray
+    fixed_versions: np.ndarray
+    actions: np.ndarray  # код действия (образ, пакет, fixed_version)
+    score: np.ndarray
+    cvss: np.ndarray
+    impact: np.ndarray
+    exploit: np.ndarray
+    centrality: np.ndarray
+    pagerank: np.ndarray
+    created_at: float  # time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class PlanSimulator:
+    """
+    What-if симуляция плана патчинга на данных в памяти
+
+    Хранит массивы последней подготовки элементов для всего парка и
+    пересчитывает приоритеты, сценарии и длительности векторно (по тем же
+    правилам, что PatchOptimizer), затем заново решает задачу выбора.
+    В БД ничего не записывается.
+    """
+
+    def __init__(self):
+        self._items: Optional[PlanItemArrays] = None
+        self._lock = threading.Lock()
+
+    @property
+    def items(self) -> Optional[PlanItemArrays]:
+        """Данные, если они есть и не старше PLAN_SIMULATION_TTL"""
+        items = self._items
+        if items is None or time.monotonic() - items.created_at > settings.PLAN_SIMULATION_TTL:
+            return None
+        return items
+
+    def store(self, vulnerabilities: List[Dict[str, Any]], graph_factors: Dict[str, Dict[str, float]]) -> None:
+        """Сохранение данных для симуляций"""
+        def column(key: str, dtype=float) -> np.ndarray:
+            return np.array([vuln[key] if vuln[key] is not None else 0 for vuln in vulnerabilities], dtype=dtype)
+
+        def factor(key: str) -> np.ndarray:
+            return np.array(
+                [graph_factors.get(vuln["container_id"], {}).get(key, 0.0) for vuln in vulnerabilities],
+                dtype=float
+            )
+
+        # Коды действий в порядке первого появления
+        action_codes: Dict[tuple, int] = {}
+        actions = np.array([
+            action_codes.setdefault(
+                (vuln["container_image"], vuln["package_name"], vuln["fixed_version"]), len(action_codes)
+            )
+            for vuln in vulnerabilities
+        ], dtype=int)
+
+        items = PlanItemArrays(
+            ids=column("id", object),
+            container_ids=column("container_id", object),
+            container_names=column("container_name", object),
+            container_hosts=np.array([vuln["container_host"] for vuln in vulnerabilities], dtype=object),
+            cve_ids=column("cve_id", object),
+            severities=column("severity", object),
+            severity_ranks=np.array([SEVERITY_RANKS.get(vuln["severity"], 0) for vuln in vulnerabilities], dtype=int),
+            images=np.array([vuln["container_image"] for vuln in vulnerabilities], dtype=object),
+            packages=np.array([vuln["package_name"] for vuln in vulnerabilities], dtype=object),
+            fixed_versions=np.array([vuln["fixed_version"] for vuln in vulnerabilities], dtype=object),
+            actions=actions,
+            score=column("score"),
+            cvss=column("cvss"),
+            impact=column("impact_factor"),
+            exploit=column("exploit_probability"),
+            centrality=factor("centrality"),
+            pagerank=factor("pagerank"),
+            created_at=time.monotonic(),
+        )
+        with self._lock:
+            self._items = items
+
+    def simulate(
+        self,
+        window: int,
+        container_ids: Optional[List[str]] = None,
+        exclude_containers: Optional[List[str]] = None,
+        alpha: Optional[float] = None,
+        beta: Optional[float] = None,
+        gamma: Optional[float] = None,
+        max_items: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Построение плана с измененными параметрами
+
+        Args:
+            window: Окно планирования в часах
+            container_ids: Контейнеры для включения (None = все)
+            exclude_containers: Исключаемые контейнеры
+            alpha, beta, gamma: Веса скора (None = скор из БД)
+            max_items: Максимальное количество задач
+
+        Returns:
+            Словарь с планом в формате GET /plan и параметрами симуляции
+        """
+        items = self.items
+        if items is None:
+            raise LookupError("Нет данных для симуляции")
+
+        mask = np.ones(len(items), dtype=bool)
+        if container_ids:
+            mask &= np.isin(items.container_ids, container_ids)
+        if exclude_containers:
+            mask &= ~np.isin(items.container_ids, exclude_containers)
+        index = np.flatnonzero(mask)
+
+        # Скор пересчитывается только при изменении весов
+        if alpha is None and beta is None and gamma is None:
+            score = items.score[index]
+        else:
+            score = (
+                (settings.ALPHA if alpha is None else alpha) * items.cvss[index] +
+                (settings.BETA if beta is None else beta) * items.impact[index] +
+                (settings.GAMMA if gamma is None else gamma) * items.exploit[index]
+            )
+
+        severities = items.severities[index]
+        centrality, pagerank = items.centrality[index], items.pagerank[index]
+
+        # Те же правила, что PatchOptimizer._determine_patch_scenario / _estimate_patch_duration / _calculate_priority
+        scenario = np.where(
+            (severities == "Critical") | (score > 8.0), 0,
+            np.where((severities == "High") | (score > 6.0), 1, 2)
+        )
+        multiplier = 1.0 + centrality * 2 + pagerank * 3
+        priority = score * (1.0 + centrality + pagerank)
+
+        # Агрегация по действиям, как PatchOptimizer._prepare_items
+        actions, group = np.unique(items.actions[index], return_inverse=True)
+        count = len(actions)
+        action_priority = np.bincount(group, weights=priority, minlength=count)
+        action_score = np.bincount(group, weights=score, minlength=count)
+        action_scenario = np.full(count, len(SCENARIOS) - 1)
+        np.minimum.at(action_scenario, group, scenario)
+        action_multiplier = np.zeros(count)
+        np.maximum.at(action_multiplier, group, multiplier)
+        action_rank = np.zeros(count, dtype=int)
+        np.maximum.at(action_rank, group, items.severity_ranks[index])
+        duration = (BASE_DURATIONS[action_scenario] * action_multiplier).astype(int)
+
+        # Уязвимости каждого действия (в исходном порядке) и представительная - с наибольшим приоритетом
+        members = np.split(np.argsort(group, kind="stable"), np.cumsum(np.bincount(group, minlength=count))[:-1])
+
+        # Образ и хосты каждого действия - для тех же ограничений, что в PatchOptimizer._optimize_plan
+        action_images = [items.images[index[rows[0]]] for rows in members]
+        action_hosts = [set(items.container_hosts[index[rows]]) for rows in members]
+        chosen = _solve(action_priority, duration, action_images, action_hosts, window, max_items)
+
+        selected = []
+        for a in chosen:
+            rows = index[members[a]]
+            top = rows[np.argmax(priority[members[a]])]
+            containers = dict.fromkeys(items.container_ids[rows])
+            selected.append({
+                "container_id": items.container_ids[top],
+                "container_name": items.container_names[top],
+                "container_ids": list(containers),
+                "container_names": list(dict.fromkeys(items.container_names[rows])),
+                "hosts": sorted(set(items.container_hosts[rows]), key=str),
+                "image": items.images[top],
+                "package_name": items.packages[top],
+                "fixed_version": items.fixed_versions[top],
+                "vulnerability_id": items.cve_ids[top],
+                "vulnerability_ids": list(items.ids[rows]),
+                "cve_ids": list(dict.fromkeys(items.cve_ids[rows])),
+                "score": float(action_score[a]),
+                "severity": SEVERITY_BY_RANK.get(int(action_rank[a]), severities[members[a][0]]),
+                "scenario": SCENARIOS[action_scenario[a]],
+                "duration": int(duration[a]),
+                "priority": float(action_priority[a]),
+            })
+
+        # Импорт здесь: оптимизатор сам сохраняет данные в симулятор
+        from app.planner.optimizer import PatchOptimizer
+
+        tasks, unscheduled = PatchOptimizer._create_schedule(selected, window)
+
+        return {
+            "tasks": tasks,
+            "total_score": sum(task["score"] for task in tasks),
+            "total_duration": sum(task["duration"] for task in tasks),
+            "total_priority": sum(task["priority"] for task in tasks),
+            "unscheduled": unscheduled,
+            "items_considered": int(len(index)),
+            "actions_considered": int(count),
+            "data_age": time.monotonic() - items.created_at,
+        }
+
+def _solve(
+    priority: np.ndarray,
+    duration: np.ndarray,
+    images: List[str],
+    hosts: List[set],
+    window: int,
+    max_items: Optional[int] = None
+) -> List[int]:
+    """Выбор действий с ограничениями PatchOptimizer._optimize_plan"""
+    time_limit = window * 60
+    candidates = np.flatnonzero(duration <= time_limit)
+    if len(candidates) == 0:
+        return []
+
+    problem = pulp.LpProblem("PatchSimulation", pulp.LpMaximize)
+    x = {i: pulp.LpVariable(f"x_{i}", cat=pulp.LpBinary) for i in candidates}
+    problem += pulp.lpSum(float(priority[i]) * x[i] for i in candidates)
+    problem += pulp.lpSum(int(duration[i]) * x[i] for i in candidates) <= time_limit * settings.PATCH_LANES
+
+    # Действия над одним образом выполняются последовательно
+    by_image: Dict[str, List[int]] = {}
+    by_host: Dict[Any, List[int]] = {}
+    for i in candidates:
+        by_image.setdefault(images[i], []).append(i)
+        for host in hosts[i]:
+            by_host.setdefault(host, []).append(i)
+
+    for indexes in by_image.values():
+        if len(indexes) > 1:
+            problem += pulp.lpSum(int(duration[i]) * x[i] for i in indexes) <= time_limit
+
+    # Ограничение одновременных задач на хосте
+    host_limit = settings.PATCH_HOST_CONCURRENCY
+    if 0 < host_limit < settings.PATCH_LANES:
+        for indexes in by_host.values():
+            problem += pulp.lpSum(int(duration[i]) * x[i] for i in indexes) <= time_limit * host_limit
+
+    if max_items:
+        problem += pulp.lpSum(x.values()) <= max_items
+    problem.solve(pulp.PULP_CBC_CMD(msg=False))
+
+    return [int(i) for i in candidates if pulp.value(x[i]) == 1]
+
+# Глобальный экземпляр симулятора
+plan_simulator = PlanSimulator()
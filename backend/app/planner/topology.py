@@ -0,0 +1,212 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import networkx as nx
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.container import Container, REMOVED_STATUS
+
+# Коэффициент затухания PageRank (как в networkx.pagerank)
+PAGERANK_ALPHA = 0.85
+
+class TopologyCache:
+    """
+    Резидентная модель топологии контейнеров для планировщика
+
+    Граф обновляется инкрементально: коллектор добавляет появившиеся
+    контейнеры, обновляет образ и статус и удаляет контейнеры, пропавшие из
+    списка Docker (статус removed).
+    Метрики пересчитываются только для затронутых компонент связности и хранятся
+    в виде, не зависящем от размера всего графа:
+
+    - betweenness - ненормированное значение внутри компоненты (кратчайшие пути
+      не выходят за ее пределы), нормировка на N выполняется при чтении;
+    - pagerank - значение внутри компоненты; для графа из N узлов, где k узлов
+      изолированы, глобальное значение равно local * |C| / (N - alpha * k),
+      у изолированных узлов - (1 - alpha) / (N - alpha * k).
+
+    Результат совпадает с networkx.betweenness_centrality и networkx.pagerank
+    на всем графе. Раз в TOPOLOGY_REFRESH секунд модель сверяется с БД.
+    """
+
+    def __init__(self):
+        self.graph = nx.Graph()
+        self._by_image: Dict[str, Set[str]] = {}
+        self._betweenness: Dict[str, float] = {}
+        self._pagerank: Dict[str, float] = {}
+        self._component_size: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+
+    def upsert(self, container_id: str, name: str, image: str, status: Optional[str] = None) -> None:
+        """Добавление контейнера, смена его образа или статуса"""
+        with self._lock:
+            if self._loaded_at is None:
+                # Модель еще не загружена, контейнер будет прочитан из БД
+                return
+            self._upsert(container_id, name, image, status)
+
+    def remove(self, container_id: str) -> None:
+        """Удаление контейнера из модели"""
+        with self._lock:
+            if self._loaded_at is None or container_id not in self.graph:
+                return
+            neighbors = list(self.graph.neighbors(container_id))
+            self._detach(container_id)
+            self.graph.remove_node(container_id)
+            self._forget(container_id)
+            self._recompute(neighbors)
+
+    def factors(self, container_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Метрики контейнеров для расчета приоритета и длительности патчинга
+
+        Метрики считаются по графу всего парка и не зависят от фильтра
+        container_ids: важность контейнера не меняется от того, для какой
+        части парка строится план.
+
+        Args:
+            container_ids: ID контейнеров (None = все)
+
+        Returns:
+            Словарь {container_id: {"centrality": ..., "pagerank": ...}}
+        """
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > settings.TOPOLOGY_REFRESH:
+                self.reload()
+
+            n = self.graph.number_of_nodes()
+            if n == 0:
+                return {}
+
+            isolated = sum(1 for size in self._component_size.values() if size == 1)
+            betweenness_scale = 2.0 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+            pagerank_denominator = n - PAGERANK_ALPHA * isolated
+
+            ids = self.graph.nodes if container_ids is None else [cid for cid in container_ids if cid in self.graph]
+            result = {}
+            for container_id in ids:
+                size = self._component_size[container_id]
+                if size == 1:
+                    pagerank = (1.0 - PAGERANK_ALPHA) / pagerank_denominator
+                else:
+                    pagerank = self._pagerank[container_id] * size / pagerank_denominator
+                result[container_id] = {
+                    "centrality": self._betweenness[container_id] * betweenness_scale,
+                    "pagerank": pagerank,
+                }
+            return result
+
+    def reload(self) -> None:
+        """Полная сверка модели с БД"""
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            containers = (
+                db.query(Container.id, Container.name, Container.image, Container.status)
+                .filter(Container.status.is_distinct_from(REMOVED_STATUS))
+                .all()
+            )
+        finally:
+            db.close()
+
+        with self._lock:
+            self.graph = nx.Graph()
+            self._by_image = {}
+            self._betweenness, self._pagerank, self._component_size = {}, {}, {}
+            for container_id, name, image, status in containers:
+                self.graph.add_node(container_id, name=name, image=image, status=status)
+                self._attach(container_id, image)
+            self._recompute_components(nx.connected_components(self.graph))
+            self._loaded_at = time.monotonic()
+
+        logger.debug(
+            f"Топология контейнеров загружена: узлов={len(containers)}, "
+            f"{(time.perf_counter() - started) * 1000:.1f} мс"
+        )
+
+    def _upsert(self, container_id: str, name: str, image: str, status: Optional[str]) -> None:
+        affected: List[str] = [container_id]
+        if container_id in self.graph:
+            if self.graph.nodes[container_id].get("image") == image:
+                self.graph.nodes[container_id].update(name=name, status=status)
+                return
+            # Смена образа: бывшие соседи могут оказаться в другой компоненте
+            affected.extend(self.graph.neighbors(container_id))
+            self._detach(container_id)
+
+        self.graph.add_node(container_id, name=name, image=image, status=status)
+        self._attach(container_id, image)
+        self._recompute(affected)
+
+    def _attach(self, container_id: str, image: str) -> None:
+        """Связи с контейнерами на том же образе"""
+        peers = self._by_image.setdefault(image, set())
+        for peer in peers:
+            self.graph.add_edge(container_id, peer, relationship="same_image")
+        peers.add(container_id)
+
+    def _detach(self, container_id: str) -> None:
+        image = self.graph.nodes[container_id].get("image")
+        self._by_image.get(image, set()).discard(container_id)
+        self.graph.remove_edges_from(list(self.graph.edges(container_id)))
+
+    def _forget(self, container_id: str) -> None:
+        self._betweenness.pop(container_id, None)
+        self._pagerank.pop(container_id, None)
+        self._component_size.pop(container_id, None)
+
+    def _recompute(self, nodes: Iterable[str]) -> None:
+        """Пересчет метрик компонент, содержащих указанные узлы"""
+        components, seen = [], set()
+        for node in nodes:
+            if node in self.graph and node not in seen:
+                component = nx.node_connected_component(self.graph, node)
+                seen |= component
+                components.append(component)
+        self._recompute_components(components)
+
+    def _recompute_components(self, components: Iterable[Set[str]]) -> None:
+        for component in components:
+            size = len(component)
+            for node in component:
+                self._component_size[node] = size
+
+            if size == 1:
+                node = next(iter(component))
+                self._betweenness[node] = 0.0
+                self._pagerank[node] = 1.0
+                continue
+
+            subgraph = self.graph.subgraph(component)
+            self._betweenness.update(nx.betweenness_centrality(subgraph, normalized=False))
+            self._pagerank.update(_pagerank(subgraph))
+
+def _pagerank(graph: nx.Graph, tol: float = 1.0e-6, max_iter: int = 100) -> Dict[str, float]:
+    """PageRank связного неориентированного графа (степенной метод без scipy)"""
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+
+    src, dst = [], []
+    for u, v in graph.edges:
+        src += [index[u], index[v]]
+        dst += [index[v], index[u]]
+    src, dst = np.array(src), np.array(dst)
+    out_degree = np.bincount(src, minlength=n).astype(float)
+    weights = 1.0 / out_degree[src]
+
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = x
+        x = PAGERANK_ALPHA * np.bincount(dst, weights=previous[src] * weights, minlength=n) + (1.0 - PAGERANK_ALPHA) / n
+        if np.abs(x - previous).sum() < n * tol:
+            break
+    return dict(zip(nodes, x.tolist()))
+
+# Глобальная модель топологии
+topology = TopologyCache()
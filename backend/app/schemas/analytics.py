@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Dict
+
+class TopCVE(BaseModel):
+    """CVE по количеству затронутых контейнеров"""
+    cve_id: str
+    containers: int
+    images: int
+    max_cvss: float
+    severity: str
+    total_score: float
+
+class TopPackage(BaseModel):
+    """Пакет по суммарному риску"""
+    package_name: str
+    total_score: float
+    findings: int
+    cves: int
+    containers: int
+    severity: str
+
+class ImageRisk(BaseModel):
+    """Риск образа"""
+    image: str
+    total_score: float
+    findings: int
+    cves: int
+    containers: int
+    critical: int
+    high: int
+    max_cvss: float
+
+class ImageSeverityHistogram(BaseModel):
+    """Распределение уязвимостей образа по критичности"""
+    image: str
+    severities: Dict[str, int]
+    total: int
@@ -8,6 +8,8 @@ class ContainerBase(BaseModel):
     name: str
     image: str
     status: str
+    image_id: Optional[str] = None
+    host: Optional[str] = None
     ports: Optional[Dict[str, Any]] = None
 
 class ContainerCreate(ContainerBase):
@@ -49,4 +51,5 @@ class ContainerScanResponse(BaseModel):
     """Ответ на запрос сканирования контейнера"""
     container_id: str
     scan_id: str
-    status: str 
+    status: str
+    deduplicated: bool = False  # присоединен к уже активной задаче для того же образа
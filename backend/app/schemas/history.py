@@ -0,0 +1,10 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import Dict
+
+class TrendPoint(BaseModel):
+    """Уязвимости по критичности на конец дня"""
+    day: date
+    counts: Dict[str, int]  # открытые
+    added: Dict[str, int]  # обнаружены за день
+    removed: Dict[str, int]  # исправлены за день
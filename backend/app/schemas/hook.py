@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional, Any
 from datetime import datetime
 
 class HookBase(BaseModel):
@@ -8,6 +8,7 @@ class HookBase(BaseModel):
     type: str
     script: str
     enabled: bool = True
+    timeout: Optional[int] = None
 
 class HookCreate(HookBase):
     """Схема создания хука"""
@@ -19,6 +20,7 @@ class HookUpdate(BaseModel):
     type: Optional[str] = None
     script: Optional[str] = None
     enabled: Optional[bool] = None
+    timeout: Optional[int] = None
 
 class HookInDB(HookBase):
     """Схема хука в БД"""
@@ -28,3 +30,25 @@ class HookInDB(HookBase):
     
     class Config:
         from_attributes = True 
+
+class HookRunRequest(BaseModel):
+    """Запрос на ручной запуск хука"""
+    payload: Dict[str, Any] = {}
+
+class HookExecutionInDB(BaseModel):
+    """Схема записи журнала запусков хуков"""
+    id: int
+    hook_id: int
+    hook_name: str
+    event: str
+    items: int
+    status: str
+    exit_code: Optional[int] = None
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+    started_at: datetime
+    finished_at: datetime
+    duration_ms: int
+    
+    class Config:
+        from_attributes = True
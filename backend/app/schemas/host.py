@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class DockerHostStatus(BaseModel):
+    """Состояние Docker хоста коллектора"""
+    name: str
+    url: str
+    status: str  # pending, ok, unreachable, remote
+    replica: Optional[str] = None  # реплика, обходящая хост
+    containers: int
+    last_seen: Optional[datetime] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None  # длительность последнего обхода, секунды
+    queued_scans: int = 0
+    running_scans: int = 0
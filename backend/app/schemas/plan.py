@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from app.models.patch_plan import PatchScenario
@@ -7,9 +7,15 @@ class PatchPlanBase(BaseModel):
     """Базовая схема плана патчинга"""
     container_id: str
     vulnerability_id: str
+    image: Optional[str] = None
+    package_name: Optional[str] = None
+    fixed_version: Optional[str] = None
+    container_ids: Optional[List[str]] = None
+    vulnerability_ids: Optional[List[str]] = None
     scenario: PatchScenario
     start_time: datetime
     duration: int
+    lane: Optional[int] = None
     priority: float
 
 class PatchPlanCreate(PatchPlanBase):
@@ -23,11 +29,17 @@ class PatchPlanUpdate(BaseModel):
     duration: Optional[int] = None
     priority: Optional[float] = None
     status: Optional[str] = None
+    target_image: Optional[str] = None
 
 class PatchPlanInDB(PatchPlanBase):
     """Схема плана патчинга в БД"""
     id: int
     status: str
+    target_image: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    actual_duration: Optional[float] = None  # секунды
+    error: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -52,4 +64,48 @@ class PlanResponse(BaseModel):
     """Ответ с планом патчинга"""
     tasks: List[Dict[str, Any]]
     total_score: float
-    total_duration: int 
+    total_duration: int
+    unscheduled: List[Dict[str, Any]] = []  # выбранные действия, не поместившиеся в окно на дорожках
+
+class FrontierPoint(BaseModel):
+    """Лучший суммарный приоритет для окна планирования"""
+    window: int  # часы
+    total_priority: float
+
+class FrontierPlan(PlanResponse):
+    """План для одного окна из кривой"""
+    window: int
+    total_priority: float
+
+class PlanExecuteRequest(BaseModel):
+    """Запуск выполнения плана"""
+    plan_ids: Optional[List[int]] = None  # ID задач (None = все задачи в статусе pending)
+    follow_schedule: bool = True  # Начинать задачи по start_time (False = сразу)
+
+class PlanExecuteResponse(BaseModel):
+    """Задачи, принятые к выполнению"""
+    success: bool
+    accepted: List[int]
+
+class PlanFrontierResponse(BaseModel):
+    """Кривая "ценность - окно" и планы для запрошенных окон"""
+    curve: List[FrontierPoint]
+    plans: List[FrontierPlan]
+
+class PlanSimulationRequest(BaseModel):
+    """Параметры what-if симуляции плана"""
+    window: int = Field(24, ge=1, le=168)  # Часовое окно для планирования
+    containers: Optional[List[str]] = None  # ID контейнеров (None = все)
+    exclude_containers: Optional[List[str]] = None  # Исключаемые контейнеры
+    alpha: Optional[float] = None  # Вес CVSS (None = скор из БД)
+    beta: Optional[float] = None  # Вес Impact Factor
+    gamma: Optional[float] = None  # Вес Exploit Probability
+    max_items: Optional[int] = Field(None, ge=1)  # Максимальное число задач
+    refresh: bool = False  # Перечитать данные из БД
+
+class PlanSimulationResponse(PlanResponse):
+    """Результат what-if симуляции (план не сохраняется)"""
+    total_priority: float
+    items_considered: int  # уязвимости
+    actions_considered: int  # действия патчинга (образ, пакет, fixed_version)
+    data_age: float  # возраст данных симуляции, секунды
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, List, Any
+from datetime import datetime
+
+class ProfileInfo(BaseModel):
+    """Описание сохраненного результата профилирования"""
+    id: str
+    kind: str
+    filename: str
+    size: int
+    created_at: datetime
+    meta: Dict[str, Any]
+
+class MemoryAllocation(BaseModel):
+    """Место выделения памяти по данным tracemalloc"""
+    location: List[str]
+    size: int
+    count: int
+
+class MemorySnapshotResponse(BaseModel):
+    """Ответ со снимком памяти"""
+    profile: ProfileInfo
+    top: List[MemoryAllocation]
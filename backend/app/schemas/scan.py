@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ScanJobInDB(BaseModel):
+    """Схема задачи сканирования"""
+    id: str
+    image: str
+    image_digest: str
+    host: Optional[str] = None
+    container_ids: List[str]
+    priority: int
+    source: str
+    status: str
+    owner: Optional[str] = None
+    error: Optional[str] = None
+    findings_count: Optional[int] = None
+    vulndb_version: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ScanJobStatus(ScanJobInDB):
+    """Схема задачи сканирования с временными метриками"""
+    wait_seconds: Optional[float] = None  # время в очереди
+    run_seconds: Optional[float] = None  # время выполнения
+
+class ImageScheduleInDB(BaseModel):
+    """Схема расписания сканирования образа"""
+    image: str
+    image_digest: Optional[str] = None
+    host: Optional[str] = None
+    exposed: bool
+    max_severity: Optional[str] = None
+    churn: float
+    interval: Optional[float] = None  # секунды
+    last_scan_at: Optional[datetime] = None
+    next_scan_at: datetime
+    
+    class Config:
+        from_attributes = True
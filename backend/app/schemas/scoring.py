@@ -0,0 +1,22 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class ScoringWeightsInfo(BaseModel):
+    """Версия весов итогового скора"""
+    version: int
+    alpha: float
+    beta: float
+    gamma: float
+    created_at: Optional[datetime] = None
+    rescored_at: Optional[datetime] = None
+
+class ScoringStatus(ScoringWeightsInfo):
+    """Текущие веса и количество уязвимостей со скором другой версии"""
+    stale: int
+
+class RescoreResult(ScoringWeightsInfo):
+    """Результат пересчета скора"""
+    updated: int
+    batches: int
+    duration: float
@@ -32,8 +32,11 @@ class VulnerabilityInDB(VulnerabilityBase):
     """Схема уязвимости в БД"""
     details: Dict[str, Any]
     score: float
+    score_version: Optional[int] = None
     impact_factor: float
     exploit_probability: float
+    known_exploited: Optional[bool] = False
+    fixed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -43,4 +46,22 @@ class VulnerabilityInDB(VulnerabilityBase):
 class VulnerabilityWithContainer(VulnerabilityInDB):
     """Схема уязвимости с данными контейнера"""
     container_name: str
-    container_image: str 
+    container_image: str
+
+class VulnerabilityListItem(BaseModel):
+    """Облегченная схема уязвимости для списков (без description и details)"""
+    id: str
+    container_id: str
+    container_name: str
+    container_image: str
+    cve_id: str
+    package_name: str
+    package_version: str
+    fixed_version: Optional[str] = None
+    cvss: float
+    severity: str
+    score: float
+    impact_factor: float
+    exploit_probability: float
+    created_at: datetime
+    updated_at: datetime
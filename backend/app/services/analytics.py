@@ -0,0 +1,175 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, desc, distinct, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.container import Container
+from app.models.vulnerability import Vulnerability
+
+# Ранги критичности для агрегатов (max по строке severity бессмыслен)
+SEVERITY_RANKS = {"Critical": 5, "High": 4, "Medium": 3, "Low": 2, "Negligible": 1}
+SEVERITY_BY_RANK = {rank: severity for severity, rank in SEVERITY_RANKS.items()}
+
+severity_rank = case(
+    *[(Vulnerability.severity == severity, rank) for severity, rank in SEVERITY_RANKS.items()],
+    else_=0
+)
+
+def _count_severity(severity: str):
+    return func.sum(case((Vulnerability.severity == severity, 1), else_=0))
+
+class AnalyticsCache:
+    """
+    Кэш результатов аналитики до следующей записи коллектора
+
+    Коллектор вызывает invalidate() после сохранения результатов скана. TTL
+    ограничивает устаревание, если данные меняет другой процесс.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._generation = 0
+        self._items: Dict[Tuple, Tuple[int, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+    def get(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            cached = self._items.get(key)
+            if cached and cached[0] == generation and now - cached[1] < self.ttl:
+                return cached[2]
+
+        value = compute()
+
+        with self._lock:
+            # Результат, вычисленный до инвалидации, не сохраняется
+            if generation == self._generation:
+                self._items[key] = (generation, now, value)
+        return value
+
+# Глобальный кэш аналитики
+analytics_cache = AnalyticsCache(ttl=settings.ANALYTICS_CACHE_TTL)
+
+def top_cves(db: Session, limit: int) -> List[Dict[str, Any]]:
+    """CVE, затрагивающие наибольшее количество контейнеров"""
+    containers = func.count(distinct(Vulnerability.container_id)).label("containers")
+    rows = (
+        db.query(
+            Vulnerability.cve_id,
+            containers,
+            func.count(distinct(Container.image)).label("images"),
+            func.max(Vulnerability.cvss).label("max_cvss"),
+            func.max(severity_rank).label("severity_rank"),
+            func.sum(Vulnerability.score).label("total_score")
+        )
+        .join(Container, Vulnerability.container_id == Container.id)
+        .filter(Vulnerability.fixed_at.is_(None))
+        .group_by(Vulnerability.cve_id)
+        .order_by(desc(containers), desc("max_cvss"))
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "cve_id": row.cve_id,
+            "containers": row.containers,
+            "images": row.images,
+            "max_cvss": row.max_cvss or 0.0,
+            "severity": SEVERITY_BY_RANK.get(row.severity_rank, "Unknown"),
+            "total_score": row.total_score or 0.0,
+        }
+        for row in rows
+    ]
+
+def top_packages(db: Session, limit: int) -> List[Dict[str, Any]]:
+    """Пакеты с наибольшим суммарным риском (сумма score) по всему парку"""
+    total_score = func.sum(Vulnerability.score).label("total_score")
+    rows = (
+        db.query(
+            Vulnerability.package_name,
+            total_score,
+            func.count(Vulnerability.id).label("findings"),
+            func.count(distinct(Vulnerability.cve_id)).label("cves"),
+            func.count(distinct(Vulnerability.container_id)).label("containers"),
+            func.max(severity_rank).label("severity_rank")
+        )
+        .filter(Vulnerability.fixed_at.is_(None))
+        .group_by(Vulnerability.package_name)
+        .order_by(desc(total_score))
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "package_name": row.package_name,
+            "total_score": row.total_score or 0.0,
+            "findings": row.findings,
+            "cves": row.cves,
+            "containers": row.containers,
+            "severity": SEVERITY_BY_RANK.get(row.severity_rank, "Unknown"),
+        }
+        for row in rows
+    ]
+
+def worst_images(db: Session, limit: int) -> List[Dict[str, Any]]:
+    """Образы с наибольшим суммарным риском"""
+    total_score = func.sum(Vulnerability.score).label("total_score")
+    rows = (
+        db.query(
+            Container.image,
+            total_score,
+            func.count(Vulnerability.id).label("findings"),
+            func.count(distinct(Vulnerability.cve_id)).label("cves"),
+            func.count(distinct(Container.id)).label("containers"),
+            _count_severity("Critical").label("critical"),
+            _count_severity("High").label("high"),
+            func.max(Vulnerability.cvss).label("max_cvss")
+        )
+        .join(Vulnerability, Vulnerability.container_id == Container.id)
+        .filter(Vulnerability.fixed_at.is_(None))
+        .group_by(Container.image)
+        .order_by(desc(total_score))
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "image": row.image,
+            "total_score": row.total_score or 0.0,
+            "findings": row.findings,
+            "cves": row.cves,
+            "containers": row.containers,
+            "critical": row.critical or 0,
+            "high": row.high or 0,
+            "max_cvss": row.max_cvss or 0.0,
+        }
+        for row in rows
+    ]
+
+def severity_histogram(db: Session, image: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Количество уязвимостей по критичности для каждого образа"""
+    query = (
+        db.query(Container.image, Vulnerability.severity, func.count(Vulnerability.id).label("count"))
+        .join(Vulnerability, Vulnerability.container_id == Container.id)
+        .filter(Vulnerability.fixed_at.is_(None))
+    )
+    if image:
+        query = query.filter(Container.image == image)
+
+    histogram: Dict[str, Dict[str, int]] = {}
+    for row in query.group_by(Container.image, Vulnerability.severity).all():
+        histogram.setdefault(row.image, {})[row.severity or "Unknown"] = row.count
+
+    return [
+        {"image": image_name, "severities": counts, "total": sum(counts.values())}
+        for image_name, counts in sorted(histogram.items(), key=lambda item: -sum(item[1].values()))
+    ]
@@ -1,97 +1,195 @@
 import asyncio
 import docker
-import json
-import subprocess
+import codecs
 import os
-import tempfile
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from loguru import logger
 
 from app.db.session import SessionLocal
-from app.models.container import Container
+from app.models.container import Container, REMOVED_STATUS
 from app.models.vulnerability import Vulnerability
+from app.models.scan_job import ScanJob
 from app.schemas.container import ContainerCreate
 from app.schemas.vulnerability import VulnerabilityCreate
 from app.core.config import settings
+from app.services.hook_engine import hook_engine
+from app.services.scan_queue import scan_queue
+from app.services.events import event_bus
+from app.services.analytics import analytics_cache
+from app.services.scan_history import scan_history
+from app.services.scoring import calculate_score, scoring
+from app.services.enrichment import DEFAULT_EXPLOIT_PROBABILITY, enrichment
+from app.services.docker_hosts import DockerHost, docker_hosts
+from app.services.replicas import replica_registry
+from app.services.scan_scheduler import scan_scheduler
+from app.services.scan_throttle import scan_throttle
+from app.services.vulndb import VulnDBVersion, scan_env, vulndb
+from app.planner.topology import topology
+from app.utils.json_stream import JSONArrayStream
+
+# Поля уязвимости в событиях и хуках
+FINDING_SUMMARY_FIELDS = ("id", "cve_id", "package_name", "package_version", "fixed_version", "severity", "cvss", "score")
+
+# Impact Factor, если в отчете нет подоценки воздействия CVSS
+DEFAULT_IMPACT_FACTOR = 0.5
+
+# Максимум подоценки воздействия по мажорной версии CVSS
+CVSS_IMPACT_MAX = {"2": 10.0, "3": 6.05, "4": 10.0}
+
+# Размер части вывода Grype при чтении, байт
+SCAN_OUTPUT_CHUNK = 65536
+
+# Поля контейнера, изменения которых публикуются в поток событий
+CONTAINER_EVENT_FIELDS = ("name", "image", "image_id", "status")
 
 class ContainerCollector:
     """Сервис для сбора информации о Docker-контейнерах и сканирования уязвимостей"""
     
-    def __init__(self, docker_socket: str, scan_interval: int, scanner: str = "grype"):
+    def __init__(self, hosts: List[DockerHost], scan_interval: int, scanner: str = "grype"):
         """
         Инициализация коллектора
         
         Args:
-            docker_socket: Путь к сокету Docker Engine
+            hosts: Docker хосты для сбора контейнеров
             scan_interval: Интервал сканирования в секундах
             scanner: Используемый сканер уязвимостей (по умолчанию grype)
         """
-        self.docker_socket = docker_socket
+        self.hosts = hosts
         self.scan_interval = scan_interval
         self.scanner = scanner
-        self.client = docker.DockerClient(base_url=f"unix://{docker_socket}")
         self.running = False
-        logger.info(f"Инициализирован коллектор: интервал={scan_interval}с, сканер={scanner}")
+        self._tasks: List[asyncio.Task] = []
+        logger.info(f"Инициализирован коллектор: хостов={len(hosts)}, интервал={scan_interval}с, сканер={scanner}")
     
     async def start(self) -> None:
-        """Запуск процесса сбора информации о контейнерах"""
+        """Запуск процесса сбора информации о контейнерах; у каждого хоста свой цикл обхода"""
         self.running = True
         logger.info("Запуск коллектора контейнеров")
         
+        self._tasks = [
+            asyncio.create_task(self._discover_host(host), name=f"discover-{host.name}")
+            for host in self.hosts
+        ]
+        self._tasks.append(asyncio.create_task(enrichment.watch(), name="enrichment"))
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def stop(self) -> None:
+        """Остановка процесса сбора"""
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        logger.info("Остановка коллектора контейнеров")
+    
+    async def _discover_host(self, host: DockerHost) -> None:
+        """
+        Цикл обхода контейнеров одного Docker хоста
+        
+        Вызовы Docker API выполняются в пуле потоков, поэтому медленный или
+        недоступный хост не задерживает обход остальных. При нескольких репликах
+        хост обходит только одна из них.
+        
+        Args:
+            host: Docker хост
+        """
         while self.running:
+            host.replica = replica_registry.owner_of(host.name)
+            if host.replica != replica_registry.id:
+                if host.status != "remote":
+                    logger.info(f"Хост {host.name} обходит реплика {host.replica}")
+                    host.status = "remote"
+                    host.reset_client()
+                await asyncio.sleep(settings.REPLICA_HEARTBEAT_INTERVAL)
+                continue
+            
+            started = time.monotonic()
             try:
-                # Получение списка контейнеров
-                containers = self.client.containers.list(all=True)
-                logger.info(f"Найдено {len(containers)} контейнеров")
+                containers = await asyncio.to_thread(self._list_containers, host)
+                logger.info(f"Хост {host.name}: найдено {len(containers)} контейнеров")
+                
+                host.status = "ok"
+                host.containers = len(containers)
+                host.last_seen = datetime.now()
+                host.last_error = None
                 
                 # Обработка каждого контейнера
-                for container in containers:
-                    await self._process_container(container)
+                for container_data in containers:
+                    await self._process_container(host, container_data)
                 
+                await asyncio.to_thread(self._mark_removed, host, {container["id"] for container in containers})
+            
             except docker.errors.DockerException as e:
-                logger.error(f"Ошибка Docker API: {str(e)}")
+                self._mark_unreachable(host, e)
             except Exception as e:
-                logger.error(f"Неожиданная ошибка: {str(e)}")
+                logger.error(f"Неожиданная ошибка при обходе хоста {host.name}: {str(e)}")
+                self._mark_unreachable(host, e)
+            finally:
+                host.last_duration = round(time.monotonic() - started, 3)
             
             # Ожидание следующего цикла
             await asyncio.sleep(self.scan_interval)
     
-    async def stop(self) -> None:
-        """Остановка процесса сбора"""
-        self.running = False
-        logger.info("Остановка коллектора контейнеров")
+    def _mark_unreachable(self, host: DockerHost, error: Exception) -> None:
+        logger.warning(f"Docker хост {host.name} недоступен: {str(error)}")
+        host.status = "unreachable"
+        host.last_error = str(error)
+        host.reset_client()
     
-    async def _process_container(self, container: Any) -> None:
+    def _list_containers(self, host: DockerHost) -> List[Dict[str, Any]]:
         """
-        Обработка данных контейнера и сканирование уязвимостей
+        Получение контейнеров хоста (блокирующие вызовы Docker API)
         
         Args:
-            container: Объект контейнера из Docker API
+            host: Docker хост
+            
+        Returns:
+            Список данных контейнеров
+        """
+        client = host.get_client()
+        
+        # Теги образов одним запросом вместо отдельного запроса на каждый контейнер
+        image_tags = {image.id: image.tags for image in client.images.list()}
+        
+        return [
+            {**self._extract_container_data(container, image_tags), "host": host.name}
+            for container in client.containers.list(all=True)
+        ]
+    
+    async def _process_container(self, host: DockerHost, container_data: Dict[str, Any]) -> None:
+        """
+        Обработка данных контейнера и постановка его образа в очередь сканирования
+        
+        Args:
+            host: Docker хост контейнера
+            container_data: Данные контейнера
         """
         try:
-            # Извлечение информации о контейнере
-            container_data = self._extract_container_data(container)
-            
             # Сохранение данных контейнера в БД
             db_container = self._upsert_container(container_data)
             
-            # Если контейнер запущен, сканируем его
-            if container.status == "running":
-                await self._scan_container(container.image.tags[0] if container.image.tags else container.id, db_container.id)
+            # Если контейнер запущен и по расписанию образа пора, ставим образ в очередь сканирования
+            if container_data["status"] == "running" and scan_scheduler.observe(host.name, container_data):
+                scan_queue.submit(
+                    image=container_data["image"],
+                    image_digest=container_data["image_id"],
+                    container_id=db_container.id,
+                    source="periodic",
+                    host=host.name
+                )
         
         except Exception as e:
-            logger.error(f"Ошибка при обработке контейнера {container.id}: {str(e)}")
+            logger.error(f"Ошибка при обработке контейнера {container_data['id']}: {str(e)}")
     
-    def _extract_container_data(self, container: Any) -> Dict[str, Any]:
+    def _extract_container_data(self, container: Any, image_tags: Dict[str, List[str]]) -> Dict[str, Any]:
         """
         Извлечение данных из объекта контейнера
         
         Args:
             container: Объект контейнера из Docker API
+            image_tags: Теги образов хоста по ID образа
             
         Returns:
             Словарь с данными контейнера
@@ -103,15 +201,50 @@ class ContainerCollector:
                 if binding:
                     ports[port] = binding
         
+        image_id = container.attrs.get("Image", "")
+        tags = image_tags.get(image_id)
+        
         # Формирование данных
         return {
             "id": container.id,
             "name": container.name,
-            "image": container.image.tags[0] if container.image.tags else container.image.id,
+            "image": tags[0] if tags else image_id,
+            "image_id": image_id,
             "status": container.status,
             "ports": ports
         }
     
+    def _mark_removed(self, host: DockerHost, listed: set) -> None:
+        """
+        Контейнеры хоста, которых нет в списке Docker, получают статус removed
+        и удаляются из модели топологии (блокирующие вызовы БД)
+        
+        Args:
+            host: Docker хост
+            listed: ID контейнеров из текущего обхода
+        """
+        db = SessionLocal()
+        try:
+            query = db.query(Container).filter(Container.host == host.name, Container.status.is_distinct_from(REMOVED_STATUS))
+            if listed:
+                query = query.filter(Container.id.notin_(listed))
+            missing = [db_container.id for db_container in query]
+            if not missing:
+                return
+            query.update({Container.status: REMOVED_STATUS}, synchronize_session=False)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при обновлении удаленных контейнеров хоста {host.name}: {str(e)}")
+            return
+        finally:
+            db.close()
+        
+        for container_id in missing:
+            topology.remove(container_id)
+            event_bus.publish("containers", "removed", {"id": container_id, "status": REMOVED_STATUS})
+        logger.info(f"Хост {host.name}: удалено контейнеров: {len(missing)}")
+    
     def _upsert_container(self, container_data: Dict[str, Any]) -> Container:
         """
         Создание или обновление записи о контейнере в БД
@@ -129,15 +262,31 @@ class ContainerCollector:
             
             if db_container:
                 # Обновление существующего
+                changed = [key for key in CONTAINER_EVENT_FIELDS if getattr(db_container, key) != container_data.get(key)]
                 for key, value in container_data.items():
                     setattr(db_container, key, value)
+                event_type = "updated"
             else:
                 # Создание нового
                 db_container = Container(**container_data)
                 db.add(db_container)
+                changed = list(CONTAINER_EVENT_FIELDS)
+                event_type = "created"
             
             db.commit()
             db.refresh(db_container)
+            
+            # Граф контейнеров зависит от состава и образов, статус хранится в узле
+            if event_type == "created" or "image" in changed or "status" in changed:
+                topology.upsert(db_container.id, db_container.name, db_container.image, db_container.status)
+            
+            # В поток событий попадают только фактические изменения
+            if changed:
+                event_bus.publish("containers", event_type, {
+                    "id": db_container.id,
+                    **{key: container_data.get(key) for key in changed}
+                })
+            
             return db_container
             
         except SQLAlchemyError as e:
@@ -147,117 +296,282 @@ class ContainerCollector:
         finally:
             db.close()
     
-    async def _scan_container(self, image: str, container_id: str) -> None:
+    async def run_scan_job(self, job: ScanJob) -> Tuple[int, Optional[str]]:
         """
-        Сканирование контейнера на наличие уязвимостей
+        Выполнение задачи сканирования из очереди
         
         Args:
-            image: Образ контейнера
-            container_id: ID контейнера в БД
+            job: Задача сканирования
+            
+        Returns:
+            Количество найденных уязвимостей и версия базы уязвимостей
         """
-        logger.info(f"Сканирование контейнера {container_id}, образ {image}")
+        # Скан использует одну версию базы от начала до конца, даже если она обновится
+        await vulndb.ready()
+        with vulndb.use() as database:
+            vulnerabilities = await self._scan_image(job.image, docker_hosts.get(job.host), database)
+        scan_scheduler.record_scan(job.image, job.host, job.image_digest, vulnerabilities)
         
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                sbom_path = os.path.join(temp_dir, "sbom.json")
-                
-                # Генерация SBOM с помощью Syft
-                self._generate_sbom(image, sbom_path)
-                
-                # Сканирование с помощью Grype
-                vulnerabilities = self._scan_with_grype(sbom_path)
-                
-                # Сохранение результатов
-                if vulnerabilities:
-                    self._save_vulnerabilities(container_id, vulnerabilities)
+        # Контейнеры могли присоединиться к задаче во время сканирования
+        current = scan_queue.get(job.id)
+        container_ids = current.container_ids if current else job.container_ids
         
-        except Exception as e:
-            logger.error(f"Ошибка при сканировании контейнера {container_id}: {str(e)}")
+        new_findings = []
+        for container_id in container_ids:
+            added, _ = self._save_vulnerabilities(container_id, vulnerabilities, image=job.image, scan_id=job.id)
+            new_findings.extend({**finding, "container_id": container_id} for finding in added)
+        
+        # Одно событие on_detect на скан со всеми новыми уязвимостями
+        if new_findings:
+            await hook_engine.emit("on_detect", {
+                "scan_id": job.id,
+                "image": job.image,
+                "container_ids": container_ids,
+                "count": len(new_findings),
+                "findings": new_findings
+            }, items=len(new_findings))
+        
+        return len(vulnerabilities), database.name if database else None
     
-    def _generate_sbom(self, image: str, output_path: str) -> None:
+    async def _scan_image(
+        self,
+        image: str,
+        host: Optional[DockerHost] = None,
+        database: Optional[VulnDBVersion] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Генерация SBOM (Software Bill of Materials) с помощью Syft
+        Сканирование образа на наличие уязвимостей
         
         Args:
             image: Образ для сканирования
-            output_path: Путь для сохранения SBOM
+            host: Docker хост, из которого Syft получает образ
+            database: Версия базы уязвимостей Grype; None - база Grype по умолчанию без автообновления
+            
+        Returns:
+            Список найденных уязвимостей
         """
+        logger.info(f"Сканирование образа {image}" + (f" с хоста {host.name}" if host else ""))
+        
+        # SBOM передается из stdout Syft в stdin Grype через pipe, без временного файла
+        read_fd, write_fd = os.pipe()
         try:
-            cmd = ["syft", image, "-o", "spdx-json", "--file", output_path]
-            logger.debug(f"Выполнение команды: {' '.join(cmd)}")
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            logger.debug(f"SBOM сгенерирован: {output_path}")
+            syft = await self._spawn(
+                ["syft", image, "-o", "spdx-json"],
+                env={"DOCKER_HOST": host.url} if host else None,
+                stdout=write_fd
+            )
+            try:
+                grype = await self._spawn(
+                    ["grype", "-o", "json"],
+                    env=scan_env(database),
+                    stdin=read_fd,
+                    stdout=asyncio.subprocess.PIPE
+                )
+            except BaseException:
+                await self._terminate(syft)
+                raise
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
         
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Ошибка при генерации SBOM: {e.stderr}")
-            raise Exception(f"Ошибка Syft: {e.stderr}")
+        syft_stderr = asyncio.create_task(syft.stderr.read())
+        grype_stderr = asyncio.create_task(grype.stderr.read())
+        
+        # Результат Grype разбирается по мере поступления
+        stream = JSONArrayStream("matches")
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        matches = []
+        try:
+            while True:
+                chunk = await grype.stdout.read(SCAN_OUTPUT_CHUNK)
+                matches.extend(stream.feed(decoder.decode(chunk, final=not chunk)))
+                if not chunk:
+                    break
+            await asyncio.gather(syft.wait(), grype.wait())
+        except BaseException:
+            await asyncio.gather(self._terminate(syft), self._terminate(grype))
+            raise
+        finally:
+            scan_throttle.unregister(syft.pid)
+            scan_throttle.unregister(grype.pid)
+        
+        if syft.returncode != 0:
+            stderr = (await syft_stderr).decode(errors="replace")
+            logger.error(f"Ошибка при генерации SBOM: {stderr}")
+            raise Exception(f"Ошибка Syft: {stderr}")
+        
+        if grype.returncode != 0:
+            stderr = (await grype_stderr).decode(errors="replace")
+            logger.error(f"Ошибка при сканировании на уязвимости: {stderr}")
+            raise Exception(f"Ошибка Grype: {stderr}")
+        
+        try:
+            matches.extend(stream.close())
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге результатов Grype: {str(e)}")
+            raise Exception("Некорректный JSON от Grype")
+        
+        logger.info(f"Найдено {len(matches)} уязвимостей")
+        return matches
     
-    def _scan_with_grype(self, sbom_path: str) -> List[Dict[str, Any]]:
+    async def _spawn(self, cmd: List[str], env: Optional[Dict[str, str]] = None, **kwargs) -> asyncio.subprocess.Process:
         """
-        Сканирование SBOM на уязвимости с помощью Grype
+        Запуск сканера с пониженным приоритетом CPU/IO и учетом в бюджете CPU
+        сканирований (см. ScanThrottle)
         
         Args:
-            sbom_path: Путь к файлу SBOM
+            cmd: Команда и аргументы
+            env: Дополнительные переменные окружения
+            **kwargs: stdin, stdout для create_subprocess_exec; stderr перехватывается
             
         Returns:
-            Список найденных уязвимостей
+            Запущенный процесс
         """
-        try:
-            cmd = ["grype", f"sbom:{sbom_path}", "-o", "json"]
-            logger.debug(f"Выполнение команды: {' '.join(cmd)}")
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # Парсинг результатов
-            grype_result = json.loads(result.stdout)
-            logger.info(f"Найдено {len(grype_result.get('matches', []))} уязвимостей")
-            
-            return grype_result.get("matches", [])
+        logger.debug(f"Выполнение команды: {' '.join(cmd)}")
         
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Ошибка при сканировании на уязвимости: {e.stderr}")
-            raise Exception(f"Ошибка Grype: {e.stderr}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка при парсинге результатов Grype: {str(e)}")
-            raise Exception("Некорректный JSON от Grype")
+        process = await asyncio.create_subprocess_exec(
+            *scan_throttle.command(cmd),
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, **env} if env else None,
+            preexec_fn=scan_throttle.preexec,
+            **kwargs
+        )
+        scan_throttle.register(process.pid)
+        return process
     
-    def _save_vulnerabilities(self, container_id: str, vulnerabilities: List[Dict[str, Any]]) -> None:
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        """Завершение процесса сканера при отмене или ошибке"""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        scan_throttle.unregister(process.pid)
+    
+    def _save_vulnerabilities(
+        self,
+        container_id: str,
+        vulnerabilities: List[Dict[str, Any]],
+        image: Optional[str] = None,
+        scan_id: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
         """
-        Сохранение найденных уязвимостей в БД
+        Сохранение результатов скана контейнера в БД
+        
+        Уязвимости, отсутствующие в новом скане, считаются исправленными: запись
+        остается (на нее ссылаются задачи плана) и помечается fixed_at, при
+        повторном обнаружении уязвимость снова открывается. Изменения записываются в историю уязвимостей в той же транзакции.
         
         Args:
             container_id: ID контейнера
             vulnerabilities: Список уязвимостей
+            image: Образ контейнера
+            scan_id: ID задачи сканирования
+            
+        Returns:
+            Краткие данные впервые обнаруженных уязвимостей и ID исправленных
         """
+        # Одна CVE может встречаться в нескольких пакетах - сохраняется первая запись
+        parsed = {}
+        for vuln in vulnerabilities:
+            vulnerability = self._parse_vulnerability(container_id, vuln)
+            if vulnerability and vulnerability["id"] not in parsed:
+                parsed[vulnerability["id"]] = vulnerability
+        
+        # Вероятность эксплуатации (EPSS, KEV) - одним поиском по индексу для всего скана
+        enrichment.enrich(parsed.values())
+        
+        # Итоговый скор и версия весов, с которыми он посчитан
+        score_version = scoring.current_version()
+        for vulnerability in parsed.values():
+            vulnerability["score"] = calculate_score(
+                vulnerability["cvss"], vulnerability["impact_factor"], vulnerability["exploit_probability"]
+            )
+            vulnerability["score_version"] = score_version
+        
+        new_findings = []
+        changes = []
         db = SessionLocal()
         try:
-            for vuln in vulnerabilities:
-                # Извлечение данных уязвимости
-                vulnerability = self._parse_vulnerability(container_id, vuln)
-                if not vulnerability:
-                    continue
-                
-                # Поиск существующей уязвимости
-                db_vuln = db.query(Vulnerability).filter(Vulnerability.id == vulnerability["id"]).first()
+            # Текущие уязвимости контейнера одним запросом
+            existing = {
+                db_vuln.id: db_vuln
+                for db_vuln in db.query(Vulnerability).filter(Vulnerability.container_id == container_id)
+            }
+            
+            for vuln_id, vulnerability in parsed.items():
+                db_vuln = existing.get(vuln_id)
                 
-                if db_vuln:
+                if db_vuln and db_vuln.fixed_at is not None:
+                    # Повторное обнаружение исправленной ранее уязвимости
+                    for key, value in vulnerability.items():
+                        if key != "id":
+                            setattr(db_vuln, key, value)
+                    db_vuln.fixed_at = None
+                    new_findings.append({key: vulnerability[key] for key in FINDING_SUMMARY_FIELDS})
+                    changes.append(("added", vulnerability))
+                elif db_vuln:
+                    # Смена критичности учитывается в истории как переход между уровнями
+                    if db_vuln.severity != vulnerability["severity"]:
+                        changes.append(("removed", {
+                            "cve_id": db_vuln.cve_id,
+                            "package_name": db_vuln.package_name,
+                            "severity": db_vuln.severity
+                        }))
+                        changes.append(("added", vulnerability))
+                    
                     # Обновление существующей
                     for key, value in vulnerability.items():
                         if key != "id":
                             setattr(db_vuln, key, value)
                 else:
                     # Создание новой
-                    db_vuln = Vulnerability(**vulnerability)
-                    db.add(db_vuln)
+                    db.add(Vulnerability(**vulnerability))
+                    new_findings.append({key: vulnerability[key] for key in FINDING_SUMMARY_FIELDS})
+                    changes.append(("added", vulnerability))
+            
+            # Исправленные помечаются, а не удаляются
+            fixed_at = datetime.now()
+            removed_ids = [
+                vuln_id for vuln_id, db_vuln in existing.items()
+                if vuln_id not in parsed and db_vuln.fixed_at is None
+            ]
+            for vuln_id in removed_ids:
+                changes.append(("removed", {
+                    "cve_id": existing[vuln_id].cve_id,
+                    "package_name": existing[vuln_id].package_name,
+                    "severity": existing[vuln_id].severity
+                }))
+                existing[vuln_id].fixed_at = fixed_at
             
+            scan_history.record(db, container_id, image, scan_id, changes)
             db.commit()
+            analytics_cache.invalidate()
         
         except SQLAlchemyError as e:
             db.rollback()
             logger.error(f"Ошибка при сохранении уязвимостей в БД: {str(e)}")
+            return [], []
         finally:
             db.close()
+        
+        if new_findings or removed_ids:
+            self._publish_findings(container_id, new_findings, removed_ids)
+        
+        return new_findings, removed_ids
+    
+    def _publish_findings(self, container_id: str, new_findings: List[Dict[str, Any]], removed_ids: List[str]) -> None:
+        """Публикация изменений уязвимостей контейнера; большие пакеты передаются только счетчиками"""
+        data = {"container_id": container_id, "added_count": len(new_findings), "removed_count": len(removed_ids)}
+        
+        if len(new_findings) + len(removed_ids) <= settings.EVENTS_MAX_ITEMS:
+            data["added"] = new_findings
+            data["removed"] = removed_ids
+        else:
+            data["truncated"] = True
+        
+        event_bus.publish("findings", "changed", data)
     
     def _parse_vulnerability(self, container_id: str, vuln_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -268,7 +582,8 @@ class ContainerCollector:
             vuln_data: Данные уязвимости из Grype
             
         Returns:
-            Словарь с данными для сохранения в БД или None
+            Словарь с данными для сохранения в БД (без скора, он считается
+            после обогащения) или None
         """
         try:
             # Извлечение CVE ID
@@ -283,20 +598,22 @@ class ContainerCollector:
             package = vuln_data.get("artifact", {})
             vulnerability = vuln_data.get("vulnerability", {})
             
-            # Рассчет скора и факторов
-            cvss = float(vulnerability.get("cvss", [{"metrics": {"baseScore": 0.0}}])[0].get("metrics", {}).get("baseScore", 0.0))
+            # CVSS: первая оценка из отчета (список может быть пустым)
+            cvss_entries = vulnerability.get("cvss") or [{}]
+            metrics = cvss_entries[0].get("metrics") or {}
+            cvss = float(metrics.get("baseScore") or 0.0)
             severity = vulnerability.get("severity", "unknown")
             
-            # Установка весов из настроек
-            impact_factor = 0.5  # Для примера
-            exploit_probability = 0.3  # Для примера
+            # Версия с исправлением (vulnerability.fix); у fix.state not-fixed/wont-fix/unknown версий нет
+            fixed_versions = (vulnerability.get("fix") or {}).get("versions") or [None]
             
-            # Расчет итогового скора
-            score = (
-                settings.ALPHA * cvss +
-                settings.BETA * impact_factor +
-                settings.GAMMA * exploit_probability
-            )
+            # Impact Factor - подоценка воздействия CVSS, нормированная к [0, 1]
+            impact_score = metrics.get("impactScore")
+            if impact_score is None:
+                impact_factor = DEFAULT_IMPACT_FACTOR
+            else:
+                impact_max = CVSS_IMPACT_MAX.get(str(cvss_entries[0].get("version", ""))[:1], CVSS_IMPACT_MAX["3"])
+                impact_factor = min(float(impact_score) / impact_max, 1.0)
             
             # Формирование результата
             return {
@@ -305,14 +622,14 @@ class ContainerCollector:
                 "cve_id": cve_id,
                 "package_name": package.get("name", ""),
                 "package_version": package.get("version", ""),
-                "fixed_version": vuln_data.get("fix", {}).get("versions", [None])[0],
+                "fixed_version": fixed_versions[0],
                 "cvss": cvss,
                 "severity": severity,
                 "description": vulnerability.get("description", ""),
                 "details": vuln_data,
-                "score": score,
                 "impact_factor": impact_factor,
-                "exploit_probability": exploit_probability
+                "exploit_probability": DEFAULT_EXPLOIT_PROBABILITY,
+                "known_exploited": False
             }
         
         except Exception as e:
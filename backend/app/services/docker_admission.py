@@ -0,0 +1,200 @@
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+# Приоритеты вызовов Docker API
+INTERACTIVE = "interactive"  # запросы пользователей API
+BACKGROUND = "background"  # обход контейнеров, патчинг
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Приоритет текущего вызова; asyncio.to_thread переносит значение в поток
+docker_priority: contextvars.ContextVar[str] = contextvars.ContextVar("docker_priority", default=BACKGROUND)
+
+@contextlib.contextmanager
+def interactive() -> Iterator[None]:
+    """Вызовы Docker API внутри блока выполняются с приоритетом пользовательских запросов"""
+    token = docker_priority.set(INTERACTIVE)
+    try:
+        yield
+    finally:
+        docker_priority.reset(token)
+
+class DaemonLimiter:
+    """
+    Ограничение частоты и параллельности запросов к одному Docker daemon
+
+    Частота - token bucket (DOCKER_API_RATE запросов в секунду, запас
+    DOCKER_API_BURST), параллельность - DOCKER_API_CONCURRENCY запросов, из
+    которых DOCKER_API_INTERACTIVE_RESERVED доступны только пользовательским
+    запросам. Пока пользовательский запрос ждет, фоновые не допускаются.
+    """
+
+    def __init__(self, daemon: str):
+        self.daemon = daemon
+        self._condition = threading.Condition()
+        self._tokens = float(settings.DOCKER_API_BURST)
+        self._refilled = time.monotonic()
+        self.in_flight = 0
+        self.waiting: Dict[str, int] = defaultdict(int)
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.throttled: Dict[tuple, int] = defaultdict(int)  # (priority, reason) -> число
+        self.wait_seconds: Dict[str, float] = defaultdict(float)
+
+    @contextlib.contextmanager
+    def admit(self, priority: Optional[str] = None) -> Iterator[None]:
+        """Ожидание допуска запроса; слот занят до выхода из блока"""
+        priority = priority or docker_priority.get()
+        started = time.monotonic()
+        throttled = set()
+
+        with self._condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    reason, delay = self._blocked(priority)
+                    if reason is None:
+                        break
+                    if reason not in throttled:
+                        throttled.add(reason)
+                        self.throttled[(priority, reason)] += 1
+                    self._condition.wait(delay)
+            finally:
+                self.waiting[priority] -= 1
+
+            if settings.DOCKER_API_RATE > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+            self.requests[priority] += 1
+            self.wait_seconds[priority] += time.monotonic() - started
+            # Фоновые запросы ждут, пока в очереди есть пользовательские
+            self._condition.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def _blocked(self, priority: str):
+        """Причина ожидания (concurrency, priority, rate) и время до повторной проверки"""
+        limit = settings.DOCKER_API_CONCURRENCY
+        if limit > 0:
+            if priority != INTERACTIVE:
+                limit = max(limit - settings.DOCKER_API_INTERACTIVE_RESERVED, 1)
+            if self.in_flight >= limit:
+                return "concurrency", None
+
+        if priority != INTERACTIVE and self.waiting[INTERACTIVE] > 0:
+            return "priority", None
+
+        rate = settings.DOCKER_API_RATE
+        if rate > 0:
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._refilled) * rate, float(max(settings.DOCKER_API_BURST, 1)))
+            self._refilled = now
+            if self._tokens < 1:
+                return "rate", (1 - self._tokens) / rate
+
+        return None, None
+
+class DockerAdmission:
+    """Реестр ограничителей по Docker daemon и подключение их к клиентам Docker SDK"""
+
+    def __init__(self):
+        self._limiters: Dict[str, DaemonLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, daemon: str) -> DaemonLimiter:
+        with self._lock:
+            if daemon not in self._limiters:
+                self._limiters[daemon] = DaemonLimiter(daemon)
+            return self._limiters[daemon]
+
+    def attach(self, client: Any) -> Any:
+        """
+        Подключение ограничителя к клиенту (docker.DockerClient)
+
+        Все запросы клиента проходят через Session.send, поэтому ограничение
+        действует и на высокоуровневый API, и на client.api. Для потоковых
+        ответов слот занят до получения заголовков.
+        """
+        api = client.api
+        limiter = self.limiter(_daemon_key(api))
+        send = api.send
+
+        def admitted_send(request, **kwargs):
+            with limiter.admit():
+                return send(request, **kwargs)
+
+        api.send = admitted_send
+        return client
+
+    def render_metrics(self) -> List[str]:
+        """Метрики в текстовом формате Prometheus"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+
+        lines = [
+            "# HELP aegis_docker_api_requests_total Запросы к Docker API, допущенные ограничителем",
+            "# TYPE aegis_docker_api_requests_total counter",
+        ]
+        for limiter in limiters:
+            for priority in PRIORITIES:
+                lines.append(f'aegis_docker_api_requests_total{{daemon="{limiter.daemon}",priority="{priority}"}} {limiter.requests[priority]}')
+
+        lines += [
+            "# HELP aegis_docker_api_throttled_total Запросы к Docker API, ожидавшие допуска, по причине",
+            "# TYPE aegis_docker_api_throttled_total counter",
+        ]
+        for limiter in limiters:
+            for priority in PRIORITIES:
+                for reason in ("rate", "concurrency", "priority"):
+                    count = limiter.throttled[(priority, reason)]
+                    lines.append(
+                        f'aegis_docker_api_throttled_total{{daemon="{limiter.daemon}",priority="{priority}",reason="{reason}"}} {count}'
+                    )
+
+        lines += [
+            "# HELP aegis_docker_api_wait_seconds_total Суммарное ожидание допуска, секунды",
+            "# TYPE aegis_docker_api_wait_seconds_total counter",
+        ]
+        for limiter in limiters:
+            for priority in PRIORITIES:
+                lines.append(
+                    f'aegis_docker_api_wait_seconds_total{{daemon="{limiter.daemon}",priority="{priority}"}} {limiter.wait_seconds[priority]:.6f}'
+                )
+
+        lines += [
+            "# HELP aegis_docker_api_in_flight Выполняющиеся запросы к Docker API",
+            "# TYPE aegis_docker_api_in_flight gauge",
+        ]
+        lines += [f'aegis_docker_api_in_flight{{daemon="{limiter.daemon}"}} {limiter.in_flight}' for limiter in limiters]
+
+        lines += [
+            "# HELP aegis_docker_api_waiting Запросы к Docker API в ожидании допуска",
+            "# TYPE aegis_docker_api_waiting gauge",
+        ]
+        for limiter in limiters:
+            for priority in PRIORITIES:
+                lines.append(f'aegis_docker_api_waiting{{daemon="{limiter.daemon}",priority="{priority}"}} {limiter.waiting[priority]}')
+        return lines
+
+def _daemon_key(api: Any) -> str:
+    """Адрес daemon клиента: у unix socket base_url одинаковый, путь берется из адаптера"""
+    adapter = getattr(api, "_custom_adapter", None)
+    socket_path = getattr(adapter, "socket_path", None)
+    if socket_path:
+        return f"unix://{socket_path}"
+    ssh_host = getattr(adapter, "ssh_host", None)
+    if ssh_host:
+        return f"ssh://{ssh_host}"
+    return api.base_url
+
+# Глобальный реестр ограничителей Docker API
+docker_admission = DockerAdmission()
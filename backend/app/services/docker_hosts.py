@@ -0,0 +1,103 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.docker_admission import docker_admission
+
+# Имя хоста для конфигурации с одним DOCKER_SOCKET
+DEFAULT_HOST = "local"
+
+@dataclass
+class DockerHost:
+    """Docker Engine, с которого коллектор собирает контейнеры"""
+    name: str
+    url: str  # unix:///var/run/docker.sock, tcp://host:2376, ssh://user@host
+    client: Optional[Any] = None  # docker.DockerClient
+    status: str = "pending"  # pending, ok, unreachable, remote (обходится другой репликой)
+    replica: Optional[str] = None  # реплика, обходящая хост
+    containers: int = 0
+    last_seen: Optional[datetime] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None  # длительность последнего обхода, секунды
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get_client(self) -> Any:
+        """Клиент Docker API (docker.DockerClient); подключение выполняется при первом обращении"""
+        import docker
+        
+        with self.lock:
+            if self.client is None:
+                self.client = docker_admission.attach(docker.DockerClient(
+                    base_url=self.url,
+                    timeout=settings.DOCKER_TIMEOUT,
+                    use_ssh_client=self.url.startswith("ssh://"),
+                ))
+            return self.client
+
+    def reset_client(self) -> None:
+        """Сброс подключения после ошибки; следующий обход подключится заново"""
+        with self.lock:
+            client, self.client = self.client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "status": self.status,
+            "replica": self.replica,
+            "containers": self.containers,
+            "last_seen": self.last_seen,
+            "last_error": self.last_error,
+            "last_duration": self.last_duration,
+        }
+
+def parse_docker_endpoints(value: Optional[str], docker_socket: str) -> List[DockerHost]:
+    """
+    Разбор списка Docker Engine из строки вида "name=url,name2=url2"
+
+    Без DOCKER_ENDPOINTS используется один хост "local" на DOCKER_SOCKET.
+    """
+    if not value:
+        return [DockerHost(name=DEFAULT_HOST, url=f"unix://{docker_socket}")]
+
+    hosts: Dict[str, DockerHost] = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Некорректная запись DOCKER_ENDPOINTS: {entry} (ожидается name=url)")
+        name, url = name.strip(), url.strip()
+        if name in hosts:
+            raise ValueError(f"Повторяющееся имя хоста в DOCKER_ENDPOINTS: {name}")
+        hosts[name] = DockerHost(name=name, url=url)
+    return list(hosts.values())
+
+class DockerHostRegistry:
+    """Реестр Docker Engine, обслуживаемых коллектором"""
+
+    def __init__(self):
+        self._hosts: Dict[str, DockerHost] = {}
+
+    def configure(self, hosts: List[DockerHost]) -> None:
+        self._hosts = {host.name: host for host in hosts}
+        logger.info(f"Docker хостов в реестре: {len(hosts)} ({', '.join(self._hosts)})")
+
+    def get(self, name: Optional[str]) -> Optional[DockerHost]:
+        return self._hosts.get(name or DEFAULT_HOST)
+
+    def list(self) -> List[DockerHost]:
+        return list(self._hosts.values())
+
+# Глобальный реестр Docker хостов
+docker_hosts = DockerHostRegistry()
@@ -0,0 +1,260 @@
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+
+# Вероятность эксплуатации для CVE без данных EPSS
+DEFAULT_EXPLOIT_PROBABILITY = 0.3
+
+# Ключ CVE-YYYY-NNNN: YYYY * CVE_KEY_BASE + NNNN
+CVE_KEY_BASE = 10 ** 9
+
+# Файлы индекса (numpy .npy, читаются через mmap)
+INDEX_ARRAYS = ("keys", "epss", "percentile", "kev")
+
+def cve_key(cve_id: Optional[str]) -> int:
+    """Числовой ключ CVE для индекса; -1 для идентификаторов не в формате CVE"""
+    if not cve_id or not cve_id.upper().startswith("CVE-"):
+        return -1
+    parts = cve_id.split("-")
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+        return -1
+    return int(parts[1]) * CVE_KEY_BASE + int(parts[2])
+
+@dataclass
+class ExploitIndex:
+    """Отсортированные по ключу CVE массивы данных EPSS и KEV"""
+    keys: np.ndarray  # int64
+    epss: np.ndarray  # float32, NaN - нет данных EPSS
+    percentile: np.ndarray  # float32
+    kev: np.ndarray  # bool, CVE в каталоге эксплуатируемых уязвимостей
+    signature: str
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """EPSS (NaN - нет данных) и признак KEV для массива ключей"""
+        epss = np.full(len(keys), np.nan, dtype=np.float32)
+        kev = np.zeros(len(keys), dtype=bool)
+        if len(self.keys) == 0 or len(keys) == 0:
+            return epss, kev
+
+        position = np.searchsorted(self.keys, keys)
+        position[position == len(self.keys)] = 0
+        found = (self.keys[position] == keys) & (keys >= 0)
+        epss[found] = self.epss[position[found]]
+        kev[found] = self.kev[position[found]]
+        return epss, kev
+
+class EnrichmentService:
+    """
+    Обогащение уязвимостей данными об эксплуатируемости
+
+    Источники - локальные файлы: оценки EPSS (CSV в формате FIRST, можно .gz)
+    и каталог известных эксплуатируемых уязвимостей (JSON или CSV в формате
+    CISA KEV). Из них собирается индекс - отсортированные массивы ключей CVE и
+    значений в ENRICHMENT_INDEX_DIR, который открывается через mmap и
+    используется всеми процессами. Поиск пачки уязвимостей - один
+    searchsorted по индексу.
+
+    Раз в ENRICHMENT_CHECK_INTERVAL секунд проверяется изменение файлов;
+    новый индекс собирается в фоне и подменяет текущий без перезапуска.
+    """
+
+    def __init__(self):
+        self._index: Optional[ExploitIndex] = None
+        self._sources_signature: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Optional[ExploitIndex]:
+        return self._index
+
+    async def watch(self) -> None:
+        """Периодическая проверка файлов данных"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Ошибка обновления данных обогащения: {str(e)}")
+            await asyncio.sleep(settings.ENRICHMENT_CHECK_INTERVAL)
+
+    def refresh(self) -> bool:
+        """
+        Загрузка индекса, если файлы данных изменились
+
+        Returns:
+            True, если индекс заменен
+        """
+        with self._lock:
+            sources = self._sources()
+            signature = _signature(sources)
+            if signature == self._sources_signature:
+                return False
+
+            if not sources:
+                self._index, self._sources_signature = None, signature
+                logger.info("Файлы данных обогащения не найдены, используются значения по умолчанию")
+                return True
+
+            directory = os.path.join(settings.ENRICHMENT_INDEX_DIR, f"index-{signature}")
+            if not os.path.isdir(directory):
+                self._build(sources, directory)
+
+            index = ExploitIndex(
+                **{name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in INDEX_ARRAYS},
+                signature=signature,
+            )
+            self._index, self._sources_signature = index, signature
+            self._cleanup(directory)
+
+            logger.info(f"Индекс обогащения загружен: {len(index)} CVE, KEV: {int(np.count_nonzero(index.kev))}")
+            return True
+
+    def enrich(self, vulnerabilities: Iterable[Dict[str, Any]]) -> int:
+        """
+        Заполнение exploit_probability и known_exploited для пачки уязвимостей
+
+        Для идентификаторов не в формате CVE (GHSA и др.) используется
+        связанная CVE из отчета сканера.
+
+        Returns:
+            Количество уязвимостей, найденных в индексе
+        """
+        vulnerabilities = list(vulnerabilities)
+        index = self._index
+        if index is None or not vulnerabilities:
+            for vulnerability in vulnerabilities:
+                vulnerability.setdefault("exploit_probability", DEFAULT_EXPLOIT_PROBABILITY)
+                vulnerability.setdefault("known_exploited", False)
+            return 0
+
+        keys = np.fromiter((_lookup_key(vulnerability) for vulnerability in vulnerabilities), dtype=np.int64)
+        epss, kev = index.lookup(keys)
+
+        found = 0
+        for vulnerability, probability, exploited in zip(vulnerabilities, epss.tolist(), kev.tolist()):
+            known = exploited or not np.isnan(probability)
+            if exploited:
+                # Известная эксплуатация важнее прогноза EPSS
+                probability = 1.0
+            elif not known:
+                probability = DEFAULT_EXPLOIT_PROBABILITY
+            found += known
+            vulnerability["exploit_probability"] = probability
+            vulnerability["known_exploited"] = exploited
+        return found
+
+    def _sources(self) -> Dict[str, str]:
+        sources = {}
+        for name, path in (("epss", settings.ENRICHMENT_EPSS_FILE), ("kev", settings.ENRICHMENT_KEV_FILE)):
+            if path and os.path.isfile(path):
+                sources[name] = path
+        return sources
+
+    def _build(self, sources: Dict[str, str], directory: str) -> None:
+        """Сборка индекса из файлов данных во временный каталог и атомарная публикация"""
+        epss: Dict[int, Tuple[float, float]] = {}
+        if "epss" in sources:
+            epss = _read_epss(sources["epss"])
+        kev = _read_kev(sources["kev"]) if "kev" in sources else set()
+
+        keys = np.array(sorted(set(epss) | kev), dtype=np.int64)
+        values = np.array([epss.get(key, (np.nan, np.nan)) for key in keys.tolist()], dtype=np.float32).reshape(-1, 2)
+        arrays = {
+            "keys": keys,
+            "epss": np.ascontiguousarray(values[:, 0]),
+            "percentile": np.ascontiguousarray(values[:, 1]),
+            "kev": np.isin(keys, np.fromiter(kev, dtype=np.int64, count=len(kev))),
+        }
+
+        os.makedirs(settings.ENRICHMENT_INDEX_DIR, exist_ok=True)
+        staging = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Индекс уже собран другим процессом
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _cleanup(self, current: str) -> None:
+        """Удаление старых индексов (открытые через mmap файлы остаются доступны до закрытия)"""
+        for name in os.listdir(settings.ENRICHMENT_INDEX_DIR):
+            path = os.path.join(settings.ENRICHMENT_INDEX_DIR, name)
+            if path != current and name.startswith("index-") and ".tmp-" not in name:
+                shutil.rmtree(path, ignore_errors=True)
+
+def _signature(sources: Dict[str, str]) -> str:
+    """Подпись набора файлов данных по пути, размеру и времени изменения"""
+    digest = hashlib.sha1()
+    for name, path in sorted(sources.items()):
+        stat = os.stat(path)
+        digest.update(f"{name}:{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def _read_epss(path: str) -> Dict[int, Tuple[float, float]]:
+    """CSV EPSS: строка-комментарий #model_version..., заголовок cve,epss,percentile"""
+    result = {}
+    with _open_text(path) as file:
+        reader = csv.reader(line for line in file if not line.startswith("#"))
+        header = [column.strip().lower() for column in next(reader, [])]
+        try:
+            cve_column, epss_column = header.index("cve"), header.index("epss")
+        except ValueError:
+            raise ValueError(f"Некорректный заголовок файла EPSS {path}: {header}")
+        percentile_column = header.index("percentile") if "percentile" in header else None
+
+        for row in reader:
+            key = cve_key(row[cve_column]) if len(row) > epss_column else -1
+            if key < 0:
+                continue
+            try:
+                epss = float(row[epss_column])
+                percentile = float(row[percentile_column]) if percentile_column is not None else np.nan
+            except (ValueError, IndexError):
+                continue
+            result[key] = (epss, percentile)
+    return result
+
+def _read_kev(path: str) -> set:
+    """Каталог KEV: JSON ({"vulnerabilities": [{"cveID": ...}]}) или CSV с колонкой cveID"""
+    with _open_text(path) as file:
+        if path.endswith((".json", ".json.gz")):
+            cve_ids = [item.get("cveID") for item in json.load(file).get("vulnerabilities", [])]
+        else:
+            cve_ids = [row.get("cveID") for row in csv.DictReader(file)]
+    return {key for key in map(cve_key, cve_ids) if key >= 0}
+
+def _lookup_key(vulnerability: Dict[str, Any]) -> int:
+    key = cve_key(vulnerability.get("cve_id"))
+    if key >= 0:
+        return key
+    for related in (vulnerability.get("details") or {}).get("relatedVulnerabilities") or []:
+        key = cve_key(related.get("id"))
+        if key >= 0:
+            return key
+    return -1
+
+# Глобальный сервис обогащения
+enrichment = EnrichmentService()
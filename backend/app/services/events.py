@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from app.core.config import settings
+
+# Поддерживаемые темы событий
+EVENT_TOPICS = ("containers", "scans", "findings", "plan")
+
+@dataclass
+class Event:
+    """Событие об изменении состояния"""
+    seq: int
+    topic: str
+    type: str
+    data: Dict[str, Any]
+    ts: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "topic": self.topic, "type": self.type, "data": self.data, "ts": self.ts}
+
+@dataclass(eq=False)
+class Subscription:
+    """Подписка клиента на темы событий"""
+    topics: Set[str]
+    queue: asyncio.Queue
+    backlog: List[Event] = field(default_factory=list)
+    resync: bool = False  # клиент пропустил события и должен перечитать списки целиком
+
+class EventBus:
+    """
+    Шина событий для потоковой доставки изменений клиентам
+
+    Хранит последние события в кольцевом буфере, чтобы переподключившийся клиент
+    мог продолжить с известного номера последовательности. Публикация безопасна
+    из любого потока: доставка подписчикам выполняется в event loop.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        """
+        Инициализация шины
+
+        Args:
+            buffer_size: Количество последних событий для возобновления потока
+            queue_size: Размер очереди одного подписчика
+        """
+        self.queue_size = queue_size
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Привязка к event loop сервера"""
+        self._loop = loop
+
+    def publish(self, topic: str, type: str, data: Dict[str, Any]) -> int:
+        """
+        Публикация события
+
+        Args:
+            topic: Тема (containers, scans, findings, plan)
+            type: Тип изменения (created, updated, removed, ...)
+            data: Данные изменения
+
+        Returns:
+            Номер события в последовательности
+        """
+        with self._lock:
+            self._seq += 1
+            event = Event(seq=self._seq, topic=topic, type=type, data=data, ts=time.time())
+            self._buffer.append(event)
+            targets = [sub for sub in self._subscribers if topic in sub.topics]
+
+        if targets and self._loop is not None and not self._loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+
+            if running is self._loop:
+                self._deliver(targets, event)
+            else:
+                self._loop.call_soon_threadsafe(self._deliver, targets, event)
+
+        return event.seq
+
+    def subscribe(self, topics: Iterable[str], since: Optional[int] = None) -> Subscription:
+        """
+        Подписка на темы с возможностью возобновления
+
+        Args:
+            topics: Темы событий
+            since: Номер последнего полученного клиентом события
+
+        Returns:
+            Подписка с пропущенными событиями в backlog
+        """
+        sub = Subscription(topics=set(topics), queue=asyncio.Queue(maxsize=self.queue_size))
+
+        with self._lock:
+            if since is not None:
+                oldest = self._buffer[0].seq if self._buffer else self._seq + 1
+                # Пропущенные события вытеснены из буфера или сервер перезапускался
+                if since < oldest - 1 or since > self._seq:
+                    sub.resync = True
+                else:
+                    sub.backlog = [e for e in self._buffer if e.seq > since and e.topic in sub.topics]
+            self._subscribers.add(sub)
+
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _deliver(self, targets: List[Subscription], event: Event) -> None:
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Медленный клиент: очередь сбрасывается, клиент перечитает состояние
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.resync = True
+                sub.queue.put_nowait(None)
+                logger.debug("Переполнение очереди подписчика событий, отправлен resync")
+
+def parse_topics(value: Optional[str]) -> List[str]:
+    """Разбор списка тем из строки вида "containers,scans"; пустое значение - все темы"""
+    if not value:
+        return list(EVENT_TOPICS)
+    topics = [topic.strip() for topic in value.split(",") if topic.strip()]
+    unknown = [topic for topic in topics if topic not in EVENT_TOPICS]
+    if unknown:
+        raise ValueError(f"Неизвестные темы: {', '.join(unknown)}")
+    return topics
+
+# Глобальный экземпляр шины событий
+event_bus = EventBus(buffer_size=settings.EVENTS_BUFFER_SIZE, queue_size=settings.EVENTS_QUEUE_SIZE)
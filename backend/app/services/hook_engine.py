@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.hook import Hook, HookExecution
+
+# События хуков, соответствующие переходам статуса задачи плана патчинга
+PLAN_STATUS_EVENTS = {
+    "in_progress": "pre_patch",
+    "completed": "post_patch",
+    "failed": "on_failure",
+    "rolled_back": "on_rollback",
+}
+
+def plan_event_payload(plan: Any) -> Dict[str, Any]:
+    """Данные события для задачи плана патчинга"""
+    return {
+        "plan_id": plan.id,
+        "container_id": plan.container_id,
+        "vulnerability_id": plan.vulnerability_id,
+        "scenario": plan.scenario.value if plan.scenario else None,
+        "start_time": plan.start_time.isoformat() if plan.start_time else None,
+        "duration": plan.duration,
+        "priority": plan.priority,
+        "status": plan.status,
+        "target_image": plan.target_image,
+    }
+
+@dataclass
+class HookJob:
+    """Задача на запуск одного хука"""
+    hook_id: int
+    hook_name: str
+    script: str
+    timeout: int
+    event: str
+    payload: Dict[str, Any]
+    items: int = 1
+    future: Optional[asyncio.Future] = None
+
+class HookEngine:
+    """
+    Движок выполнения пользовательских хуков
+
+    Хуки запускаются как асинхронные подпроцессы (/bin/sh -c script) ограниченным
+    пулом воркеров. Данные события передаются в stdin в виде JSON, тип события -
+    в переменной окружения AEGIS_EVENT.
+
+    Включенные хуки события кэшируются на HOOK_CACHE_TTL секунд; API хуков
+    сбрасывает кэш при изменениях (invalidate), изменения через другую реплику
+    видны после истечения TTL. Запросы к БД выполняются вне event loop.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        """
+        Инициализация движка
+
+        Args:
+            workers: Количество одновременно выполняемых хуков
+            queue_size: Максимальная длина очереди ожидающих запусков
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.dropped = 0  # запуски, не поставленные в заполненную очередь
+        self._tasks: List[asyncio.Task] = []
+        self._hooks: Dict[str, Tuple[float, List[Hook]]] = {}  # событие -> (время загрузки, хуки)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Запуск пула воркеров"""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"hook-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Запущен движок хуков: воркеров={self.workers}, очередь={self.queue_size}")
+
+    async def stop(self) -> None:
+        """Остановка пула воркеров"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Движок хуков остановлен")
+
+    async def emit(self, event: str, payload: Dict[str, Any], items: int = 1) -> int:
+        """
+        Постановка в очередь всех включенных хуков для события
+
+        Не ждет места в очереди: вызывающий (API, коллектор) не блокируется
+        медленными хуками, при заполненной очереди запуски отбрасываются.
+
+        Args:
+            event: Тип события (on_detect, pre_patch, post_patch, on_failure, on_rollback)
+            payload: Данные события
+            items: Количество объектов в пакетном событии
+
+        Returns:
+            Количество поставленных в очередь запусков
+        """
+        if not self.running:
+            logger.debug(f"Движок хуков не запущен, событие {event} пропущено")
+            return 0
+
+        hooks = await self._enabled_hooks(event)
+        queued = 0
+        for hook in hooks:
+            try:
+                self.queue.put_nowait(self._make_job(hook, event, payload, items))
+                queued += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+                logger.warning(
+                    f"Очередь хуков заполнена ({self.queue_size}), запуск {hook.name} для события {event} пропущен "
+                    f"(всего пропущено: {self.dropped})"
+                )
+
+        if queued:
+            logger.info(f"Событие {event}: в очередь поставлено хуков: {queued}")
+        return queued
+
+    async def run(self, hook: Hook, payload: Dict[str, Any]) -> HookExecution:
+        """
+        Ручной запуск хука через общий пул с ожиданием результата
+
+        Args:
+            hook: Хук из БД
+            payload: Данные события
+
+        Returns:
+            Запись журнала запуска
+        """
+        if not self.running:
+            raise RuntimeError("Движок хуков не запущен")
+
+        job = self._make_job(hook, hook.type, payload, 1)
+        job.future = asyncio.get_running_loop().create_future()
+        await self.queue.put(job)
+        return await job.future
+
+    def render_metrics(self) -> List[str]:
+        """Метрики в текстовом формате Prometheus"""
+        return [
+            "# HELP aegis_hook_queue_size Запуски хуков в очереди",
+            "# TYPE aegis_hook_queue_size gauge",
+            f"aegis_hook_queue_size {self.queue.qsize() if self.queue else 0}",
+            "# HELP aegis_hook_dropped_total Запуски хуков, пропущенные из-за заполненной очереди",
+            "# TYPE aegis_hook_dropped_total counter",
+            f"aegis_hook_dropped_total {self.dropped}",
+        ]
+
+    def invalidate(self) -> None:
+        """Сброс кэша хуков после создания, изменения или удаления"""
+        self._hooks.clear()
+
+    async def _enabled_hooks(self, event: str) -> List[Hook]:
+        cached = self._hooks.get(event)
+        if cached and time.monotonic() - cached[0] < settings.HOOK_CACHE_TTL:
+            return cached[1]
+        loaded_at = time.monotonic()
+        hooks = await asyncio.to_thread(self._load_hooks, event)
+        self._hooks[event] = (loaded_at, hooks)
+        return hooks
+
+    def _load_hooks(self, event: str) -> List[Hook]:
+        db = SessionLocal()
+        try:
+            hooks = db.query(Hook).filter(Hook.type == event, Hook.enabled == True).all()  # noqa: E712
+            for hook in hooks:
+                db.expunge(hook)
+            return hooks
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке хуков для события {event}: {str(e)}")
+            return []
+        finally:
+            db.close()
+
+    def _make_job(self, hook: Hook, event: str, payload: Dict[str, Any], items: int) -> HookJob:
+        return HookJob(
+            hook_id=hook.id,
+            hook_name=hook.name,
+            script=hook.script,
+            timeout=hook.timeout or settings.HOOK_DEFAULT_TIMEOUT,
+            event=event,
+            payload=payload,
+            items=items,
+        )
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                execution = await self._execute(job)
+                if job.future and not job.future.done():
+                    job.future.set_result(execution)
+            except asyncio.CancelledError:
+                if job.future and not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при выполнении хука {job.hook_name}: {str(e)}")
+                if job.future and not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def _execute(self, job: HookJob) -> HookExecution:
+        """
+        Выполнение хука в подпроцессе с таймаутом и захватом вывода
+
+        Args:
+            job: Задача на запуск
+
+        Returns:
+            Запись журнала запуска
+        """
+        started_at = datetime.now()
+        started = time.monotonic()
+        status, exit_code, stdout, stderr = "error", None, b"", b""
+
+        env = {
+            **os.environ,
+            "AEGIS_EVENT": job.event,
+            "AEGIS_HOOK_NAME": job.hook_name,
+            "AEGIS_EVENT_ITEMS": str(job.items),
+        }
+
+        try:
+            # Отдельная группа процессов, чтобы по таймауту завершить и дочерние процессы скрипта
+            process = await asyncio.create_subprocess_exec(
+                "/bin/sh", "-c", job.script,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+                start_new_session=True,
+            )
+
+            try:
+                stdout, stderr, exit_code = await asyncio.wait_for(
+                    self._communicate(process, json.dumps(job.payload, default=str).encode()),
+                    timeout=job.timeout
+                )
+                status = "success" if exit_code == 0 else "failed"
+            except asyncio.TimeoutError:
+                status = "timeout"
+                self._kill(process)
+                exit_code = await process.wait()
+                logger.warning(f"Хук {job.hook_name} прерван по таймауту ({job.timeout}с)")
+            except asyncio.CancelledError:
+                self._kill(process)
+                raise
+
+        except OSError as e:
+            stderr = str(e).encode()
+            logger.error(f"Не удалось запустить хук {job.hook_name}: {str(e)}")
+
+        execution = HookExecution(
+            hook_id=job.hook_id,
+            hook_name=job.hook_name,
+            event=job.event,
+            items=job.items,
+            status=status,
+            exit_code=exit_code,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+            started_at=started_at,
+            finished_at=datetime.now(),
+            duration_ms=int((time.monotonic() - started) * 1000),
+        )
+        await asyncio.to_thread(self._record, execution)
+
+        logger.info(f"Хук {job.hook_name} ({job.event}): {status}, код {exit_code}, {execution.duration_ms} мс")
+        return execution
+
+    async def _communicate(self, process: asyncio.subprocess.Process, data: bytes):
+        """Передача данных в stdin и чтение вывода с ограничением объема"""
+        async def feed():
+            try:
+                process.stdin.write(data)
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # Скрипт не читает stdin
+                pass
+            finally:
+                process.stdin.close()
+
+        _, stdout, stderr = await asyncio.gather(
+            feed(),
+            self._read_limited(process.stdout),
+            self._read_limited(process.stderr),
+        )
+        exit_code = await process.wait()
+        return stdout, stderr, exit_code
+
+    async def _read_limited(self, stream: asyncio.StreamReader) -> bytes:
+        """Чтение потока до конца с сохранением не более HOOK_OUTPUT_LIMIT байт"""
+        limit = settings.HOOK_OUTPUT_LIMIT
+        chunks, size = [], 0
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            if size < limit:
+                chunks.append(chunk[:limit - size])
+            size += len(chunk)
+
+        output = b"".join(chunks)
+        if size > limit:
+            output += f"\n... [обрезано {size - limit} байт]".encode()
+        return output
+
+    def _kill(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _record(self, execution: HookExecution) -> None:
+        db = SessionLocal()
+        try:
+            db.add(execution)
+            db.commit()
+            db.refresh(execution)
+            db.expunge(execution)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при сохранении журнала хука {execution.hook_name}: {str(e)}")
+        finally:
+            db.close()
+
+# Глобальный экземпляр движка хуков
+hook_engine = HookEngine(workers=settings.HOOK_WORKERS, queue_size=settings.HOOK_QUEUE_SIZE)
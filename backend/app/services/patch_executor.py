@@ -0,0 +1,437 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.container import Container
+from app.models.patch_plan import PatchPlan, PatchScenario
+from app.services.docker_hosts import docker_hosts, DEFAULT_HOST
+from app.services.events import event_bus
+from app.services.hook_engine import hook_engine, plan_event_payload, PLAN_STATUS_EVENTS
+
+if TYPE_CHECKING:
+    import docker
+
+# Суффиксы имен временных контейнеров
+BACKUP_SUFFIX = "-aegis-old"
+GREEN_SUFFIX = "-aegis-green"
+
+class PatchRolledBack(Exception):
+    """Патчинг не удался, контейнеры возвращены в исходное состояние"""
+
+@dataclass
+class Replacement:
+    """Контейнер, замененный новым; старый хранится под BACKUP_SUFFIX до завершения задачи"""
+    api: Any  # docker.APIClient
+    container_id: str  # старый контейнер
+    new_id: Optional[str]
+    name: str
+    was_running: bool
+
+def target_image(image: str, package_name: Optional[str], fixed_version: Optional[str]) -> str:
+    """
+    Образ с исправлением для задачи без явного target_image
+
+    Если уязвимый пакет - само приложение образа (последняя часть имени
+    репозитория совпадает с именем пакета), берется тег версии исправления с
+    прежним суффиксом варианта: redis:7.0.11-alpine -> redis:7.0.12-alpine.
+    Иначе образ пересобирается с обновленным пакетом и публикуется по шаблону
+    PATCH_TARGET_IMAGE ({repository}, {tag}, {package}, {fixed_version}).
+    """
+    from docker.utils import parse_repository_tag
+
+    repository, tag = parse_repository_tag(image)
+    tag = tag or "latest"
+    if package_name and fixed_version and repository.rsplit("/", 1)[-1].lower() == package_name.lower():
+        variant = tag.partition("-")[2] if tag[:1].isdigit() else ""
+        return f"{repository}:{fixed_version}" + (f"-{variant}" if variant else "")
+    return settings.PATCH_TARGET_IMAGE.format(
+        repository=repository, tag=tag, package=package_name or "", fixed_version=fixed_version or ""
+    )
+
+def _publish(plan: PatchPlan) -> None:
+    event_bus.publish("plan", "updated", {
+        **plan_event_payload(plan),
+        "actual_duration": plan.actual_duration,
+        "error": plan.error,
+    })
+
+class PatchExecutor:
+    """
+    Выполнение задач плана патчинга через Docker API
+
+    Сценарии:
+    - hot-patch - пересоздание всех контейнеров действия с новым образом одновременно;
+    - rolling-update - пересоздание контейнеров по одному с ожиданием готовности;
+    - blue-green - новый контейнер запускается рядом со старым (те же сети и алиасы),
+      старый удаляется только после проверки готовности нового. Контейнер с
+      опубликованными портами хоста проверяется без портов, затем пересоздается на месте.
+
+    Старые контейнеры удаляются только после обновления всех контейнеров
+    задачи; при ошибке все обновленные контейнеры задачи возвращаются к старому
+    образу (статус rolled_back), не восстановленные перечисляются в error
+    (статус failed). Задачи одного образа выполняются последовательно, одновременно выполняется
+    не более PATCH_LANES задач и не более PATCH_HOST_CONCURRENCY задач на хосте.
+    Образы загружаются заранее, за PATCH_PREPULL_LEAD секунд до начала задачи.
+
+    Используются только вызовы Docker Engine API (inspect, pull, create, start,
+    stop, rename, remove, connect), поэтому исполнитель можно проверить на
+    локальной заглушке API, указав ее в DOCKER_ENDPOINTS.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._pulls: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(max(settings.PATCH_LANES, 1))
+        self._pull_slots = asyncio.Semaphore(max(settings.PATCH_PREPULL_CONCURRENCY, 1))
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._image_locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def running(self) -> List[int]:
+        """ID задач плана, принятых к выполнению"""
+        return list(self._tasks)
+
+    def submit(self, plan_ids: Optional[List[int]] = None, follow_schedule: bool = True) -> List[int]:
+        """
+        Запуск выполнения задач плана
+
+        Задача захватывается условным обновлением статуса pending -> queued,
+        поэтому при нескольких репликах каждая задача выполняется один раз.
+
+        Args:
+            plan_ids: ID задач (None = все задачи в статусе pending)
+            follow_schedule: Начинать задачи по start_time (False = сразу)
+
+        Returns:
+            ID принятых задач
+        """
+        db = SessionLocal()
+        try:
+            query = db.query(PatchPlan.id, PatchPlan.start_time).filter(PatchPlan.status == "pending")
+            if plan_ids:
+                query = query.filter(PatchPlan.id.in_(plan_ids))
+
+            accepted = []
+            for plan_id, start_time in query.order_by(PatchPlan.start_time).all():
+                claimed = (
+                    db.query(PatchPlan)
+                    .filter(PatchPlan.id == plan_id, PatchPlan.status == "pending")
+                    .update({PatchPlan.status: "queued", PatchPlan.error: None}, synchronize_session=False)
+                )
+                db.commit()
+                if not claimed:
+                    continue
+
+                start_at = start_time.timestamp() if follow_schedule and start_time else time.time()
+                self._tasks[plan_id] = asyncio.create_task(self._run(plan_id, start_at), name=f"patch-{plan_id}")
+                accepted.append(plan_id)
+        finally:
+            db.close()
+
+        if accepted:
+            logger.info(f"Задач плана принято к выполнению: {len(accepted)}")
+        return accepted
+
+    async def stop(self) -> None:
+        """Остановка: невыполненные задачи возвращаются в pending"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, plan_id: int, start_at: float) -> None:
+        started = False
+        try:
+            plan, targets = self._load(plan_id)
+
+            # Предварительная загрузка образа на все хосты задачи
+            await asyncio.sleep(max(0.0, start_at - settings.PATCH_PREPULL_LEAD - time.time()))
+            pulls = [self._prepull(host, plan.target_image) for host in targets]
+
+            await asyncio.sleep(max(0.0, start_at - time.time()))
+
+            host_slots = [self._host_slot(host) for host in sorted(targets)]
+            async with self._image_lock(plan.image or plan.container_id), self._slots:
+                for slot in host_slots:
+                    await slot.acquire()
+                try:
+                    started = True
+                    self._set_status(plan_id, "in_progress", started_at=datetime.now())
+                    await asyncio.gather(*pulls)
+                    await self._apply(plan.scenario, plan.target_image, targets)
+                    self._finish(plan_id, "completed")
+                finally:
+                    for slot in host_slots:
+                        slot.release()
+
+        except asyncio.CancelledError:
+            if started:
+                self._finish(plan_id, "failed", "Выполнение прервано остановкой сервера")
+            else:
+                self._set_status(plan_id, "pending")
+            raise
+        except PatchRolledBack as e:
+            self._finish(plan_id, "rolled_back", str(e))
+        except Exception as e:
+            logger.error(f"Ошибка выполнения задачи плана {plan_id}: {str(e)}")
+            self._finish(plan_id, "failed", str(e))
+        finally:
+            self._tasks.pop(plan_id, None)
+            if not self._tasks:
+                self._pulls.clear()
+
+    def _load(self, plan_id: int) -> Tuple[PatchPlan, Dict[str, List[str]]]:
+        """Задача плана и ее контейнеры по Docker хостам; определяет target_image"""
+        db = SessionLocal()
+        try:
+            plan = db.query(PatchPlan).filter(PatchPlan.id == plan_id).first()
+            container_ids = plan.container_ids or [plan.container_id]
+            containers = db.query(Container.id, Container.host, Container.image).filter(Container.id.in_(container_ids)).all()
+
+            if not plan.target_image:
+                image = next((image for _, _, image in containers if image), None)
+                if not image or image.startswith("sha256:"):
+                    raise ValueError("Не задан target_image: образ контейнера не имеет тега")
+                plan.target_image = target_image(image, plan.package_name, plan.fixed_version)
+                db.commit()
+                db.refresh(plan)
+
+            targets: Dict[str, List[str]] = {}
+            for container_id, host, _ in containers:
+                targets.setdefault(host or DEFAULT_HOST, []).append(container_id)
+            if not targets:
+                raise ValueError("Контейнеры задачи не найдены")
+
+            db.expunge(plan)
+            return plan, targets
+        finally:
+            db.close()
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            limit = settings.PATCH_HOST_CONCURRENCY or max(settings.PATCH_LANES, 1)
+            self._host_slots[host] = asyncio.Semaphore(limit)
+        return self._host_slots[host]
+
+    def _image_lock(self, image: str) -> asyncio.Lock:
+        return self._image_locks.setdefault(image, asyncio.Lock())
+
+    def _client(self, host: str) -> "docker.DockerClient":
+        docker_host = docker_hosts.get(host)
+        if docker_host is None:
+            raise ValueError(f"Docker хост {host} не настроен")
+        return docker_host.get_client()
+
+    def _prepull(self, host: str, image: str) -> asyncio.Task:
+        """Загрузка образа на хост; одновременные запросы одного образа объединяются"""
+        key = (host, image)
+        task = self._pulls.get(key)
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            async def pull():
+                from docker.utils import parse_repository_tag
+                
+                async with self._pull_slots:
+                    started = time.monotonic()
+                    repository, tag = parse_repository_tag(image)
+                    await asyncio.to_thread(self._client(host).images.pull, repository, tag or "latest")
+                    logger.info(f"Образ {image} загружен на {host} за {time.monotonic() - started:.1f}с")
+
+            task = self._pulls[key] = asyncio.create_task(pull(), name=f"pull-{host}-{image}")
+        return task
+
+    async def _apply(self, scenario: PatchScenario, image: str, targets: Dict[str, List[str]]) -> None:
+        """Выполнение сценария для контейнеров задачи; при ошибке откатываются все обновленные"""
+        work = [(host, container_id) for host, ids in targets.items() for container_id in ids]
+        replaced: List[Replacement] = []
+
+        try:
+            if scenario == PatchScenario.HOT_PATCH:
+                results = await asyncio.gather(
+                    *[asyncio.to_thread(self._replace, self._client(host).api, container_id, image) for host, container_id in work],
+                    return_exceptions=True
+                )
+                replaced = [result for result in results if isinstance(result, Replacement)]
+                errors = [e for e in results if isinstance(e, BaseException)]
+                if errors:
+                    raise errors[0]
+
+            else:
+                switch = self._replace if scenario == PatchScenario.ROLLING_UPDATE else self._blue_green
+                for host, container_id in work:
+                    replaced.append(await asyncio.to_thread(switch, self._client(host).api, container_id, image))
+
+        except Exception as e:
+            await asyncio.to_thread(self._rollback, replaced, e, len(work))
+            raise
+
+        for replacement in replaced:
+            try:
+                await asyncio.to_thread(replacement.api.remove_container, replacement.container_id, v=False)
+            except Exception as e:
+                logger.warning(f"Не удалось удалить старый контейнер {replacement.name}{BACKUP_SUFFIX}: {str(e)}")
+
+    def _rollback(self, replaced: List[Replacement], error: Exception, total: int) -> None:
+        """Возврат обновленных контейнеров задачи к старым (блокирующие вызовы)"""
+        failed = []
+        for replacement in reversed(replaced):
+            try:
+                self._restore(replacement)
+            except Exception as e:
+                failed.append(f"{replacement.name} ({replacement.new_id}): {e}")
+
+        if failed:
+            raise RuntimeError(f"{error}; откат не удался, на новом образе остались: {'; '.join(failed)}")
+        if isinstance(error, PatchRolledBack):
+            raise PatchRolledBack(f"{error} (откачено обновленных контейнеров: {len(replaced)} из {total})")
+
+    def _restore(self, replacement: Replacement) -> None:
+        """Удаление нового контейнера и возврат старого под прежним именем"""
+        api = replacement.api
+        if replacement.new_id:
+            api.remove_container(replacement.new_id, force=True)
+        api.rename(replacement.container_id, replacement.name)
+        if replacement.was_running:
+            api.start(replacement.container_id)
+
+    def _replace(self, api: "docker.APIClient", container_id: str, image: str) -> Replacement:
+        """
+        Пересоздание контейнера с новым образом на месте (блокирующие вызовы)
+
+        Returns:
+            Замена; старый контейнер остановлен и переименован
+        """
+        attrs = api.inspect_container(container_id)
+        name = attrs["Name"].lstrip("/")
+        replacement = Replacement(api, container_id, None, name, attrs["State"]["Running"])
+
+        api.rename(container_id, name + BACKUP_SUFFIX)
+        try:
+            api.stop(container_id, timeout=settings.PATCH_STOP_TIMEOUT)
+            replacement.new_id = self._create(api, attrs, name, image)
+            api.start(replacement.new_id)
+            self._wait_ready(api, replacement.new_id)
+        except Exception as e:
+            # Возврат к старому контейнеру
+            try:
+                self._restore(replacement)
+            except Exception as restore_error:
+                raise RuntimeError(f"{name}: {e}; откат не удался: {restore_error}")
+            raise PatchRolledBack(f"{name}: {e}")
+
+        return replacement
+
+    def _blue_green(self, api: "docker.APIClient", container_id: str, image: str) -> Replacement:
+        """Запуск нового контейнера рядом со старым и переключение после проверки"""
+        attrs = api.inspect_container(container_id)
+        name = attrs["Name"].lstrip("/")
+        publishes = any(attrs["HostConfig"].get("PortBindings") or {})
+
+        green_id = None
+        try:
+            green_id = self._create(api, attrs, name + GREEN_SUFFIX, image, publish=False)
+            api.start(green_id)
+            self._wait_ready(api, green_id)
+        except Exception as e:
+            if green_id:
+                api.remove_container(green_id, force=True)
+            raise PatchRolledBack(f"{name}: {e}")
+
+        if publishes:
+            # Порты хоста заняты старым контейнером: проверенный образ запускается на месте
+            api.remove_container(green_id, force=True)
+            return self._replace(api, container_id, image)
+
+        api.stop(container_id, timeout=settings.PATCH_STOP_TIMEOUT)
+        api.rename(container_id, name + BACKUP_SUFFIX)
+        api.rename(green_id, name)
+        return Replacement(api, container_id, green_id, name, attrs["State"]["Running"])
+
+    def _create(self, api: "docker.APIClient", attrs: Dict[str, Any], name: str, image: str, publish: bool = True) -> str:
+        """Создание контейнера с конфигурацией существующего и другим образом"""
+        config = dict(attrs["Config"])
+        config["Image"] = image
+        if config.get("Hostname") == attrs["Id"][:12]:
+            config.pop("Hostname")
+
+        host_config = dict(attrs["HostConfig"])
+        if not publish:
+            host_config.pop("PortBindings", None)
+            host_config["PublishAllPorts"] = False
+        config["HostConfig"] = host_config
+
+        # Сети: первая - при создании, остальные подключаются после
+        networks = []
+        network_mode = host_config.get("NetworkMode") or ""
+        if network_mode not in ("host", "none") and not network_mode.startswith("container:"):
+            for network, endpoint in (attrs.get("NetworkSettings", {}).get("Networks") or {}).items():
+                aliases = [alias for alias in endpoint.get("Aliases") or [] if alias != attrs["Id"][:12]]
+                networks.append((network, {"Aliases": aliases or None, "IPAMConfig": endpoint.get("IPAMConfig")}))
+        if networks:
+            config["NetworkingConfig"] = {"EndpointsConfig": dict(networks[:1])}
+
+        new_id = api.create_container_from_config(config, name=name)["Id"]
+        for network, endpoint in networks[1:]:
+            api.connect_container_to_network(new_id, network, aliases=endpoint["Aliases"])
+        return new_id
+
+    def _wait_ready(self, api: "docker.APIClient", container_id: str) -> None:
+        """Ожидание запуска контейнера и успешного healthcheck (если он задан)"""
+        deadline = time.monotonic() + settings.PATCH_HEALTH_TIMEOUT
+        while True:
+            state = api.inspect_container(container_id)["State"]
+            health = (state.get("Health") or {}).get("Status")
+            if state["Status"] in ("exited", "dead"):
+                raise RuntimeError(f"контейнер завершился с кодом {state.get('ExitCode')}")
+            if health == "unhealthy":
+                raise RuntimeError("healthcheck не пройден")
+            if state["Running"] and health in (None, "healthy"):
+                return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"контейнер не готов за {settings.PATCH_HEALTH_TIMEOUT}с")
+            time.sleep(1.0)
+
+    def _set_status(self, plan_id: int, status: str, **values) -> Optional[PatchPlan]:
+        db = SessionLocal()
+        try:
+            plan = db.query(PatchPlan).filter(PatchPlan.id == plan_id).first()
+            if plan is None:
+                return None
+            plan.status = status
+            for key, value in values.items():
+                setattr(plan, key, value)
+            db.commit()
+            db.refresh(plan)
+            db.expunge(plan)
+        finally:
+            db.close()
+
+        _publish(plan)
+        event = PLAN_STATUS_EVENTS.get(status)
+        if event:
+            asyncio.get_running_loop().create_task(hook_engine.emit(event, plan_event_payload(plan)))
+        return plan
+
+    def _finish(self, plan_id: int, status: str, error: Optional[str] = None) -> None:
+        finished_at = datetime.now()
+        db = SessionLocal()
+        try:
+            started_at = db.query(PatchPlan.started_at).filter(PatchPlan.id == plan_id).scalar()
+        finally:
+            db.close()
+
+        self._set_status(
+            plan_id, status,
+            finished_at=finished_at,
+            actual_duration=(finished_at - started_at).total_seconds() if started_at else None,
+            error=error
+        )
+        logger.info(f"Задача плана {plan_id}: {status}" + (f" ({error})" if error else ""))
+
+# Глобальный исполнитель плана
+patch_executor = PatchExecutor()
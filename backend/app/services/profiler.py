@@ -0,0 +1,263 @@
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+@dataclass
+class ProfileArtifact:
+    """Сохраненный результат профилирования, доступный для скачивания"""
+    id: str
+    kind: str  # cpu, memory, request
+    filename: str
+    media_type: str
+    data: bytes
+    created_at: datetime = field(default_factory=datetime.now)
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "size": len(self.data),
+            "created_at": self.created_at,
+            "meta": self.meta,
+        }
+
+
+class ProfileStore:
+    """Ограниченное хранилище результатов профилирования в памяти процесса"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, ProfileArtifact]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, filename: str, media_type: str, data: bytes, meta: Optional[Dict[str, Any]] = None) -> ProfileArtifact:
+        artifact = ProfileArtifact(
+            id=f"{kind}-{uuid.uuid4().hex[:12]}",
+            kind=kind,
+            filename=filename,
+            media_type=media_type,
+            data=data,
+            meta=meta or {},
+        )
+        with self._lock:
+            self._items[artifact.id] = artifact
+            # Вытеснение самых старых результатов
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return artifact
+
+    def get(self, artifact_id: str) -> Optional[ProfileArtifact]:
+        with self._lock:
+            return self._items.get(artifact_id)
+
+    def list(self) -> List[ProfileArtifact]:
+        with self._lock:
+            return list(reversed(self._items.values()))
+
+
+class StackSampler:
+    """
+    Сэмплирующий CPU-профилировщик всего процесса
+
+    Отдельный поток периодически снимает стеки всех потоков через
+    sys._current_frames(), поэтому в профиль попадают и корутины коллектора,
+    выполняющиеся в потоке event loop, и синхронные обработчики в пуле потоков.
+    Результат выдается в формате "collapsed stacks" (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="aegis-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        thread_names = {}
+        while not self._stop.wait(self.interval):
+            if len(thread_names) != threading.active_count():
+                thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> bytes:
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return ("\n".join(lines) + "\n").encode()
+
+
+class Profiler:
+    """Сервис профилирования работающего процесса"""
+
+    def __init__(self):
+        self.store = ProfileStore(settings.PROFILE_STORE_SIZE)
+        self._cpu_lock = threading.Lock()
+        self._request_lock = threading.Lock()
+
+    def cpu_profile_begin(self, interval_ms: int) -> Optional[StackSampler]:
+        """
+        Запуск сэмплирования CPU
+
+        Returns:
+            Сэмплер или None, если профилирование уже выполняется
+        """
+        if not self._cpu_lock.acquire(blocking=False):
+            return None
+        sampler = StackSampler(interval_ms / 1000)
+        sampler.start()
+        return sampler
+
+    def cpu_profile_end(self, sampler: StackSampler, seconds: float) -> ProfileArtifact:
+        """Остановка сэмплирования и сохранение результата"""
+        try:
+            sampler.stop()
+        finally:
+            self._cpu_lock.release()
+
+        return self.store.add(
+            kind="cpu",
+            filename=f"cpu-{int(time.time())}.collapsed",
+            media_type="text/plain",
+            data=sampler.collapsed(),
+            meta={
+                "seconds": seconds,
+                "interval_ms": int(sampler.interval * 1000),
+                "samples": sampler.sample_count,
+                "unique_stacks": len(sampler.samples),
+            },
+        )
+
+    def memory_start(self, frames: int) -> bool:
+        """Включение tracemalloc; возвращает False, если трассировка уже активна"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        logger.info(f"tracemalloc включен (кадров стека: {frames})")
+        return True
+
+    def is_memory_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def memory_stop(self) -> bool:
+        """Выключение tracemalloc"""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        logger.info("tracemalloc выключен")
+        return True
+
+    def memory_snapshot(self, limit: int, group_by: str = "lineno") -> Tuple[ProfileArtifact, List[Dict[str, Any]]]:
+        """
+        Снимок распределения памяти
+
+        Args:
+            limit: Количество топовых мест выделения памяти в ответе
+            group_by: Группировка статистики (lineno, filename, traceback)
+
+        Returns:
+            Сохраненный снимок (формат tracemalloc.Snapshot.dump) и топ выделений
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+        top = []
+        for stat in snapshot.statistics(group_by)[:limit]:
+            top.append({
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size": stat.size,
+                "count": stat.count,
+            })
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Snapshot.dump умеет писать только в файл
+        path = os.path.join(settings.PROFILE_TMP_DIR, f"aegis-tracemalloc-{uuid.uuid4().hex}.pickle")
+        try:
+            snapshot.dump(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+        artifact = self.store.add(
+            kind="memory",
+            filename=f"memory-{int(time.time())}.tracemalloc",
+            media_type="application/octet-stream",
+            data=data,
+            meta={"traced_current": current, "traced_peak": peak, "traces": len(snapshot.traces)},
+        )
+        return artifact, top
+
+    def request_profile_begin(self) -> Optional[cProfile.Profile]:
+        """
+        Запуск детерминированного профилировщика для одного запроса
+
+        Returns:
+            Профилировщик или None, если уже профилируется другой запрос
+        """
+        if not self._request_lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # В процессе уже активен другой профилировщик
+            self._request_lock.release()
+            return None
+        return profile
+
+    def request_profile_end(self, profile: cProfile.Profile, method: str, path: str, elapsed: float) -> ProfileArtifact:
+        """Остановка профилировщика запроса и сохранение результата в формате pstats"""
+        try:
+            profile.disable()
+            profile.create_stats()
+            data = marshal.dumps(profile.stats)
+        finally:
+            self._request_lock.release()
+
+        return self.store.add(
+            kind="request",
+            filename=f"request-{int(time.time())}.prof",
+            media_type="application/octet-stream",
+            data=data,
+            meta={"method": method, "path": path, "elapsed_ms": round(elapsed * 1000, 2)},
+        )
+
+
+# Глобальный экземпляр профилировщика
+profiler = Profiler()
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.replica import Replica
+
+class ReplicaRegistry:
+    """
+    Членство экземпляров бэкенда, запущенных над одной БД
+
+    Каждая реплика периодически обновляет свою запись в таблице replicas.
+    Реплики без heartbeat дольше REPLICA_TTL считаются остановленными. Docker
+    хосты распределяются между живыми репликами rendezvous-хешированием,
+    поэтому при добавлении или падении реплики переезжает только часть хостов.
+    """
+
+    def __init__(self, replica_id: Optional[str] = None):
+        self.id = replica_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._live: List[str] = [self.id]
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def live(self) -> List[str]:
+        """Живые реплики на момент последнего heartbeat (включая текущую)"""
+        return self._live
+
+    def owner_of(self, key: str) -> str:
+        """Реплика, отвечающая за ключ (например, имя Docker хоста)"""
+        return max(self._live, key=lambda replica: hashlib.sha1(f"{replica}:{key}".encode()).digest())
+
+    def owns(self, key: str) -> bool:
+        return self.owner_of(key) == self.id
+
+    async def start(self) -> None:
+        """Регистрация реплики и запуск heartbeat"""
+        self.heartbeat()
+        self._task = asyncio.create_task(self._run(), name="replica-heartbeat")
+        logger.info(f"Реплика {self.id} зарегистрирована, живых реплик: {len(self._live)}")
+
+    async def stop(self) -> None:
+        """Остановка heartbeat и удаление записи реплики"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        db = SessionLocal()
+        try:
+            db.query(Replica).filter(Replica.id == self.id).delete(synchronize_session=False)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при удалении записи реплики {self.id}: {str(e)}")
+        finally:
+            db.close()
+
+    def heartbeat(self) -> None:
+        """Обновление своей записи и списка живых реплик"""
+        now = datetime.now()
+        db = SessionLocal()
+        try:
+            replica = db.query(Replica).filter(Replica.id == self.id).first()
+            if replica is None:
+                replica = Replica(id=self.id, hostname=socket.gethostname(), pid=os.getpid(), started_at=now)
+                db.add(replica)
+            replica.heartbeat_at = now
+
+            # Удаление записей давно остановленных реплик
+            cutoff = now - timedelta(seconds=settings.REPLICA_TTL)
+            db.query(Replica).filter(Replica.heartbeat_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+
+            live = sorted(replica_id for (replica_id,) in db.query(Replica.id))
+            if live != self._live:
+                logger.info(f"Состав реплик изменился: {', '.join(live)}")
+            self._live = live
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка heartbeat реплики {self.id}: {str(e)}")
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPLICA_HEARTBEAT_INTERVAL)
+            await asyncio.to_thread(self.heartbeat)
+
+# Глобальный реестр реплик
+replica_registry = ReplicaRegistry(settings.REPLICA_ID)
@@ -0,0 +1,301 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.scan_history import FindingDelta, DailySeverityRollup
+from app.models.container import Container
+from app.models.vulnerability import Vulnerability
+from app.services.analytics import SEVERITY_RANKS
+from app.services.replicas import replica_registry
+
+# Ключ задачи свертки среди реплик
+ROLLUP_KEY = "history-rollup"
+
+# Критичность для уязвимостей без оценки
+UNKNOWN_SEVERITY = "Unknown"
+
+class ScanHistory:
+    """
+    История уязвимостей: изменения по сканам и ежедневные сводки
+
+    Коллектор записывает только изменения (добавленные и исправленные
+    уязвимости контейнера) в той же транзакции, что и результаты скана.
+    Периодическая свертка превращает изменения в число открытых уязвимостей
+    контейнера по критичности на конец дня; строки сводки пишутся только за
+    дни с изменениями. Запросы трендов читают только сводки.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Запуск периодической свертки"""
+        self._task = asyncio.create_task(self._loop(), name="history-rollup")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def record(
+        self,
+        db: Session,
+        container_id: str,
+        image: Optional[str],
+        scan_id: Optional[str],
+        changes: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> int:
+        """
+        Запись изменений уязвимостей контейнера (без commit)
+
+        Args:
+            db: Сессия транзакции сохранения результатов скана
+            container_id: ID контейнера
+            image: Образ контейнера
+            scan_id: ID задачи сканирования
+            changes: Пары (added | removed, данные уязвимости)
+
+        Returns:
+            Количество записанных изменений
+        """
+        count = 0
+        for change, vulnerability in changes:
+            db.add(FindingDelta(
+                container_id=container_id,
+                image=image,
+                scan_id=scan_id,
+                cve_id=vulnerability["cve_id"],
+                package_name=vulnerability.get("package_name"),
+                severity=vulnerability.get("severity") or UNKNOWN_SEVERITY,
+                change=change,
+            ))
+            count += 1
+        return count
+
+    def rollup(self) -> int:
+        """
+        Свертка изменений в ежедневные сводки
+
+        Пересчитываются дни, начиная с последнего свернутого (он мог быть
+        неполным). Заново строятся только строки из изменений: строки без
+        изменений (инициализация, перенос при очистке) сохраняются и служат
+        начальными значениями. При первом запуске сводка инициализируется
+        текущими уязвимостями за день до первого изменения.
+
+        Returns:
+            Количество записанных строк сводки
+        """
+        db = SessionLocal()
+        try:
+            last_day = db.query(func.max(DailySeverityRollup.day)).scalar()
+            start_day = last_day if last_day is not None else self._seed(db)
+
+            db.query(DailySeverityRollup).filter(
+                DailySeverityRollup.day >= start_day,
+                or_(DailySeverityRollup.added > 0, DailySeverityRollup.removed > 0)
+            ).delete(synchronize_session=False)
+
+            changes: Dict[Tuple[date, str, str], List[int]] = defaultdict(lambda: [0, 0])
+            images: Dict[str, Optional[str]] = {}
+            query = (
+                db.query(FindingDelta.created_at, FindingDelta.container_id, FindingDelta.image,
+                         FindingDelta.severity, FindingDelta.change)
+                .filter(FindingDelta.created_at >= datetime.combine(start_day, time.min))
+                .order_by(FindingDelta.created_at)
+            )
+            for created_at, container_id, image, severity, change in query.yield_per(5000):
+                changes[(created_at.date(), container_id, severity)][0 if change == "added" else 1] += 1
+                images[container_id] = image
+
+            # Начальные значения, включая сохраненные строки первого дня
+            base = self._latest_counts(db, start_day + timedelta(days=1))
+            counts = {key: count for key, (count, _) in base.items()}
+            for (day, container_id, severity), (added, removed) in sorted(changes.items()):
+                count = max(counts.get((container_id, severity), 0) + added - removed, 0)
+                counts[(container_id, severity)] = count
+                db.add(DailySeverityRollup(
+                    day=day, container_id=container_id, image=images.get(container_id),
+                    severity=severity, count=count, added=added, removed=removed,
+                ))
+
+            self._purge(db)
+            db.commit()
+            return len(changes)
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def trends(
+        self,
+        db: Session,
+        days: int,
+        container_id: Optional[str] = None,
+        image: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ежедневная динамика открытых уязвимостей по критичности
+
+        Args:
+            db: Сессия БД
+            days: Количество дней, включая текущий
+            container_id: Фильтр по контейнеру
+            image: Фильтр по образу
+
+        Returns:
+            Точки по дням: число открытых, добавленных и исправленных уязвимостей по критичности
+        """
+        start = date.today() - timedelta(days=days - 1)
+        filters = []
+        if container_id:
+            filters.append(DailySeverityRollup.container_id == container_id)
+        if image:
+            filters.append(DailySeverityRollup.image == image)
+
+        # Значения по парам (контейнер, критичность): сводки хранят число на конец дня,
+        # поэтому строки без изменений (инициализация, перенос при очистке) тоже учитываются
+        pair_counts = {key: count for key, (count, _) in self._latest_counts(db, start, filters).items()}
+        rows: Dict[date, List[Tuple[str, str, int, int, int]]] = defaultdict(list)
+        for day, row_container, severity, count, added, removed in (
+            db.query(
+                DailySeverityRollup.day, DailySeverityRollup.container_id, DailySeverityRollup.severity,
+                DailySeverityRollup.count, DailySeverityRollup.added, DailySeverityRollup.removed
+            )
+            .filter(DailySeverityRollup.day >= start, *filters)
+        ):
+            rows[day].append((row_container, severity, count, added, removed))
+
+        severities = sorted(
+            {severity for _, severity in pair_counts} | {row[1] for day_rows in rows.values() for row in day_rows},
+            key=lambda severity: -SEVERITY_RANKS.get(severity, 0)
+        )
+
+        points = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            added = dict.fromkeys(severities, 0)
+            removed = dict.fromkeys(severities, 0)
+            for row_container, severity, count, day_added, day_removed in rows.get(day, []):
+                pair_counts[(row_container, severity)] = count
+                added[severity] += day_added
+                removed[severity] += day_removed
+            counts = dict.fromkeys(severities, 0)
+            for (_, severity), count in pair_counts.items():
+                counts[severity] += count
+            points.append({"day": day, "counts": counts, "added": added, "removed": removed})
+        return points
+
+    def _latest_counts(
+        self, db: Session, before: date, filters: Optional[List[Any]] = None
+    ) -> Dict[Tuple[str, str], Tuple[int, Optional[str]]]:
+        """Последнее значение сводки (число, образ) до указанного дня для каждой пары (контейнер, критичность)"""
+        filters = filters or []
+        latest = (
+            db.query(
+                DailySeverityRollup.container_id,
+                DailySeverityRollup.severity,
+                func.max(DailySeverityRollup.day).label("day")
+            )
+            .filter(DailySeverityRollup.day < before, *filters)
+            .group_by(DailySeverityRollup.container_id, DailySeverityRollup.severity)
+            .subquery()
+        )
+        rows = (
+            db.query(DailySeverityRollup.container_id, DailySeverityRollup.severity,
+                     DailySeverityRollup.count, DailySeverityRollup.image)
+            .join(latest, and_(
+                DailySeverityRollup.container_id == latest.c.container_id,
+                DailySeverityRollup.severity == latest.c.severity,
+                DailySeverityRollup.day == latest.c.day,
+            ))
+        )
+        return {(container_id, severity): (count, image) for container_id, severity, count, image in rows}
+
+    def _seed(self, db: Session) -> date:
+        """
+        Начальная сводка из текущих уязвимостей
+
+        Значение на день до первого изменения: текущее число минус изменения,
+        записанные с тех пор.
+
+        Returns:
+            Первый день для свертки
+        """
+        first_change = db.query(func.min(FindingDelta.created_at)).scalar()
+        start_day = first_change.date() if first_change else date.today()
+
+        counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        images: Dict[str, Optional[str]] = {}
+        for container_id, image, severity, count in (
+            db.query(Vulnerability.container_id, Container.image, Vulnerability.severity, func.count(Vulnerability.id))
+            .join(Container, Vulnerability.container_id == Container.id)
+            .filter(Vulnerability.fixed_at.is_(None))
+            .group_by(Vulnerability.container_id, Container.image, Vulnerability.severity)
+        ):
+            counts[(container_id, severity or UNKNOWN_SEVERITY)] += count
+            images[container_id] = image
+
+        for container_id, severity, change, count in (
+            db.query(FindingDelta.container_id, FindingDelta.severity, FindingDelta.change, func.count(FindingDelta.id))
+            .group_by(FindingDelta.container_id, FindingDelta.severity, FindingDelta.change)
+        ):
+            counts[(container_id, severity)] -= count if change == "added" else -count
+
+        for (container_id, severity), count in counts.items():
+            if count > 0:
+                db.add(DailySeverityRollup(
+                    day=start_day - timedelta(days=1), container_id=container_id, image=images.get(container_id),
+                    severity=severity, count=count, added=0, removed=0,
+                ))
+        db.flush()
+
+        logger.info(f"История уязвимостей инициализирована: {len(counts)} пар контейнер/критичность")
+        return start_day
+
+    def _purge(self, db: Session) -> None:
+        """Удаление изменений и сводок старше сроков хранения"""
+        delta_cutoff = datetime.combine(date.today() - timedelta(days=settings.HISTORY_DELTA_RETENTION_DAYS), time.min)
+        db.query(FindingDelta).filter(FindingDelta.created_at < delta_cutoff).delete(synchronize_session=False)
+
+        # Последнее значение до границы переносится на границу, иначе оно потеряется
+        cutoff = date.today() - timedelta(days=settings.HISTORY_ROLLUP_RETENTION_DAYS)
+        if db.query(DailySeverityRollup.id).filter(DailySeverityRollup.day < cutoff).first() is None:
+            return
+
+        carried = self._latest_counts(db, cutoff)
+        on_cutoff = {
+            (container_id, severity)
+            for container_id, severity in db.query(DailySeverityRollup.container_id, DailySeverityRollup.severity)
+            .filter(DailySeverityRollup.day == cutoff)
+        }
+        db.query(DailySeverityRollup).filter(DailySeverityRollup.day < cutoff).delete(synchronize_session=False)
+        for (container_id, severity), (count, image) in carried.items():
+            if count > 0 and (container_id, severity) not in on_cutoff:
+                db.add(DailySeverityRollup(
+                    day=cutoff, container_id=container_id, image=image, severity=severity,
+                    count=count, added=0, removed=0,
+                ))
+
+    async def _loop(self) -> None:
+        while True:
+            # При нескольких репликах свертку выполняет одна из них
+            if replica_registry.owns(ROLLUP_KEY):
+                try:
+                    rows = await asyncio.to_thread(self.rollup)
+                    logger.debug(f"Свертка истории уязвимостей: {rows} строк")
+                except SQLAlchemyError as e:
+                    logger.error(f"Ошибка свертки истории уязвимостей: {str(e)}")
+            await asyncio.sleep(settings.HISTORY_ROLLUP_INTERVAL)
+
+# Глобальный экземпляр истории уязвимостей
+scan_history = ScanHistory()
@@ -0,0 +1,471 @@
+import asyncio
+import math
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.scan_job import ScanJob, SCAN_PRIORITY_MANUAL, SCAN_PRIORITY_PERIODIC, SCAN_ACTIVE_STATUSES
+from app.services.events import event_bus
+from app.services.docker_hosts import DEFAULT_HOST
+from app.services.replicas import replica_registry
+from app.services.scan_throttle import scan_throttle
+
+# Функция выполнения задачи: сканирует образ и возвращает количество найденных уязвимостей
+# и версию базы уязвимостей сканера
+ScanRunner = Callable[[ScanJob], Awaitable[Tuple[int, Optional[str]]]]
+
+def _publish(job: ScanJob, event_type: str) -> None:
+    """Публикация изменения задачи сканирования в поток событий"""
+    event_bus.publish("scans", event_type, {
+        "id": job.id,
+        "image": job.image,
+        "host": job.host,
+        "owner": job.owner,
+        "status": job.status,
+        "container_ids": job.container_ids,
+        "findings_count": job.findings_count,
+        "vulndb_version": job.vulndb_version,
+    })
+
+class ScanQueue:
+    """
+    Очередь задач сканирования с хранением в БД
+
+    Задачи упорядочены по приоритету (ручные запросы раньше периодических) и
+    дедуплицируются по digest образа: пока задача для образа активна, новые
+    запросы присоединяют свои контейнеры к ней вместо запуска нового скана.
+    
+    Бюджет воркеров делится между Docker хостами: хост, у которого выполняется
+    больше своей доли сканирований, не получает новых задач, пока в очереди
+    есть задачи других хостов.
+    
+    Число одновременных сканирований уменьшается при высокой нагрузке хоста
+    (см. ScanThrottle).
+    
+    Очередь может обслуживаться несколькими репликами: задача захватывается
+    блокировкой строки (FOR UPDATE SKIP LOCKED) и арендуется репликой на
+    REPLICA_TTL секунд. Владелец продлевает аренду, а задачи с истекшей арендой
+    (реплика упала) возвращаются в очередь.
+    """
+
+    def __init__(self, workers: int):
+        """
+        Инициализация очереди
+
+        Args:
+            workers: Количество одновременно выполняемых сканирований
+        """
+        self.workers = workers
+        self.runner: Optional[ScanRunner] = None
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+
+    @property
+    def owner(self) -> str:
+        return replica_registry.id
+
+    async def start(self, runner: ScanRunner) -> None:
+        """
+        Запуск воркеров очереди
+
+        Args:
+            runner: Функция выполнения задачи сканирования
+        """
+        self.runner = runner
+        self._release_owned()
+        self._reap_expired()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"scan-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._lease_task = asyncio.create_task(self._lease_loop(), name="scan-lease")
+        logger.info(f"Запущена очередь сканирования: воркеров={self.workers}, реплика={self.owner}")
+
+    async def stop(self) -> None:
+        """Остановка воркеров; прерванные задачи сразу возвращаются в очередь для других реплик"""
+        tasks = [*self._tasks, *([self._lease_task] if self._lease_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._lease_task = None
+        self._release_owned()
+        logger.info("Очередь сканирования остановлена")
+
+    def submit(
+        self,
+        image: str,
+        image_digest: str,
+        container_id: str,
+        source: str = "periodic",
+        host: str = DEFAULT_HOST
+    ) -> Tuple[ScanJob, bool]:
+        """
+        Постановка образа в очередь сканирования
+
+        Args:
+            image: Ссылка на образ для сканера
+            image_digest: Digest образа (ключ дедупликации)
+            container_id: ID контейнера, для которого нужен результат
+            source: Источник запроса (manual, periodic)
+            host: Docker хост, с которого сканер получит образ
+
+        Returns:
+            Задача и признак присоединения к уже активной задаче
+        """
+        priority = SCAN_PRIORITY_MANUAL if source == "manual" else SCAN_PRIORITY_PERIODIC
+
+        db = SessionLocal()
+        try:
+            # Повтор, если задачу для того же образа одновременно создала другая реплика
+            for attempt in range(2):
+                job = (
+                    db.query(ScanJob)
+                    .filter(ScanJob.image_digest == image_digest, ScanJob.status.in_(SCAN_ACTIVE_STATUSES))
+                    .order_by(ScanJob.created_at)
+                    .with_for_update()
+                    .first()
+                )
+
+                if job:
+                    return self._attach(db, job, container_id, priority, source), True
+
+                job = ScanJob(
+                    id=f"scan-{uuid.uuid4().hex}",
+                    image=image,
+                    image_digest=image_digest,
+                    host=host,
+                    container_ids=[container_id],
+                    priority=priority,
+                    source=source,
+                    status="queued",
+                    created_at=datetime.now(),
+                )
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    if attempt:
+                        raise
+                    continue
+
+                db.refresh(job)
+                db.expunge(job)
+
+                self._wakeup.set()
+                _publish(job, "queued")
+                logger.info(f"Задача {job.id} поставлена в очередь: образ {image}, хост {host}, источник {source}")
+                return job, False
+
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при постановке сканирования в очередь: {str(e)}")
+            raise
+        finally:
+            db.close()
+
+    def _attach(self, db: Session, job: ScanJob, container_id: str, priority: int, source: str) -> ScanJob:
+        """Присоединение контейнера к активной задаче для того же образа"""
+        changed = False
+        if container_id not in job.container_ids:
+            job.container_ids = [*job.container_ids, container_id]
+            changed = True
+
+        # Ручной запрос поднимает приоритет ожидающей периодической задачи
+        if job.status == "queued" and priority < job.priority:
+            job.priority = priority
+            job.source = source
+            changed = True
+            self._wakeup.set()
+
+        if changed:
+            db.commit()
+            db.refresh(job)
+            _publish(job, "attached")
+        else:
+            db.rollback()
+        db.expunge(job)
+        return job
+
+    def cancel(self, scan_id: str) -> Optional[ScanJob]:
+        """
+        Отмена задачи сканирования
+
+        Args:
+            scan_id: ID задачи
+
+        Returns:
+            Задача после отмены или None, если задача не найдена
+        """
+        db = SessionLocal()
+        try:
+            job = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+            if not job:
+                return None
+
+            if job.status in SCAN_ACTIVE_STATUSES:
+                job.status = "cancelled"
+                job.finished_at = datetime.now()
+                db.commit()
+                db.refresh(job)
+
+                # Прерывание выполняющегося скана в этом процессе
+                task = self._running.get(scan_id)
+                if task:
+                    task.cancel()
+                
+                _publish(job, "cancelled")
+
+                logger.info(f"Задача {scan_id} отменена")
+
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def get(self, scan_id: str) -> Optional[ScanJob]:
+        """Получение задачи сканирования по ID"""
+        db = SessionLocal()
+        try:
+            job = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+            if job:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _release_owned(self) -> None:
+        """Возврат в очередь задач этой реплики, прерванных остановкой процесса"""
+        self._requeue(ScanJob.owner == self.owner, "прерванных")
+
+    def _reap_expired(self) -> int:
+        """Возврат в очередь задач реплик, переставших продлевать аренду"""
+        return self._requeue(ScanJob.lease_expires_at < datetime.now(), "с истекшей арендой")
+
+    def _requeue(self, condition, reason: str) -> int:
+        db = SessionLocal()
+        try:
+            count = (
+                db.query(ScanJob)
+                .filter(ScanJob.status == "running", condition)
+                .update(
+                    {"status": "queued", "started_at": None, "owner": None, "lease_expires_at": None},
+                    synchronize_session=False
+                )
+            )
+            db.commit()
+            if count:
+                logger.info(f"Возвращено в очередь {reason} задач сканирования: {count}")
+                self._wakeup.set()
+            return count
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при восстановлении очереди сканирования: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    def _renew_leases(self) -> List[str]:
+        """
+        Продление аренды выполняющихся задач
+
+        Returns:
+            ID локально выполняемых задач, которые больше не принадлежат реплике
+            (отменены через другую реплику или переданы после истечения аренды)
+        """
+        if not self._running:
+            return []
+
+        db = SessionLocal()
+        try:
+            running_ids = list(self._running)
+            (
+                db.query(ScanJob)
+                .filter(ScanJob.id.in_(running_ids), ScanJob.owner == self.owner, ScanJob.status == "running")
+                .update(
+                    {"lease_expires_at": datetime.now() + timedelta(seconds=settings.REPLICA_TTL)},
+                    synchronize_session=False
+                )
+            )
+            db.commit()
+
+            owned = {
+                job_id for (job_id,) in
+                db.query(ScanJob.id)
+                .filter(ScanJob.id.in_(running_ids), ScanJob.owner == self.owner, ScanJob.status == "running")
+            }
+            return [job_id for job_id in running_ids if job_id not in owned]
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при продлении аренды задач сканирования: {str(e)}")
+            return []
+        finally:
+            db.close()
+
+    async def _lease_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPLICA_HEARTBEAT_INTERVAL)
+
+            for job_id in await asyncio.to_thread(self._renew_leases):
+                task = self._running.get(job_id)
+                if task:
+                    logger.info(f"Задача {job_id} больше не принадлежит реплике {self.owner}, сканирование прервано")
+                    task.cancel()
+
+            await asyncio.to_thread(self._reap_expired)
+
+    def _saturated_hosts(self, db: Session) -> List[str]:
+        """Хосты, которым сейчас не выдаются новые задачи"""
+        rows = (
+            db.query(
+                ScanJob.host,
+                func.sum(case((ScanJob.status == "queued", 1), else_=0)),
+                func.sum(case((ScanJob.status == "running", 1), else_=0))
+            )
+            .filter(ScanJob.status.in_(SCAN_ACTIVE_STATUSES))
+            .group_by(ScanJob.host)
+            .all()
+        )
+        if not rows:
+            return []
+
+        # Справедливая доля: общий бюджет всех реплик поровну между хостами с активными задачами
+        share = max(1, math.ceil(self.workers * len(replica_registry.live) / len(rows)))
+        hard_limit = settings.SCAN_HOST_CONCURRENCY
+        waiting_hosts = {host for host, queued, _ in rows if queued}
+
+        saturated = []
+        for host, _, running in rows:
+            if hard_limit > 0 and running >= hard_limit:
+                saturated.append(host)
+            # Сверх доли хост получает задачи, только если другие хосты не ждут
+            elif running >= share and waiting_hosts - {host}:
+                saturated.append(host)
+        return saturated
+
+    def _claim(self) -> Optional[ScanJob]:
+        """Выбор следующей задачи из очереди и перевод ее в статус running"""
+        db = SessionLocal()
+        try:
+            query = db.query(ScanJob).filter(ScanJob.status == "queued")
+            
+            saturated = self._saturated_hosts(db)
+            if saturated:
+                query = query.filter(ScanJob.host.notin_(saturated))
+            
+            # Строки, захваченные другими репликами, пропускаются без ожидания
+            job = (
+                query.order_by(ScanJob.priority, ScanJob.created_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if not job:
+                db.rollback()
+                return None
+
+            # Условное обновление: без SKIP LOCKED (SQLite) задачу может выбрать и другой рабочий поток
+            started_at = datetime.now()
+            claimed = (
+                db.query(ScanJob)
+                .filter(ScanJob.id == job.id, ScanJob.status == "queued")
+                .update({
+                    ScanJob.status: "running",
+                    ScanJob.owner: self.owner,
+                    ScanJob.started_at: started_at,
+                    ScanJob.lease_expires_at: started_at + timedelta(seconds=settings.REPLICA_TTL),
+                }, synchronize_session=False)
+            )
+            db.commit()
+            if not claimed:
+                return None
+            db.refresh(job)
+            db.expunge(job)
+            _publish(job, "running")
+            return job
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при выборе задачи сканирования: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _finish(
+        self,
+        scan_id: str,
+        status: str,
+        findings_count: Optional[int] = None,
+        vulndb_version: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+            # Отмененная или переданная другой реплике задача сохраняет свой статус
+            if not job or job.status != "running" or job.owner != self.owner:
+                return
+
+            job.status = status
+            job.lease_expires_at = None
+            job.findings_count = findings_count
+            job.vulndb_version = vulndb_version
+            job.error = error
+            job.finished_at = datetime.now()
+            db.commit()
+            _publish(job, status)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при обновлении задачи сканирования {scan_id}: {str(e)}")
+        finally:
+            db.close()
+
+    async def _worker(self) -> None:
+        while True:
+            # При высокой нагрузке хоста новые сканирования не начинаются
+            if len(self._running) >= scan_throttle.allowed_workers(self.workers):
+                await asyncio.sleep(settings.SCAN_LOAD_CHECK_INTERVAL)
+                continue
+            
+            # Запросы к основной БД выполняются вне event loop
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.SCAN_QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._execute(job)
+
+    async def _execute(self, job: ScanJob) -> None:
+        logger.info(f"Выполнение задачи {job.id}: образ {job.image}, контейнеров {len(job.container_ids)}")
+
+        task = asyncio.create_task(self.runner(job))
+        self._running[job.id] = task
+        try:
+            findings_count, vulndb_version = await task
+            await asyncio.to_thread(self._finish, job.id, "completed", findings_count=findings_count, vulndb_version=vulndb_version)
+        except asyncio.CancelledError:
+            # Остановка воркера: задача вернется в очередь при следующем запуске
+            if asyncio.current_task().cancelling():
+                task.cancel()
+                raise
+            logger.info(f"Сканирование {job.id} прервано")
+        except Exception as e:
+            logger.error(f"Ошибка при выполнении задачи {job.id}: {str(e)}")
+            await asyncio.to_thread(self._finish, job.id, "failed", error=str(e))
+        finally:
+            self._running.pop(job.id, None)
+
+# Глобальный экземпляр очереди сканирования
+scan_queue = ScanQueue(workers=settings.SCAN_WORKERS)
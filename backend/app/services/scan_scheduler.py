@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from loguru import logger
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.image_schedule import ImageSchedule
+from app.services.analytics import SEVERITY_RANKS
+from app.services.vulndb import vulndb
+
+# Множители интервала по максимальной критичности последнего скана
+SEVERITY_FACTORS = {"Critical": 0.25, "High": 0.5, "Medium": 0.75}
+
+# Множитель для образов с опубликованными портами
+EXPOSED_FACTOR = 0.5
+
+# Период полураспада счетчика смен digest, секунды
+CHURN_HALF_LIFE = 86400.0
+
+class ScanScheduler:
+    """
+    Планировщик периодического сканирования образов
+
+    Каждый образ получает собственный интервал между SCAN_INTERVAL_MIN и
+    SCAN_INTERVAL_MAX. Интервал сокращается для образов с опубликованными
+    портами, с критичными уязвимостями и с частыми сменами digest (редеплои).
+    Новый digest сканируется сразу. После обновления базы уязвимостей сканера
+    текущее ожидание образа сокращается до четверти его интервала.
+    """
+
+    def observe(self, host: str, container_data: Dict[str, Any]) -> bool:
+        """
+        Учет запущенного контейнера при обходе хоста
+
+        Args:
+            host: Docker хост контейнера
+            container_data: Данные контейнера
+
+        Returns:
+            True, если образ пора сканировать
+        """
+        now = datetime.now()
+        image = container_data["image"]
+        db = SessionLocal()
+        try:
+            schedule = (
+                db.query(ImageSchedule)
+                .filter(ImageSchedule.image == image, ImageSchedule.host == host)
+                .first()
+            )
+            if schedule is None:
+                schedule = ImageSchedule(
+                    image=image,
+                    image_digest=container_data["image_id"],
+                    host=host,
+                    churn=0.0,
+                    churn_updated_at=now,
+                    next_scan_at=now,
+                )
+                db.add(schedule)
+
+            elif schedule.image_digest != container_data["image_id"]:
+                # Новый образ по той же ссылке: сканируется сразу, частые смены сокращают интервал
+                schedule.churn = self._decayed_churn(schedule, now) + 1.0
+                schedule.churn_updated_at = now
+                schedule.image_digest = container_data["image_id"]
+                schedule.next_scan_at = now
+                logger.info(f"Образ {image} обновлен (churn={schedule.churn:.2f}), сканирование без ожидания")
+
+            schedule.exposed = bool(container_data.get("ports"))
+
+            due = self._effective_next_scan(schedule) <= now
+            db.commit()
+            return due
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при обновлении расписания образа {image}: {str(e)}")
+            # Без расписания образ сканируется как раньше
+            return True
+        finally:
+            db.close()
+
+    def record_scan(self, image: str, host: str, image_digest: str, vulnerabilities: List[Dict[str, Any]]) -> None:
+        """
+        Расчет следующего сканирования по результату скана
+
+        Результат относится к расписанию образа на хосте скана и на всех хостах,
+        где по той же ссылке запущен тот же digest.
+
+        Args:
+            image: Ссылка на образ
+            host: Docker хост, с которого сканировался образ
+            image_digest: Digest просканированного образа
+            vulnerabilities: Найденные уязвимости (формат Grype)
+        """
+        now = datetime.now()
+        db = SessionLocal()
+        try:
+            schedules = (
+                db.query(ImageSchedule)
+                .filter(
+                    ImageSchedule.image == image,
+                    or_(ImageSchedule.host == host, ImageSchedule.image_digest == image_digest)
+                )
+                .all()
+            )
+            if not schedules:
+                # Образ сканировался только вручную
+                return
+
+            severities = [vuln.get("vulnerability", {}).get("severity") for vuln in vulnerabilities]
+            max_severity = max(severities, key=lambda s: SEVERITY_RANKS.get(s, 0), default=None)
+            for schedule in schedules:
+                schedule.max_severity = max_severity
+                schedule.interval = self.compute_interval(schedule, now)
+                schedule.last_scan_at = now
+                schedule.next_scan_at = now + timedelta(seconds=schedule.interval)
+                logger.debug(f"Следующее сканирование {image} на {schedule.host} через {int(schedule.interval)}с")
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Ошибка при обновлении расписания образа {image}: {str(e)}")
+        finally:
+            db.close()
+
+    def compute_interval(self, schedule: ImageSchedule, now: datetime) -> float:
+        """Интервал сканирования образа в секундах"""
+        interval = float(settings.SCAN_INTERVAL_MAX)
+
+        if schedule.exposed:
+            interval *= EXPOSED_FACTOR
+
+        interval *= SEVERITY_FACTORS.get(schedule.max_severity, 1.0)
+
+        # Образ, который пересобирают несколько раз в сутки, сканируется чаще
+        interval /= 1.0 + self._decayed_churn(schedule, now)
+
+        return min(max(interval, settings.SCAN_INTERVAL_MIN), settings.SCAN_INTERVAL_MAX)
+
+    def _effective_next_scan(self, schedule: ImageSchedule) -> datetime:
+        """Время следующего сканирования с учетом обновления базы уязвимостей"""
+        next_scan_at = schedule.next_scan_at
+        built_at = vulndb.built_at
+        if built_at and schedule.last_scan_at and schedule.interval and built_at > schedule.last_scan_at:
+            wait = max(schedule.interval / 4, settings.SCAN_INTERVAL_MIN)
+            next_scan_at = min(next_scan_at, schedule.last_scan_at + timedelta(seconds=wait))
+        return next_scan_at
+
+    def _decayed_churn(self, schedule: ImageSchedule, now: datetime) -> float:
+        if not schedule.churn or not schedule.churn_updated_at:
+            return 0.0
+        elapsed = (now - schedule.churn_updated_at).total_seconds()
+        return schedule.churn * 0.5 ** (max(elapsed, 0.0) / CHURN_HALF_LIFE)
+
+# Глобальный экземпляр планировщика сканирования
+scan_scheduler = ScanScheduler()
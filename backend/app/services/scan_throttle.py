@@ -0,0 +1,221 @@
+import asyncio
+import os
+import shutil
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+from app.core.config import settings
+
+# Источники давления (PSI): весь хост и cgroup процесса
+PSI_PATHS = {
+    "cpu": ("/proc/pressure/cpu", "/sys/fs/cgroup/cpu.pressure"),
+    "io": ("/proc/pressure/io", "/sys/fs/cgroup/io.pressure"),
+}
+
+# Тиков процессорного времени в секунду для /proc/<pid>/stat
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+@dataclass
+class HostLoad:
+    """Нагрузка хоста, на котором выполняются сканеры"""
+    load: float = 0.0  # loadavg за минуту на одно ядро
+    cpu_pressure: float = 0.0  # PSI some avg10, %
+    io_pressure: float = 0.0  # PSI some avg10, %
+    sampled_at: float = field(default_factory=time.monotonic)
+
+class ScanThrottle:
+    """
+    Ограничение сканирований по нагрузке хоста
+
+    Раз в SCAN_LOAD_CHECK_INTERVAL секунд читаются loadavg и давление CPU/IO
+    (PSI хоста и cgroup процесса). При превышении порогов *_MAX очередь
+    сканирования уменьшает число одновременных сканирований вдвое, при
+    превышении *_PAUSE не начинает новые. Сканеры запускаются с пониженным
+    приоритетом CPU (nice) и IO (ionice), а суммарное потребление CPU их
+    процессами ограничивается SCAN_CPU_BUDGET ядрами: при превышении за период
+    SCAN_CPU_PERIOD процессы приостанавливаются (SIGSTOP) так, чтобы среднее
+    за период и паузу равнялось бюджету, и затем продолжаются (SIGCONT).
+    """
+
+    def __init__(self):
+        self.load = HostLoad()
+        self.level = "normal"  # normal, shrink, pause
+        self._processes: Set[int] = set()
+        self._cpu_times: Dict[int, float] = {}
+        self._stopped = False
+        self._tasks: List[asyncio.Task] = []
+        self.paused_seconds = 0.0  # суммарная приостановка по бюджету CPU
+        self._ionice = shutil.which("ionice")
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._load_loop(), name="scan-load"),
+            asyncio.create_task(self._budget_loop(), name="scan-cpu-budget"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._resume()
+
+    def allowed_workers(self, workers: int) -> int:
+        """Допустимое число одновременных сканирований при текущей нагрузке"""
+        if self.level == "pause":
+            return 0
+        if self.level == "shrink":
+            return max(1, workers // 2)
+        return workers
+
+    def command(self, cmd: List[str]) -> List[str]:
+        """Команда сканера с пониженным приоритетом IO"""
+        if self._ionice and settings.SCAN_IONICE_CLASS:
+            return [self._ionice, "-c", str(settings.SCAN_IONICE_CLASS), "-n", str(settings.SCAN_IONICE_LEVEL), *cmd]
+        return cmd
+
+    def preexec(self) -> None:
+        """Понижение приоритета CPU в дочернем процессе до запуска сканера"""
+        if settings.SCAN_NICE:
+            os.nice(settings.SCAN_NICE)
+
+    def register(self, pid: int) -> None:
+        """Учет процесса сканера в бюджете CPU"""
+        self._processes.add(pid)
+        if self._stopped:
+            _signal(pid, signal.SIGSTOP)
+
+    def unregister(self, pid: int) -> None:
+        self._processes.discard(pid)
+        self._cpu_times.pop(pid, None)
+        # Процесс мог быть приостановлен бюджетом
+        _signal(pid, signal.SIGCONT)
+
+    def sample(self) -> HostLoad:
+        """Чтение текущей нагрузки хоста и пересчет уровня ограничения"""
+        load = HostLoad(
+            load=os.getloadavg()[0] / (os.cpu_count() or 1),
+            cpu_pressure=_pressure("cpu"),
+            io_pressure=_pressure("io"),
+        )
+
+        if (
+            load.load >= settings.SCAN_LOAD_PAUSE or
+            load.cpu_pressure >= settings.SCAN_CPU_PRESSURE_PAUSE or
+            load.io_pressure >= settings.SCAN_IO_PRESSURE_PAUSE
+        ):
+            level = "pause"
+        elif (
+            load.load >= settings.SCAN_LOAD_MAX or
+            load.cpu_pressure >= settings.SCAN_CPU_PRESSURE_MAX or
+            load.io_pressure >= settings.SCAN_IO_PRESSURE_MAX
+        ):
+            level = "shrink"
+        else:
+            level = "normal"
+
+        if level != self.level:
+            logger.info(
+                f"Ограничение сканирований: {self.level} -> {level} (load={load.load:.2f}, "
+                f"cpu={load.cpu_pressure:.1f}%, io={load.io_pressure:.1f}%)"
+            )
+        self.load, self.level = load, level
+        return load
+
+    def render_metrics(self) -> List[str]:
+        """Метрики в текстовом формате Prometheus"""
+        return [
+            "# HELP aegis_host_load Нагрузка хоста сканеров: loadavg на ядро, PSI CPU и IO (%)",
+            "# TYPE aegis_host_load gauge",
+            f'aegis_host_load{{source="loadavg"}} {self.load.load:.4f}',
+            f'aegis_host_load{{source="cpu_pressure"}} {self.load.cpu_pressure:.2f}',
+            f'aegis_host_load{{source="io_pressure"}} {self.load.io_pressure:.2f}',
+            "# HELP aegis_scan_throttle_level Ограничение сканирований: 0 - нет, 1 - вдвое меньше, 2 - пауза",
+            "# TYPE aegis_scan_throttle_level gauge",
+            f"aegis_scan_throttle_level {('normal', 'shrink', 'pause').index(self.level)}",
+            "# HELP aegis_scan_cpu_paused_seconds_total Приостановка сканеров по бюджету CPU, секунды",
+            "# TYPE aegis_scan_cpu_paused_seconds_total counter",
+            f"aegis_scan_cpu_paused_seconds_total {self.paused_seconds:.3f}",
+        ]
+
+    async def _load_loop(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except OSError as e:
+                logger.warning(f"Не удалось прочитать нагрузку хоста: {str(e)}")
+            await asyncio.sleep(settings.SCAN_LOAD_CHECK_INTERVAL)
+
+    async def _budget_loop(self) -> None:
+        """Скважность SIGSTOP/SIGCONT, удерживающая CPU сканеров в пределах бюджета"""
+        period = settings.SCAN_CPU_PERIOD
+        while True:
+            await asyncio.sleep(period)
+            budget = settings.SCAN_CPU_BUDGET
+            if budget <= 0 or not self._processes:
+                continue
+
+            # Процессорное время сканеров за прошедший период, секунды
+            used = 0.0
+            for pid in list(self._processes):
+                cpu_time = _cpu_time(pid)
+                if cpu_time is None:
+                    continue
+                used += cpu_time - self._cpu_times.get(pid, cpu_time)
+                self._cpu_times[pid] = cpu_time
+            if used <= budget * period:
+                continue
+
+            # Пауза, после которой среднее потребление за период и паузу равно бюджету
+            pause = min(used / budget - period, period * 10)
+            self._stopped = True
+            for pid in list(self._processes):
+                _signal(pid, signal.SIGSTOP)
+            try:
+                await asyncio.sleep(pause)
+            finally:
+                self._resume()
+            self.paused_seconds += pause
+
+    def _resume(self) -> None:
+        self._stopped = False
+        for pid in list(self._processes):
+            _signal(pid, signal.SIGCONT)
+
+def _pressure(resource: str) -> float:
+    """Наибольшее значение some avg10 среди доступных файлов PSI ресурса"""
+    value = 0.0
+    for path in PSI_PATHS[resource]:
+        try:
+            with open(path) as file:
+                for line in file:
+                    if line.startswith("some "):
+                        fields = dict(item.split("=", 1) for item in line.split()[1:])
+                        value = max(value, float(fields.get("avg10", 0.0)))
+        except (OSError, ValueError):
+            continue
+    return value
+
+def _cpu_time(pid: int) -> Optional[float]:
+    """Процессорное время процесса и его завершенных потомков, секунды"""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # Имя процесса в скобках может содержать пробелы
+            fields = file.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    utime, stime, cutime, cstime = (int(value) for value in fields[11:15])
+    return (utime + stime + cutime + cstime) / CLOCK_TICKS
+
+def _signal(pid: int, sig: int) -> None:
+    try:
+        os.kill(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+# Глобальный ограничитель сканирований
+scan_throttle = ScanThrottle()
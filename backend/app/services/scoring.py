@@ -0,0 +1,169 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.scoring import ScoringWeights
+from app.models.vulnerability import Vulnerability
+from app.services.analytics import analytics_cache
+
+# Допуск при сравнении весов из настроек с сохраненной версией
+WEIGHTS_TOLERANCE = 1e-9
+
+def score_expression(weights: ScoringWeights):
+    """SQL-выражение итогового скора (как calculate_score)"""
+    return (
+        weights.alpha * func.coalesce(Vulnerability.cvss, 0.0) +
+        weights.beta * func.coalesce(Vulnerability.impact_factor, 0.0) +
+        weights.gamma * func.coalesce(Vulnerability.exploit_probability, 0.0)
+    )
+
+def calculate_score(cvss: float, impact_factor: float, exploit_probability: float) -> float:
+    """Итоговый скор уязвимости по весам из настроек"""
+    return (
+        settings.ALPHA * cvss +
+        settings.BETA * impact_factor +
+        settings.GAMMA * exploit_probability
+    )
+
+class ScoringService:
+    """
+    Версии весов итогового скора и пересчет скора уязвимостей
+
+    Веса задаются настройками ALPHA, BETA, GAMMA; при их изменении
+    записывается новая версия. Коллектор отмечает каждую уязвимость версией,
+    с которой посчитан скор, а rescore() пересчитывает устаревшие строки одним
+    UPDATE на порцию из RESCORE_BATCH_SIZE строк (порции - диапазоны по
+    первичному ключу), чтобы не держать блокировку на всей таблице.
+    """
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._rescore_lock = threading.Lock()
+
+    def current_version(self) -> int:
+        """Версия весов из текущих настроек (создается при первом обращении)"""
+        if self._version is None:
+            with self._lock:
+                if self._version is None:
+                    db = SessionLocal()
+                    try:
+                        self._version = self.ensure(db).version
+                    finally:
+                        db.close()
+        return self._version
+
+    def ensure(self, db: Session) -> ScoringWeights:
+        """Последняя версия весов; новая записывается, если настройки изменились"""
+        weights = db.query(ScoringWeights).order_by(ScoringWeights.version.desc()).first()
+        if weights is None or any(
+            abs(stored - configured) > WEIGHTS_TOLERANCE
+            for stored, configured in (
+                (weights.alpha, settings.ALPHA),
+                (weights.beta, settings.BETA),
+                (weights.gamma, settings.GAMMA),
+            )
+        ):
+            weights = ScoringWeights(alpha=settings.ALPHA, beta=settings.BETA, gamma=settings.GAMMA)
+            db.add(weights)
+            db.commit()
+            logger.info(f"Новая версия весов скора: {weights}")
+        self._version = weights.version
+        return weights
+
+    def status(self, db: Session) -> Dict[str, Any]:
+        """Текущая версия весов и количество уязвимостей со скором другой версии"""
+        weights = self.ensure(db)
+        stale = db.query(func.count(Vulnerability.id)).filter(self._stale(weights.version)).scalar()
+        return {**self._describe(weights), "stale": stale or 0}
+
+    def rescore(self, batch_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Пересчет скора уязвимостей, посчитанного с другой версией весов
+
+        Args:
+            batch_size: Строк на один UPDATE (по умолчанию RESCORE_BATCH_SIZE)
+
+        Returns:
+            Версия весов и статистика пересчета; None, если пересчет уже выполняется
+        """
+        if not self._rescore_lock.acquire(blocking=False):
+            return None
+
+        batch_size = batch_size or settings.RESCORE_BATCH_SIZE
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            weights = self.ensure(db)
+            values = {
+                Vulnerability.score: score_expression(weights),
+                Vulnerability.score_version: weights.version,
+                # Пересчет скора не считается изменением уязвимости
+                Vulnerability.updated_at: Vulnerability.updated_at,
+            }
+
+            updated, batches, lower = 0, 0, None
+            while True:
+                # Верхняя граница порции по первичному ключу
+                bounds = db.query(Vulnerability.id)
+                if lower is not None:
+                    bounds = bounds.filter(Vulnerability.id > lower)
+                upper = bounds.order_by(Vulnerability.id).offset(batch_size - 1).limit(1).scalar()
+
+                query = db.query(Vulnerability).filter(self._stale(weights.version))
+                if lower is not None:
+                    query = query.filter(Vulnerability.id > lower)
+                if upper is not None:
+                    query = query.filter(Vulnerability.id <= upper)
+                updated += query.update(values, synchronize_session=False)
+                db.commit()
+                batches += 1
+
+                if upper is None:
+                    break
+                lower = upper
+
+            weights.rescored_at = datetime.now()
+            db.commit()
+            result = self._describe(weights)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            self._rescore_lock.release()
+
+        analytics_cache.invalidate()
+
+        duration = time.perf_counter() - started
+        logger.info(f"Скор пересчитан по весам v{result['version']}: {updated} уязвимостей, {batches} порций, {duration:.2f} с")
+        return {**result, "updated": updated, "batches": batches, "duration": duration}
+
+    @staticmethod
+    def _stale(version: int):
+        # Скор исправленных уязвимостей не пересчитывается
+        return and_(
+            Vulnerability.fixed_at.is_(None),
+            or_(Vulnerability.score_version.is_(None), Vulnerability.score_version != version)
+        )
+
+    @staticmethod
+    def _describe(weights: ScoringWeights) -> Dict[str, Any]:
+        return {
+            "version": weights.version,
+            "alpha": weights.alpha,
+            "beta": weights.beta,
+            "gamma": weights.gamma,
+            "created_at": weights.created_at,
+            "rescored_at": weights.rescored_at,
+        }
+
+# Глобальный сервис скоринга
+scoring = ScoringService()
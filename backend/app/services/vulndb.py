@@ -0,0 +1,317 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+
+# Код завершения grype db check при наличии обновления
+UPDATE_AVAILABLE = 100
+
+# Файл с именем текущей версии в VULNDB_DIR
+CURRENT_FILE = "current"
+
+@dataclass(frozen=True)
+class VulnDBVersion:
+    """Версия базы уязвимостей Grype в собственном каталоге"""
+    name: str  # {built}-v{schema}, сортируется по времени сборки
+    path: str
+    built_at: Optional[datetime] = None  # локальное время сборки
+
+    def env(self) -> Dict[str, str]:
+        """Окружение Grype: только эта версия, без проверок обновлений при запуске"""
+        return {
+            "GRYPE_DB_CACHE_DIR": self.path,
+            "GRYPE_DB_AUTO_UPDATE": "false",
+            # Свежесть базы отслеживает менеджер; база для работы без сети может быть старше 5 дней
+            "GRYPE_DB_VALIDATE_AGE": "false",
+            "GRYPE_CHECK_FOR_APP_UPDATE": "false",
+        }
+
+class VulnDBManager:
+    """
+    Жизненный цикл базы уязвимостей сканера
+
+    Grype сам не обновляет базу при сканировании: каждая версия базы лежит в
+    своем каталоге VULNDB_DIR/<версия>, сканирование запускается с
+    GRYPE_DB_CACHE_DIR этой версии и отключенным автообновлением. Раз в
+    VULNDB_CHECK_INTERVAL секунд менеджер проверяет обновление (grype db
+    check), скачивает новую версию во временный каталог и публикует ее
+    переименованием; начатые сканирования дорабатывают на прежней версии.
+
+    Без сети (VULNDB_AUTO_UPDATE=false) используется база из архива
+    VULNDB_ARCHIVE (grype db import) или ранее подготовленный каталог.
+    VULNDB_VERSION закрепляет конкретную версию без обновлений.
+    """
+
+    def __init__(self):
+        self.current: Optional[VulnDBVersion] = None
+        self.checked_at: Optional[datetime] = None
+        self._archive_signature: Optional[str] = None
+        self._in_use: Counter = Counter()
+        self._ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.current.name if self.current else None
+
+    @property
+    def built_at(self) -> Optional[datetime]:
+        return self.current.built_at if self.current else None
+
+    async def start(self) -> None:
+        """Запуск периодического обновления базы"""
+        self._task = asyncio.create_task(self._loop(), name="vulndb-update")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def ready(self) -> Optional[VulnDBVersion]:
+        """Ожидание первой попытки подготовить базу; None - управляемой базы нет"""
+        await self._ready.wait()
+        return self.current
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator[Optional[VulnDBVersion]]:
+        """Текущая версия для сканирования; каталог не удаляется до выхода из блока"""
+        database = self.current
+        if database:
+            self._in_use[database.name] += 1
+        try:
+            yield database
+        finally:
+            if database:
+                self._in_use[database.name] -= 1
+                if self._in_use[database.name] <= 0:
+                    del self._in_use[database.name]
+
+    async def refresh(self) -> bool:
+        """
+        Одна проверка базы: закрепленная версия, импорт архива или обновление из сети
+
+        Returns:
+            True, если текущая версия сменилась
+        """
+        async with self._lock:
+            os.makedirs(settings.VULNDB_DIR, exist_ok=True)
+            previous = self.version
+            self.checked_at = datetime.now()
+
+            if settings.VULNDB_VERSION:
+                self._activate(self._load(settings.VULNDB_VERSION))
+                return self.version != previous
+
+            if self.current is None:
+                self._activate(self._load(self._read_current()) or self._latest())
+
+            database = await self._import_archive()
+            if database is None and settings.VULNDB_AUTO_UPDATE and await self._update_available():
+                database = await self._download()
+            if database:
+                self._activate(database)
+
+            self._cleanup()
+            return self.version != previous
+
+    async def _import_archive(self) -> Optional[VulnDBVersion]:
+        """Импорт архива базы (grype db import), если файл изменился"""
+        path = settings.VULNDB_ARCHIVE
+        if not path or not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        signature = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+        if signature == self._archive_signature:
+            return None
+
+        database = await self._stage(["db", "import", path], f"импорт {path}")
+        self._archive_signature = signature
+        return database
+
+    async def _update_available(self) -> bool:
+        """Проверка наличия новой версии относительно текущей (grype db check)"""
+        if self.current is None:
+            return True
+        # Проверка и загрузка обращаются к одному источнику обновлений
+        code, output = await self._grype(["db", "check"], {**self.current.env(), **_source_env()})
+        # Старые версии Grype сообщают об обновлении только текстом ("Update available!" / "No update available")
+        text = output.lower()
+        if code == UPDATE_AVAILABLE or (code == 0 and "update available" in text and "no update available" not in text):
+            return True
+        if code != 0:
+            logger.warning(f"Не удалось проверить обновление базы уязвимостей: {output.strip()}")
+        return False
+
+    async def _download(self) -> Optional[VulnDBVersion]:
+        return await self._stage(["db", "update"], "обновление")
+
+    async def _stage(self, args: List[str], action: str) -> Optional[VulnDBVersion]:
+        """Подготовка версии во временном каталоге и публикация под именем версии"""
+        staging = os.path.join(settings.VULNDB_DIR, f".staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            code, output = await self._grype(args, _staging_env(staging), timeout=settings.VULNDB_UPDATE_TIMEOUT)
+            if code != 0:
+                logger.error(f"Ошибка базы уязвимостей ({action}): {output.strip()}")
+                return None
+
+            name, built_at = await self._describe(staging)
+            if name is None:
+                logger.error(f"Ошибка базы уязвимостей ({action}): не удалось определить версию")
+                return None
+
+            path = os.path.join(settings.VULNDB_DIR, name)
+            if not os.path.isdir(path):
+                try:
+                    os.rename(staging, path)
+                except OSError:
+                    # Версия уже опубликована другим процессом
+                    pass
+            return VulnDBVersion(name=name, path=path, built_at=built_at)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    async def _describe(self, path: str) -> Tuple[Optional[str], Optional[datetime]]:
+        """Имя версии по времени сборки и схеме базы (grype db status)"""
+        _, output = await self._grype(["db", "status", "-o", "json"], _staging_env(path))
+        try:
+            status = json.loads(output)
+            built, schema = status.get("built"), status.get("schemaVersion")
+        except (json.JSONDecodeError, AttributeError):
+            # Старые версии Grype выводят только текст
+            built = _text_field(output, "Built")
+            schema = _text_field(output, "Schema")
+        if not built:
+            return None, None
+
+        try:
+            built_utc = datetime.fromisoformat(built.replace("Z", "+00:00"))
+        except ValueError:
+            return None, None
+        name = f"{built_utc:%Y%m%dT%H%M%SZ}-v{str(schema or 0).lstrip('v')}"
+        # Время сборки в UTC; в БД хранится локальное время
+        return name, built_utc.astimezone().replace(tzinfo=None)
+
+    def _load(self, name: Optional[str]) -> Optional[VulnDBVersion]:
+        """Версия из каталога VULNDB_DIR/<name>"""
+        if not name:
+            return None
+        path = os.path.join(settings.VULNDB_DIR, name)
+        if not os.path.isdir(path):
+            logger.warning(f"Каталог базы уязвимостей {path} не найден")
+            return None
+        return VulnDBVersion(name=name, path=path, built_at=_parse_name(name))
+
+    def _latest(self) -> Optional[VulnDBVersion]:
+        """Последняя подготовленная версия (в т.ч. скопированная вручную для работы без сети)"""
+        names = sorted(name for name in self._versions() if _parse_name(name))
+        return self._load(names[-1]) if names else None
+
+    def _activate(self, database: Optional[VulnDBVersion]) -> None:
+        if database is None or database == self.current:
+            return
+        logger.info(f"База уязвимостей: версия {database.name}" + (f" (было {self.current.name})" if self.current else ""))
+        self.current = database
+        with open(os.path.join(settings.VULNDB_DIR, f"{CURRENT_FILE}.tmp"), "w") as file:
+            file.write(database.name)
+        os.replace(os.path.join(settings.VULNDB_DIR, f"{CURRENT_FILE}.tmp"), os.path.join(settings.VULNDB_DIR, CURRENT_FILE))
+
+    def _read_current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(settings.VULNDB_DIR, CURRENT_FILE)) as file:
+                return file.read().strip() or None
+        except OSError:
+            return None
+
+    def _versions(self) -> List[str]:
+        return [
+            name for name in os.listdir(settings.VULNDB_DIR)
+            if not name.startswith(".") and os.path.isdir(os.path.join(settings.VULNDB_DIR, name))
+        ]
+
+    def _cleanup(self) -> None:
+        """Удаление старых версий сверх VULNDB_KEEP, кроме используемых сканированиями"""
+        names = sorted((name for name in self._versions() if _parse_name(name)), reverse=True)
+        for name in names[max(settings.VULNDB_KEEP, 1):]:
+            if name != self.version and name not in self._in_use:
+                shutil.rmtree(os.path.join(settings.VULNDB_DIR, name), ignore_errors=True)
+                logger.debug(f"Удалена версия базы уязвимостей {name}")
+
+    async def _grype(self, args: List[str], env: Dict[str, str], timeout: Optional[float] = None) -> Tuple[int, str]:
+        """Запуск grype db ...; возвращает код завершения и вывод"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "grype", *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env={**os.environ, **env}
+            )
+        except OSError as e:
+            return -1, str(e)
+
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return -1, f"превышено время ожидания {timeout}с"
+        return process.returncode, stdout.decode(errors="replace")
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления базы уязвимостей: {str(e)}")
+            finally:
+                if not self._ready.is_set():
+                    if self.current is None:
+                        logger.warning("Управляемая база уязвимостей недоступна, Grype использует свою без автообновления")
+                    self._ready.set()
+            await asyncio.sleep(settings.VULNDB_CHECK_INTERVAL)
+
+def scan_env(database: Optional[VulnDBVersion]) -> Dict[str, str]:
+    """Окружение Grype для сканирования; без управляемой базы - база Grype по умолчанию, тоже без автообновления"""
+    if database:
+        return database.env()
+    return {"GRYPE_DB_AUTO_UPDATE": "false", "GRYPE_CHECK_FOR_APP_UPDATE": "false"}
+
+def _source_env() -> Dict[str, str]:
+    """Источник обновлений базы (список версий)"""
+    return {"GRYPE_DB_UPDATE_URL": settings.VULNDB_UPDATE_URL} if settings.VULNDB_UPDATE_URL else {}
+
+def _staging_env(path: str) -> Dict[str, str]:
+    return {
+        "GRYPE_DB_CACHE_DIR": path,
+        "GRYPE_DB_VALIDATE_AGE": "false",
+        "GRYPE_CHECK_FOR_APP_UPDATE": "false",
+        **_source_env(),
+    }
+
+def _parse_name(name: str) -> Optional[datetime]:
+    """Время сборки из имени версии {built}-v{schema}"""
+    try:
+        built = datetime.strptime(name.split("-", 1)[0], "%Y%m%dT%H%M%SZ")
+    except ValueError:
+        return None
+    return built.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+def _text_field(output: str, field: str) -> Optional[str]:
+    match = re.search(rf"{field}:\s*(\S+)", output)
+    return match.group(1) if match else None
+
+# Глобальный менеджер базы уязвимостей
+vulndb = VulnDBManager()
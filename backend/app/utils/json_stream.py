@@ -0,0 +1,83 @@
+import json
+import re
+from typing import Any, List
+
+# Длина начала документа, после которой без совпадения с ожидаемым началом
+# документ разбирается целиком
+PREFIX_LIMIT = 4096
+
+class JSONArrayStream:
+    """
+    Инкрементальный разбор элементов массива в JSON-объекте
+
+    Рассчитан на документы, где массив идет первым ключом объекта
+    ({"matches": [...], ...}, как в выводе Grype): элементы возвращаются по
+    мере поступления текста, остаток документа после массива не разбирается.
+    Документ другой структуры накапливается и разбирается целиком в close().
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._prefix = re.compile(r'\s*\{\s*"%s"\s*:\s*\[' % re.escape(key))
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "prefix"  # prefix, items, done, document
+
+    def feed(self, text: str) -> List[Any]:
+        """Добавление очередной части текста; возвращает полностью полученные элементы"""
+        if self._state == "done":
+            return []
+        self._buffer += text
+
+        if self._state == "prefix":
+            match = self._prefix.match(self._buffer)
+            if match:
+                self._buffer = self._buffer[match.end():]
+                self._state = "items"
+            elif "[" in self._buffer or len(self._buffer) > PREFIX_LIMIT:
+                self._state = "document"
+        if self._state != "items":
+            return []
+
+        items, position, length = [], 0, len(self._buffer)
+        while True:
+            while position < length and self._buffer[position] in " \t\r\n,":
+                position += 1
+            if position == length:
+                break
+            if self._buffer[position] == "]":
+                self._state = "done"
+                break
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                # Элемент получен не полностью
+                break
+            if end == length and not isinstance(item, (dict, list)):
+                # Число в конце буфера может продолжиться в следующей части
+                break
+            items.append(item)
+            position = end
+
+        self._buffer = "" if self._state == "done" else self._buffer[position:]
+        return items
+
+    def close(self) -> List[Any]:
+        """
+        Завершение разбора
+
+        Returns:
+            Элементы массива документа, разбиравшегося целиком
+
+        Raises:
+            ValueError: Документ обрезан или некорректен
+        """
+        if self._state == "items":
+            raise ValueError(f"Массив {self.key} не завершен")
+        if self._state == "done":
+            return []
+
+        document = json.loads(self._buffer)
+        self._buffer = ""
+        self._state = "done"
+        return (document.get(self.key) or []) if isinstance(document, dict) else []
@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+import pytest
+
+# Настройки читаются при импорте app.core.config, поэтому окружение задается до импорта приложения
+_db_dir = tempfile.mkdtemp(prefix="aegis-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'aegis.db')}"
+os.environ.setdefault("DEV_MODE", "true")
+os.environ.pop("DATABASE_READ_URL", None)
+
+@pytest.fixture
+def db():
+    """Пустая БД с актуальной схемой"""
+    from app.db.init import init_db
+    from app.db.session import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    """Клиент API без фоновых сервисов (DEV_MODE)"""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,144 @@
+"""Заглушка Docker Engine API для проверки исполнителя плана без Docker"""
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+class DockerAPIStub:
+    """
+    Контейнеры в памяти и вызовы, которые использует PatchExecutor
+
+    Контейнер, созданный через API с именем из failing_names, при запуске
+    сразу завершается с ошибкой.
+    """
+
+    def __init__(self):
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.failing_names: Set[str] = set()
+        self.lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"tcp://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "DockerAPIStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+            def do_DELETE(self):
+                stub._handle(self, "DELETE")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add(self, name: str, image: str) -> str:
+        """Запущенный контейнер с сетью app"""
+        container_id = uuid.uuid4().hex * 2
+        self.containers[container_id] = {
+            "Id": container_id,
+            "Name": f"/{name}",
+            "Config": {"Image": image, "Hostname": container_id[:12]},
+            "HostConfig": {"NetworkMode": "app", "PortBindings": {}},
+            "NetworkSettings": {"Networks": {"app": {"Aliases": [name, container_id[:12]]}}},
+            "State": {"Status": "running", "Running": True},
+        }
+        return container_id
+
+    def by_name(self) -> Dict[str, Dict[str, Any]]:
+        return {attrs["Name"].lstrip("/"): attrs for attrs in self.containers.values()}
+
+    def _find(self, ref: str) -> Optional[str]:
+        for container_id, attrs in self.containers.items():
+            if container_id.startswith(ref) or attrs["Name"] == f"/{ref}":
+                return container_id
+        return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlparse(handler.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = re.sub(r"^/v[\d.]+", "", url.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length)) if length else None
+
+        with self.lock:
+            code, response = self._route(method, path, query, body)
+
+        data = json.dumps(response).encode() if response is not None else b""
+        handler.send_response(code)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _route(self, method: str, path: str, query: Dict[str, str], body: Any):
+        if path == "/version":
+            return 200, {"ApiVersion": "1.43", "Version": "24.0.0"}
+        if path == "/images/create":
+            return 200, {"status": "Downloaded"}
+        match = re.match(r"/images/(.+)/json$", path)
+        if match:
+            return 200, {"Id": "sha256:" + "0" * 64, "RepoTags": [match.group(1)]}
+
+        if path == "/containers/create":
+            name = query["name"]
+            if self._find(name):
+                return 409, {"message": f"Conflict. The container name \"/{name}\" is already in use"}
+            container_id = uuid.uuid4().hex * 2
+            networks = (body.get("NetworkingConfig") or {}).get("EndpointsConfig") or {}
+            self.containers[container_id] = {
+                "Id": container_id,
+                "Name": f"/{name}",
+                "Config": {key: value for key, value in body.items() if key not in ("HostConfig", "NetworkingConfig")},
+                "HostConfig": body["HostConfig"],
+                "NetworkSettings": {"Networks": dict(networks)},
+                "State": {"Status": "created", "Running": False},
+                "failing": name in self.failing_names,
+            }
+            return 201, {"Id": container_id}
+
+        match = re.match(r"/networks/([^/]+)/connect$", path)
+        if match:
+            container_id = self._find(body["Container"])
+            self.containers[container_id]["NetworkSettings"]["Networks"][match.group(1)] = body.get("EndpointConfig") or {}
+            return 200, None
+
+        match = re.match(r"/containers/([^/]+)(?:/(\w+))?$", path)
+        container_id = self._find(match.group(1)) if match else None
+        if container_id is None:
+            return 404, {"message": f"No such container or route: {path}"}
+        attrs, action = self.containers[container_id], match.group(2)
+
+        if method == "DELETE":
+            del self.containers[container_id]
+            return 204, None
+        if action == "json":
+            return 200, {key: value for key, value in attrs.items() if key != "failing"}
+        if action == "rename":
+            attrs["Name"] = f"/{query['name']}"
+            return 204, None
+        if action == "stop":
+            attrs["State"] = {"Status": "exited", "Running": False, "ExitCode": 0}
+            return 204, None
+        if action == "start":
+            failing = attrs.get("failing")
+            attrs["State"] = {"Status": "exited", "Running": False, "ExitCode": 1} if failing else {"Status": "running", "Running": True}
+            return 204, None
+        return 404, {"message": f"Unsupported route: {method} {path}"}
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from app.models.container import Container
+from app.models.patch_plan import PatchPlan, PatchScenario
+from app.models.vulnerability import Vulnerability
+from app.services.collector import ContainerCollector
+
+def _finding(fix):
+    return {
+        "vulnerability": {
+            "id": "CVE-2024-1",
+            "severity": "High",
+            "description": "",
+            "cvss": [{"version": "3.1", "metrics": {"baseScore": 7.5, "impactScore": 3.6}}],
+            "fix": fix,
+        },
+        "artifact": {"name": "openssl", "version": "3.0.0"},
+    }
+
+def test_fixed_version_from_vulnerability_fix():
+    collector = ContainerCollector([], 60)
+
+    fixed = collector._parse_vulnerability("c1", _finding({"versions": ["3.0.1", "3.1.0"], "state": "fixed"}))
+    not_fixed = collector._parse_vulnerability("c1", _finding({"versions": [], "state": "not-fixed"}))
+
+    assert fixed["fixed_version"] == "3.0.1"
+    assert not_fixed["fixed_version"] is None
+
+def test_fixed_findings_are_kept(client, db):
+    db.add(Container(id="c1", host="local", name="api", image="api:1.0", status="running"))
+    db.commit()
+    collector = ContainerCollector([], 60)
+    first = _finding({"versions": ["3.0.1"], "state": "fixed"})
+    second = {**first, "vulnerability": {**first["vulnerability"], "id": "CVE-2024-2"}}
+
+    collector._save_vulnerabilities("c1", [first, second], image="api:1.0")
+    db.add(PatchPlan(container_id="c1", vulnerability_id="c1_CVE-2024-2", scenario=PatchScenario.HOT_PATCH,
+                     start_time=datetime.now(), duration=10, priority=1.0, status="completed"))
+    db.commit()
+
+    # CVE-2024-2 исправлена: запись и задача плана остаются
+    _, removed = collector._save_vulnerabilities("c1", [first], image="api:1.0")
+    assert removed == ["c1_CVE-2024-2"]
+    db.expire_all()
+    assert db.query(Vulnerability).filter(Vulnerability.id == "c1_CVE-2024-2").one().fixed_at is not None
+    assert db.query(PatchPlan).count() == 1
+    assert [item["cve_id"] for item in client.get("/v1/vulnerabilities/").json()] == ["CVE-2024-1"]
+
+    # Повторное обнаружение снова открывает уязвимость
+    added, removed = collector._save_vulnerabilities("c1", [first, second], image="api:1.0")
+    assert [finding["id"] for finding in added] == ["c1_CVE-2024-2"] and removed == []
+    db.expire_all()
+    assert db.query(Vulnerability).filter(Vulnerability.id == "c1_CVE-2024-2").one().fixed_at is None
@@ -0,0 +1,27 @@
+import asyncio
+
+from app.models.hook import Hook
+from app.services.hook_engine import HookEngine
+
+def test_emit_uses_cached_hooks(db, monkeypatch):
+    db.add(Hook(name="notify", type="on_detect", script="cat >/dev/null", enabled=True))
+    db.commit()
+    engine = HookEngine(workers=1, queue_size=8)
+    loads = []
+    load_hooks = engine._load_hooks
+    monkeypatch.setattr(engine, "_load_hooks", lambda event: loads.append(event) or load_hooks(event))
+
+    async def run():
+        await engine.start()
+        try:
+            assert await engine.emit("on_detect", {}) == 1
+            assert await engine.emit("on_detect", {}) == 1
+            engine.invalidate()
+            assert await engine.emit("on_detect", {}) == 1
+            await engine.queue.join()
+        finally:
+            await engine.stop()
+
+    asyncio.run(run())
+
+    assert loads == ["on_detect", "on_detect"]
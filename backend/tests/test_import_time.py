@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+# Модули, которые не должны загружаться при импорте приложения (загружаются при первом обращении)
+LAZY_MODULES = ("pulp", "networkx", "numpy", "pandas", "scipy", "docker")
+
+# Верхняя граница импорта кода приложения поверх фреймворков, секунды; с запасом для медленных машин CI
+IMPORT_LIMIT = float(os.environ.get("AEGIS_IMPORT_LIMIT", "5"))
+
+CHECK_SCRIPT = """
+import sys, time, json
+import fastapi, sqlalchemy.orm, pydantic_settings, loguru
+started = time.perf_counter()
+import app.main
+print(json.dumps({
+    "elapsed": time.perf_counter() - started,
+    "modules": sorted(m for m in sys.modules if m.split(".")[0] in %r),
+}))
+""" % (LAZY_MODULES,)
+
+def test_cold_import_skips_heavy_modules():
+    """Холодный импорт app.main в новом интерпретаторе не загружает тяжелые подсистемы"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": backend_dir, "DEV_MODE": "true"}
+
+    result = subprocess.run([sys.executable, "-c", CHECK_SCRIPT], cwd=backend_dir, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["modules"] == []
+    assert report["elapsed"] < IMPORT_LIMIT
@@ -0,0 +1,29 @@
+import asyncio
+
+from loguru import logger
+
+import app.main as main
+
+def test_background_startup_failure_is_logged(monkeypatch):
+    def broken_init_db():
+        raise RuntimeError("database is unavailable")
+
+    monkeypatch.setattr(main.settings, "DB_INIT_ON_STARTUP", True)
+    monkeypatch.setattr(main, "init_db", broken_init_db)
+    messages = []
+    sink = logger.add(messages.append, level="ERROR")
+
+    async def run():
+        task = asyncio.create_task(main.start_background_services(), name="background-startup")
+        task.add_done_callback(main.log_task_failure)
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    try:
+        asyncio.run(run())
+    finally:
+        logger.remove(sink)
+
+    assert len(messages) == 1
+    assert "background-startup" in messages[0]
+    assert "database is unavailable" in messages[0]
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from app.models.container import Container
+from app.models.patch_plan import PatchPlan, PatchScenario
+from app.services.docker_hosts import DockerHost, docker_hosts
+from app.services.patch_executor import PatchExecutor, target_image
+from docker_api_stub import DockerAPIStub
+
+@pytest.fixture
+def stub():
+    stub = DockerAPIStub().start()
+    docker_hosts.configure([DockerHost(name="edge1", url=stub.url)])
+    yield stub
+    docker_hosts.configure([])
+    stub.stop()
+
+def _plan(db, stub, scenario, names, target="api:1.1"):
+    """Задача плана для контейнеров api:1.0 на хосте edge1"""
+    container_ids = []
+    for name in names:
+        container_id = stub.add(name, "api:1.0")
+        db.add(Container(id=container_id, host="edge1", name=name, image="api:1.0", status="running"))
+        container_ids.append(container_id)
+    plan = PatchPlan(
+        container_id=container_ids[0], vulnerability_id=f"{container_ids[0]}_CVE-1", image="api:1.0",
+        package_name="openssl", fixed_version="3.0.1", container_ids=container_ids, scenario=scenario,
+        start_time=datetime.now(), duration=10, priority=1.0, status="queued", target_image=target
+    )
+    db.add(plan)
+    db.commit()
+    return plan.id
+
+def _execute(db, plan_id):
+    asyncio.run(PatchExecutor()._run(plan_id, time.time()))
+    db.expire_all()
+    return db.query(PatchPlan).filter(PatchPlan.id == plan_id).one()
+
+@pytest.mark.parametrize("scenario", list(PatchScenario))
+def test_all_containers_updated(db, stub, scenario):
+    plan_id = _plan(db, stub, scenario, ["api-1", "api-2"])
+
+    plan = _execute(db, plan_id)
+
+    assert plan.status == "completed", plan.error
+    containers = stub.by_name()
+    assert set(containers) == {"api-1", "api-2"}
+    assert all(attrs["Config"]["Image"] == "api:1.1" and attrs["State"]["Running"] for attrs in containers.values())
+
+@pytest.mark.parametrize("scenario", [PatchScenario.HOT_PATCH, PatchScenario.ROLLING_UPDATE])
+def test_failure_rolls_back_whole_task(db, stub, scenario):
+    plan_id = _plan(db, stub, scenario, ["api-1", "api-2", "api-3"])
+    stub.failing_names.add("api-2")
+
+    plan = _execute(db, plan_id)
+
+    assert plan.status == "rolled_back"
+    assert "api-2" in plan.error
+    containers = stub.by_name()
+    assert set(containers) == {"api-1", "api-2", "api-3"}
+    assert all(attrs["Config"]["Image"] == "api:1.0" and attrs["State"]["Running"] for attrs in containers.values())
+
+def test_target_image_from_fixed_version(db, stub):
+    plan_id = _plan(db, stub, PatchScenario.HOT_PATCH, ["api-1"], target=None)
+    db.query(PatchPlan).filter(PatchPlan.id == plan_id).update({PatchPlan.package_name: "api", PatchPlan.fixed_version: "1.0.2"})
+    db.commit()
+
+    plan = _execute(db, plan_id)
+
+    assert plan.target_image == "api:1.0.2"
+    assert stub.by_name()["api-1"]["Config"]["Image"] == "api:1.0.2"
+
+def test_target_image():
+    assert target_image("redis:7.0.11-alpine", "redis", "7.0.12") == "redis:7.0.12-alpine"
+    assert target_image("registry:5000/team/redis", "redis", "7.0.12") == "registry:5000/team/redis:7.0.12"
+    # Пакет внутри образа: образ пересобирается под шаблоном PATCH_TARGET_IMAGE
+    assert target_image("api:1.0", "openssl", "3.0.1") == "api:1.0"
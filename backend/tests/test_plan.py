@@ -0,0 +1,117 @@
+from datetime import datetime
+
+from app.models.container import Container
+from app.models.patch_plan import PatchPlan, PatchScenario
+from app.models.vulnerability import Vulnerability
+from app.schemas.plan import PatchPlanUpdate
+from app.services.hook_engine import plan_event_payload
+
+def _add_image(db, image, containers, packages, severity="Critical", score=9.0):
+    """Образ на нескольких контейнерах с уязвимостями в нескольких пакетах"""
+    for container_id, host in containers:
+        db.add(Container(id=container_id, host=host, name=container_id, image=image, status="running"))
+        for package in packages:
+            db.add(Vulnerability(
+                id=f"{container_id}_CVE-{package}",
+                container_id=container_id,
+                cve_id=f"CVE-{package}",
+                package_name=package,
+                package_version="1.0",
+                fixed_version="1.1",
+                cvss=score,
+                severity=severity,
+                description="",
+                details={},
+                score=score,
+                impact_factor=0.5,
+                exploit_probability=0.3,
+            ))
+    db.commit()
+
+def test_frontier_applies_plan_constraints(client, db):
+    # Один образ с большим числом действий: лимит образа, а не общая емкость дорожек
+    _add_image(db, "api:1", [("api1", "edge1")], [f"pkg{i}" for i in range(12)])
+    _add_image(db, "web:1", [("web1", "edge2")], ["libssl"], severity="Low", score=2.0)
+
+    response = client.get("/v1/plan/frontier", params={"windows": [1, 2]})
+
+    assert response.status_code == 200
+    body = response.json()
+    curve = {point["window"]: point["total_priority"] for point in body["curve"]}
+    for plan in body["plans"]:
+        tasks = plan["tasks"]
+        # Точка кривой совпадает с планом окна
+        assert curve[plan["window"]] == plan["total_priority"] == sum(task["priority"] for task in tasks)
+        # Задачи образа выполняются последовательно внутри окна
+        api_minutes = sum(task["duration"] for task in tasks if task["image"] == "api:1")
+        assert 0 < api_minutes <= plan["window"] * 60
+        for task in tasks:
+            elapsed = datetime.fromisoformat(task["end"]) - datetime.fromisoformat(task["start"])
+            assert elapsed.total_seconds() <= plan["window"] * 3600
+    assert curve[1] <= curve[2]
+
+def test_plan_returns_unscheduled_actions(client, db, monkeypatch):
+    from app.planner.topology import topology
+
+    # Контейнеры без сетевых связей: длительность равна базовой длительности сценария
+    monkeypatch.setattr(topology, "factors", lambda container_ids=None: {})
+    # Все действия укладываются в суммарную емкость дорожек (8 x 30 мин = 4 x 60 мин),
+    # но два действия образа api:1 выполняются последовательно и оставляют простой
+    _add_image(db, "api:1", [("api1", "edge1")], ["pkg0", "pkg1"], severity="Medium", score=5.9)
+    for i in range(6):
+        _add_image(db, f"svc{i}:1", [(f"svc{i}", "edge1")], ["libssl"], severity="Medium", score=5.0)
+
+    response = client.get("/v1/plan/", params={"window": 1})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["tasks"]) == 7
+    assert [(item["image"], item["duration"]) for item in body["unscheduled"]] == [("svc5:1", 30)]
+    assert body["total_duration"] == sum(task["duration"] for task in body["tasks"]) == 210
+
+def test_plan_skips_vulnerabilities_without_fix(client, db):
+    _add_image(db, "api:1", [("api1", "edge1")], ["pkg0"])
+    db.query(Vulnerability).update({Vulnerability.fixed_version: None})
+    _add_image(db, "web:1", [("web1", "edge1")], ["pkg1"])
+
+    response = client.get("/v1/plan/", params={"window": 4})
+
+    assert response.status_code == 200
+    assert [task["image"] for task in response.json()["tasks"]] == ["web:1"]
+
+def test_update_plan_task_target_image(client, db):
+    plan = PatchPlan(container_id="api1", vulnerability_id="api1_CVE-1", image="api:1", scenario=PatchScenario.HOT_PATCH,
+                     start_time=datetime.now(), duration=10, priority=1.0, status="pending")
+    db.add(plan)
+    db.commit()
+
+    response = client.patch(f"/v1/plan/{plan.id}", json={"target_image": "api:1.1", "status": "pending"})
+
+    assert response.status_code == 200
+    assert response.json()["target_image"] == "api:1.1"
+    # Событие обновления строится из полей запроса
+    assert set(PatchPlanUpdate.model_fields) <= set(plan_event_payload(plan))
+
+def test_simulate_plan(client, db):
+    _add_image(db, "api:1", [("api1", "edge1")], ["pkg0", "pkg1"])
+
+    response = client.post("/v1/plan/simulate", json={"window": 4, "refresh": True})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["actions_considered"] == 2
+    assert {task["package_name"] for task in body["tasks"]} == {"pkg0", "pkg1"}
+
+def test_simulate_plan_applies_plan_constraints(client, db):
+    # Лимит образа связывает выбор сильнее, чем общая емкость дорожек
+    _add_image(db, "api:1", [("api1", "edge1")], [f"pkg{i}" for i in range(12)])
+    _add_image(db, "web:1", [("web1", "edge2")], ["libssl"], severity="Low", score=2.0)
+
+    plan = client.get("/v1/plan/", params={"window": 1}).json()
+    response = client.post("/v1/plan/simulate", json={"window": 1, "refresh": True})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert sum(task["duration"] for task in body["tasks"] if task["image"] == "api:1") <= 60
+    assert len(body["tasks"]) == len(plan["tasks"])
+    assert body["total_duration"] == plan["total_duration"]
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from app.core.config import settings
+from app.models.container import Container
+from app.models.scan_history import DailySeverityRollup
+from app.models.vulnerability import Vulnerability
+from app.services.scan_history import ScanHistory
+
+def _add_vulnerability(db, cve_id, container_id="api1"):
+    if db.get(Container, container_id) is None:
+        db.add(Container(id=container_id, host="edge1", name=container_id, image="api:1", status="running"))
+    db.add(Vulnerability(
+        id=f"{container_id}_{cve_id}", container_id=container_id, cve_id=cve_id, package_name="openssl",
+        package_version="1.0", fixed_version="1.1", cvss=9.0, severity="Critical", description="", details={},
+    ))
+    db.commit()
+
+def _rows(db):
+    db.expire_all()
+    return [
+        (row.day, row.count, row.added)
+        for row in db.query(DailySeverityRollup).order_by(DailySeverityRollup.day)
+    ]
+
+def test_seed_survives_repeated_rollups(db):
+    _add_vulnerability(db, "CVE-1")
+    _add_vulnerability(db, "CVE-2")
+    history = ScanHistory()
+
+    for _ in range(3):
+        history.rollup()
+        assert _rows(db) == [(date.today() - timedelta(days=1), 2, 0)]
+
+    assert history.trends(db, 2)[-1]["counts"] == {"Critical": 2}
+
+def test_rollup_rebuilds_last_day(db):
+    _add_vulnerability(db, "CVE-1")
+    history = ScanHistory()
+    history.rollup()
+
+    _add_vulnerability(db, "CVE-2")
+    history.record(db, "api1", "api:1", "scan-1", [("added", {"cve_id": "CVE-2", "severity": "Critical"})])
+    db.commit()
+
+    for _ in range(2):
+        history.rollup()
+        assert _rows(db) == [(date.today() - timedelta(days=1), 1, 0), (date.today(), 2, 1)]
+
+def test_purge_carries_value_to_cutoff(db):
+    old_day = date.today() - timedelta(days=settings.HISTORY_ROLLUP_RETENTION_DAYS + 10)
+    db.add(DailySeverityRollup(day=old_day, container_id="api1", image="api:1", severity="Critical",
+                               count=3, added=0, removed=0))
+    db.commit()
+    history = ScanHistory()
+
+    cutoff = date.today() - timedelta(days=settings.HISTORY_ROLLUP_RETENTION_DAYS)
+    for _ in range(2):
+        history.rollup()
+        assert _rows(db) == [(cutoff, 3, 0)]
+
+    assert history.trends(db, 1)[0]["counts"] == {"Critical": 3}
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.services.scan_queue import ScanQueue
+
+def test_worker_claims_and_finishes_job(db):
+    queue = ScanQueue(workers=2)
+    scanned = []
+
+    async def runner(job):
+        scanned.append(job.image)
+        return 3, "20240101T000000Z-v5"
+
+    async def run():
+        job, _ = queue.submit("api:1.0", "sha256:aa", "c1", source="manual", host="edge1")
+        await queue.start(runner)
+        try:
+            for _ in range(100):
+                if queue.get(job.id).status == "completed":
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+        return queue.get(job.id)
+
+    job = asyncio.run(run())
+
+    assert scanned == ["api:1.0"]
+    assert (job.status, job.findings_count, job.vulndb_version) == ("completed", 3, "20240101T000000Z-v5")
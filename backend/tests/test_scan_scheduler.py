@@ -0,0 +1,47 @@
+from app.models.image_schedule import ImageSchedule
+from app.services.scan_scheduler import ScanScheduler
+
+def _container(digest):
+    return {"image": "api:latest", "image_id": digest, "ports": {}}
+
+def test_same_tag_on_hosts_with_different_digests(db):
+    scheduler = ScanScheduler()
+
+    assert scheduler.observe("edge1", _container("sha256:aa"))
+    assert scheduler.observe("edge2", _container("sha256:bb"))
+    scheduler.record_scan("api:latest", "edge1", "sha256:aa", [])
+    scheduler.record_scan("api:latest", "edge2", "sha256:bb", [])
+
+    # Чередование хостов при обходе не считается сменой digest
+    for _ in range(3):
+        assert not scheduler.observe("edge1", _container("sha256:aa"))
+        assert not scheduler.observe("edge2", _container("sha256:bb"))
+
+    schedules = {schedule.host: schedule for schedule in db.query(ImageSchedule).all()}
+    assert {host: schedule.image_digest for host, schedule in schedules.items()} == {
+        "edge1": "sha256:aa",
+        "edge2": "sha256:bb",
+    }
+    assert all(schedule.churn == 0.0 for schedule in schedules.values())
+
+def test_scan_result_applies_to_hosts_with_same_digest(db):
+    scheduler = ScanScheduler()
+    scheduler.observe("edge1", _container("sha256:aa"))
+    scheduler.observe("edge2", _container("sha256:aa"))
+
+    scheduler.record_scan("api:latest", "edge1", "sha256:aa", [{"vulnerability": {"severity": "Critical"}}])
+
+    schedules = db.query(ImageSchedule).all()
+    assert len(schedules) == 2
+    assert all(schedule.max_severity == "Critical" and schedule.last_scan_at for schedule in schedules)
+
+def test_redeploy_on_host_is_scanned_immediately(db):
+    scheduler = ScanScheduler()
+    scheduler.observe("edge1", _container("sha256:aa"))
+    scheduler.record_scan("api:latest", "edge1", "sha256:aa", [])
+
+    assert scheduler.observe("edge1", _container("sha256:cc"))
+
+    schedule = db.query(ImageSchedule).one()
+    assert schedule.image_digest == "sha256:cc"
+    assert schedule.churn == 1.0
@@ -0,0 +1,14 @@
+from app.models.container import Container
+from app.models.scan_job import ScanJob
+
+def test_manual_scan_uses_container_host(client, db):
+    db.add(Container(id="abc123", host="edge1", name="api", image="api:1.0", image_id="sha256:aa", status="running"))
+    db.commit()
+
+    response = client.post("/v1/containers/api/scan")
+
+    assert response.status_code == 200
+    job = db.query(ScanJob).filter(ScanJob.id == response.json()["scan_id"]).one()
+    assert job.host == "edge1"
+    assert job.source == "manual"
+    assert job.container_ids == ["abc123"]
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from app.db import session
+from app.models.patch_plan import PatchPlan, PatchScenario
+
+def test_bulk_update_marks_write(db, monkeypatch):
+    plan = PatchPlan(container_id="api1", vulnerability_id="api1_CVE-1", image="api:1", scenario=PatchScenario.HOT_PATCH,
+                     start_time=datetime.now(), duration=10, priority=1.0, status="pending")
+    db.add(plan)
+    db.commit()
+    monkeypatch.setattr(session, "_last_write", 0.0)
+
+    # Чтение не открывает окно read-your-writes
+    db.query(PatchPlan).all()
+    db.commit()
+    assert session._last_write == 0.0
+
+    # Массовый UPDATE, как захват задачи в PatchExecutor.submit, не проходит через flush сессии
+    db.query(PatchPlan).filter(PatchPlan.id == plan.id).update({PatchPlan.status: "queued"}, synchronize_session=False)
+    db.commit()
+    assert session._last_write > 0.0
+
+def test_rolled_back_write_is_not_marked(db, monkeypatch):
+    monkeypatch.setattr(session, "_last_write", 0.0)
+
+    db.query(PatchPlan).update({PatchPlan.status: "queued"}, synchronize_session=False)
+    db.rollback()
+    db.commit()
+
+    assert session._last_write == 0.0
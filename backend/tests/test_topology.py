@@ -0,0 +1,32 @@
+from app.models.container import Container
+from app.planner.topology import topology
+from app.services.collector import ContainerCollector
+from app.services.docker_hosts import DockerHost
+
+def _add(db, container_id, image, host="edge1"):
+    db.add(Container(id=container_id, host=host, name=container_id, image=image, status="running"))
+
+def test_missing_container_leaves_topology(db):
+    for container_id in ("a1", "a2", "a3"):
+        _add(db, container_id, "api:1.0")
+    _add(db, "w1", "web:1.0", host="edge2")
+    db.commit()
+    topology.reload()
+    assert set(topology.factors()) == {"a1", "a2", "a3", "w1"}
+
+    ContainerCollector([], 60)._mark_removed(DockerHost(name="edge1", url="tcp://127.0.0.1:1"), {"a1", "a2"})
+
+    assert set(topology.factors()) == {"a1", "a2", "w1"}
+    db.expire_all()
+    assert db.query(Container).filter(Container.id == "a3").one().status == "removed"
+    # Полная сверка с БД не возвращает удаленный контейнер
+    topology.reload()
+    assert set(topology.factors()) == {"a1", "a2", "w1"}
+
+def test_factors_use_whole_fleet(db):
+    for container_id in ("a1", "a2", "a3"):
+        _add(db, container_id, "api:1.0")
+    db.commit()
+    topology.reload()
+
+    assert topology.factors(["a1"]) == {"a1": topology.factors()["a1"]}
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.core.config import settings
+from app.services.vulndb import VulnDBManager, VulnDBVersion, scan_env
+
+def test_check_uses_update_url(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "VULNDB_UPDATE_URL", "https://mirror.example/listing.json")
+    manager = VulnDBManager()
+    manager.current = VulnDBVersion(name="20240101T000000Z-v5", path=str(tmp_path))
+    calls = []
+
+    async def grype(args, env, timeout=None):
+        calls.append((args, env))
+        return 0, "No update available"
+
+    monkeypatch.setattr(manager, "_grype", grype)
+
+    assert not asyncio.run(manager._update_available())
+    assert calls == [(["db", "check"], {**manager.current.env(), "GRYPE_DB_UPDATE_URL": "https://mirror.example/listing.json"})]
+
+def test_scan_without_managed_database_does_not_update():
+    assert scan_env(None)["GRYPE_DB_AUTO_UPDATE"] == "false"
+
+def test_loop_survives_refresh_error(monkeypatch):
+    monkeypatch.setattr(settings, "VULNDB_CHECK_INTERVAL", 3600)
+    manager = VulnDBManager()
+
+    async def refresh():
+        raise ValueError("битый ответ grype db status")
+
+    monkeypatch.setattr(manager, "refresh", refresh)
+
+    async def run():
+        await manager.start()
+        assert await manager.ready() is None
+        await asyncio.sleep(0)
+        assert not manager._task.done()
+        await manager.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.models.container import Container
+from app.models.vulnerability import Vulnerability
+from app.schemas.vulnerability import VulnerabilityListItem
+
+def _add_vulnerabilities(db):
+    db.add(Container(id="c1", host="local", name="web", image="nginx:1.25", status="running"))
+    for index, score in enumerate((3.0, 9.0)):
+        db.add(Vulnerability(
+            id=f"c1_CVE-2024-{index}",
+            container_id="c1",
+            cve_id=f"CVE-2024-{index}",
+            package_name="openssl",
+            package_version="3.0.0",
+            fixed_version="3.0.1",
+            cvss=score,
+            severity="High",
+            description="описание",
+            details={},
+            score=score,
+            impact_factor=0.5,
+            exploit_probability=0.3,
+        ))
+    db.commit()
+
+def test_list_matches_documented_schema(client, db):
+    _add_vulnerabilities(db)
+
+    response = client.get("/v1/vulnerabilities/")
+
+    assert response.status_code == 200
+    items = TypeAdapter(List[VulnerabilityListItem]).validate_python(response.json())
+    assert [item.cve_id for item in items] == ["CVE-2024-1", "CVE-2024-0"]
+    assert set(response.json()[0]) == set(VulnerabilityListItem.model_fields)
+
+def test_list_fields_projection(client, db):
+    _add_vulnerabilities(db)
+
+    response = client.get("/v1/vulnerabilities/", params={"fields": "cve_id,description"})
+
+    assert response.status_code == 200
+    assert response.json()[0] == {"id": "c1_CVE-2024-1", "cve_id": "CVE-2024-1", "description": "описание"}
+
+def test_list_unknown_field(client, db):
+    response = client.get("/v1/vulnerabilities/", params={"fields": "cve_id,secret"})
+
+    assert response.status_code == 400
+
+def test_analytics_top_cves(client, db):
+    _add_vulnerabilities(db)
+
+    response = client.get("/v1/analytics/top-cves")
+
+    assert response.status_code == 200
+    assert {item["cve_id"] for item in response.json()} == {"CVE-2024-0", "CVE-2024-1"}
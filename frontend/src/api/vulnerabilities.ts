@@ -9,6 +9,7 @@ interface VulnerabilityQueryParams {
   min_cvss?: number;
   skip?: number;
   limit?: number;
+  fields?: string;
 }
 
 // Получение списка всех уязвимостей
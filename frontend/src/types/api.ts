@@ -29,10 +29,12 @@ export interface Vulnerability {
   cvss: number;
   severity: string;
   description?: string;
-  details: Record<string, any>;
+  details?: Record<string, any>;
   score: number;
+  score_version?: number;
   impact_factor: number;
   exploit_probability: number;
+  known_exploited?: boolean;
   created_at: string;
   updated_at: string;
 }
@@ -55,9 +57,15 @@ export interface PatchPlan {
   id: string;
   container_id: string;
   vulnerability_id: string;
+  image?: string;
+  package_name?: string;
+  fixed_version?: string | null;
+  container_ids?: string[];
+  vulnerability_ids?: string[];
   scenario: PatchScenario;
   start_time: string;
   duration: number;
+  lane?: number | null;
   priority: number;
   status: string;
   created_at: string;
@@ -75,12 +83,22 @@ export interface PatchPlanWithDetails extends PatchPlan {
 export interface PlanTask {
   container_id: string;
   container_name: string;
+  container_ids: string[];
+  container_names: string[];
+  image: string;
+  package_name: string;
+  fixed_version: string | null;
   vulnerability_id: string;
+  vulnerability_ids: string[];
+  cve_ids: string[];
   score: number;
   severity: string;
   scenario: PatchScenario;
   start: string;
+  end: string;
   duration: number;
+  lane: number;
+  priority: number;
 }
 
 export interface PlanResponse {